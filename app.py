@@ -1,19 +1,30 @@
 import streamlit as st
 from app_pages.multipage import MultiPage
 
-# load pages scripts
-from app_pages.page_summary import page_summary_body
-from app_pages.page_asthma_status_study import page_asthma_status_study_body
-from app_pages.page_project_hypothesis import page_project_hypothesis_body
-from app_pages.page_predict_asthma_model import page_predict_asthma_model_body
-
 
 app = MultiPage(app_name= "AsthmaBurden") # Create an instance of the app 
 
-# Add your app pages here using .add_page()
-app.add_page("Quick Project Summary", page_summary_body)
-app.add_page("Asthma Status Study", page_asthma_status_study_body)
-app.add_page("Project Hypothesis and Validation", page_project_hypothesis_body)
-app.add_page("Machine Learning: Predict Asthma Status", page_predict_asthma_model_body)
+# Add your app pages here using .add_page(); page modules are imported
+# only when selected
+app.add_page(
+    "Quick Project Summary",
+    "app_pages.page_summary:page_summary_body",
+)
+app.add_page(
+    "Asthma Status Study",
+    "app_pages.page_asthma_status_study:page_asthma_status_study_body",
+)
+app.add_page(
+    "Project Hypothesis and Validation",
+    "app_pages.page_project_hypothesis:page_project_hypothesis_body",
+)
+app.add_page(
+    "Machine Learning: Predict Asthma Status",
+    "app_pages.page_predict_asthma_model:page_predict_asthma_model_body",
+)
+app.add_page(
+    "Data Drift Monitor",
+    "app_pages.page_data_drift:page_data_drift_body",
+)
 
 app.run() # Run the  app
\ No newline at end of file
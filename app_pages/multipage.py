@@ -1,5 +1,9 @@
+import importlib
+
 import streamlit as st
 
+from src import tracing
+
 # Welcome message
 def welcome():
     st.markdown("## 👋 Welcome")
@@ -25,12 +29,25 @@ class MultiPage:
             layout="wide"
         )
 
-    def add_page(self, title, func) -> None: 
+    def add_page(self, title, func) -> None:
+        """
+        Register a page. func is either the page function or a
+        "package.module:function" path, imported only when the page is
+        first selected so unused pages cost nothing at startup.
+        """
         self.pages.append({
             "title": title,
             "function": func
         })
 
+    @staticmethod
+    def load_page(page):
+        func = page["function"]
+        if callable(func):
+            return func
+        module_path, _, func_name = func.partition(":")
+        return getattr(importlib.import_module(module_path), func_name)
+
     def run(self):
         st.title(self.app_name)
 
@@ -40,4 +57,7 @@ class MultiPage:
             format_func=lambda page: page['title']
         )
 
-        page['function']()
\ No newline at end of file
+        tracing.start_rerun(page["title"])
+        with tracing.trace(f"page:{page['title']}"):
+            self.load_page(page)()
+        tracing.render_debug_panel()
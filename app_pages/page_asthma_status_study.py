@@ -1,36 +1,39 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
 import streamlit as st
-from src.data_management import load_patient_data
-from scipy.stats import (
-    chi2_contingency,
-    fisher_exact,
-    mannwhitneyu,
-    ttest_ind,
-    shapiro,
+from src.data_management import collapse_categories, load_patient_data
+from src.figure_cache import figure_cache
+from src.result_cache import result_cache
+from src.statistical_tests import binary_significance, continuous_significance
+from src.subgroup_cube import (
+    DIMENSIONS,
+    MIN_CELL_SIZE,
+    SubgroupCube,
+    held_out,
 )
 
 
 sns.set_style("whitegrid")
 
-#  Load data and clean
-df = load_patient_data()
-df = df.astype({"Age": "float64"})
-df = df.drop(columns=["PatientID", "DoctorInCharge"], errors="ignore")
+@st.cache_data
+def load_study_data():
+    """
+    Load and clean the patient data (loaded on first use, not on import).
+    """
+    df = load_patient_data()
+    df = df.astype({"Age": "float64"})
+    df = df.drop(columns=["PatientID", "DoctorInCharge"], errors="ignore")
+    return df
 
 
 def page_asthma_status_study_body():
     """
     Streamlit page for the exploratory data analysis.
     """
-    eda_violin_plots = plt.imread(
-        f"outputs/eda_images/violin_plots.png"
-    )
-    eda_boxplots = plt.imread(
-        f"outputs/eda_images/boxplots.png"
-    )
+    df = load_study_data()
+    eda_violin_plots = figure_cache.file("outputs/eda_images/violin_plots.png")
+    eda_boxplots = figure_cache.file("outputs/eda_images/boxplots.png")
 
     st.title("Asthma Status Study")
 
@@ -91,7 +94,9 @@ def page_asthma_status_study_body():
     df_updated = process_categorical(df)
 
     # Correlation data - continuous variables
-    continuous_results_df = continuous_significance(df_updated)
+    continuous_results_df = cached_continuous_significance(
+        df_updated, bh=True
+    )
 
     st.error(
         "No continuous variables were significantly correlated."
@@ -100,7 +105,11 @@ def page_asthma_status_study_body():
     if st.checkbox("Continuous data significance:"):
         st.dataframe(
             continuous_results_df.style.format(
-                {"statistic": "{:.3f}", "p-value": "{:.4f}"}
+                {
+                    "statistic": "{:.3f}",
+                    "p-value": "{:.4f}",
+                    "p-value (BH)": "{:.4f}",
+                }
             )
         )
 
@@ -111,12 +120,16 @@ def page_asthma_status_study_body():
     """)
 
     # Correlation data - binary variables
-    binary_results_df = binary_significance(df_updated)
+    binary_results_df = cached_binary_significance(df_updated, bh=True)
 
     if st.checkbox("Binary data significance:"):
         st.dataframe(
             binary_results_df.style.format(
-                {"statistic": "{:.3f}", "p-value": "{:.4f}"}
+                {
+                    "statistic": "{:.3f}",
+                    "p-value": "{:.4f}",
+                    "p-value (BH)": "{:.4f}",
+                }
             )
         )
 
@@ -134,9 +147,7 @@ def page_asthma_status_study_body():
     """)
 
     if st.checkbox("Feature-Target Correlation:"):
-        st.dataframe(
-            feature_target_correlation_plot(df_updated)
-        )
+        st.image(feature_target_correlation_plot(df_updated))
 
     st.success("""
         Most features show very weak correlations with asthma status,
@@ -147,6 +158,20 @@ def page_asthma_status_study_body():
         While chest tightness shows the strongest negative correlation.
     """)
 
+    st.write("## Subgroup Drill-down")
+    st.write("---")
+    st.write(f"""
+        Asthma prevalence and model recall/precision for any combination of
+        age band, gender, ethnicity, education level and symptoms.
+        Prevalence covers every patient; recall and precision cover only
+        the patients held out from training (the model's test split, counted
+        as "evaluated"). Groups with fewer than {MIN_CELL_SIZE} patients are
+        flagged as too small to read much into.
+    """)
+
+    if st.checkbox("Explore subgroups"):
+        subgroup_drilldown(load_patient_data())
+
     st.write("## Summary of findings")
     st.write("---")
     st.info("""
@@ -171,136 +196,90 @@ def page_asthma_status_study_body():
     """)
 
 # Functions for the tables and charts
-def process_categorical(df):
+def subgroup_drilldown(df):
     """
-    Consolidate Ethnicity and EducationLevel into simplified binary categories.
+    Group-by and filter widgets over the subgroup cube.
     """
-    df_updated = df.copy()
-
-    # Simplify Ethnicity
-    df_updated["Ethnicity"] = df_updated["Ethnicity"].replace(
-        {
-            0: 0,  # White
-            1: 1,  # African American → 1
-            2: 1,  # Asian → 1
-            3: 1,  # Other → 1
-        }
-    )
+    from src.data_management import model_registry
+    from src.machine_learning.model_bundle import current_bundle
 
-    # Simplify EducationLevel
-    df_updated["EducationLevel"] = df_updated["EducationLevel"].replace(
-        {
-            1: 1,  # Bachelor/Higher
-            2: 1,  # Bachelor/Higher
-            3: 0,  # None/High school
-        }
-    )
+    version = model_registry.latest_version("predict_asthma")
+    with st.spinner(f"Loading the {version} model bundle..."):
+        bundle = current_bundle(model_registry, "predict_asthma", version)
+    cube = subgroup_cube(df, bundle.model_sha256, bundle)
 
-    return df_updated
+    by = st.multiselect(
+        "Group by", list(DIMENSIONS), default=["AgeBand"]
+    )
+    filters = {}
+    columns = st.columns(4)
+    for i, name in enumerate(d for d in DIMENSIONS if d not in by):
+        choice = columns[i % 4].selectbox(
+            name, ["All", *DIMENSIONS[name]], key=f"subgroup_{name}"
+        )
+        if choice != "All":
+            filters[name] = choice
+
+    table = cube.slice(**filters).rollup(*by)
+    st.dataframe(
+        table.style.format({
+            "prevalence": "{:.1%}",
+            "recall": "{:.2f}",
+            "precision": "{:.2f}",
+        }, na_rep="-")
+    )
+    if by:
+        prevalence = table["prevalence"].rename("Asthma prevalence")
+        prevalence.index = [
+            " / ".join(map(str, key)) if isinstance(key, tuple) else key
+            for key in prevalence.index
+        ]
+        st.bar_chart(prevalence)
 
 
-def continuous_significance(df_updated):
+@st.cache_data
+def subgroup_cube(df, model_sha256, _bundle):
     """
-    Create a dataframe for continuous results
+    Cube over the patient data with the bundled model's predictions,
+    evaluated on its test split; rebuilt only when the data or the model
+    changes.
     """
-    continuous_features = df_updated.select_dtypes(
-        include="float"
-    ).columns.tolist()
-
-    continuous_results = {}
-
-    for feature in continuous_features:
-        group0 = df_updated[df_updated["Diagnosis"] == 0][feature].dropna()
-        group1 = df_updated[df_updated["Diagnosis"] == 1][feature].dropna()
+    from src.machine_learning.score import score_frame
 
-        # Check normality
-        _, p0 = shapiro(group0) if len(group0) >= 3 else (None, 0)
-        _, p1 = shapiro(group1) if len(group1) >= 3 else (None, 0)
+    pipeline_model = _bundle.pipeline_model
+    predictions = score_frame(df, pipeline_model)["prediction"]
+    evaluated = held_out(df, pipeline_model, _bundle.split("X_test"))
+    return SubgroupCube.build(df, predictions, evaluated)
 
-        # Choose t-test if normal distribution, else Mann-Whitney
-        if p0 > 0.05 and p1 > 0.05:
-            stat, p = ttest_ind(group0, group1, equal_var=False)
-            test_name = "t-test"
-        else:
-            stat, p = mannwhitneyu(group0, group1, alternative="two-sided")
-            test_name = "Mann-Whitney U"
 
-        significance = "Significant" if p < 0.05 else "Not significant"
-
-        continuous_results[feature] = {
-            "test": test_name,
-            "statistic": stat,
-            "p-value": p,
-            "significance": significance,
-        }
-
-    # Create a dataframe and return it
-    continuous_results_df = pd.DataFrame(continuous_results).T
-    continuous_results_df.index.name = "Feature"
-    return continuous_results_df
-
-
-def binary_significance(df_updated):
+@result_cache(version=1)
+def process_categorical(df):
     """
-    Create a dataframe for binary results
+    Consolidate Ethnicity and EducationLevel into simplified binary categories.
     """
-    # Remove diagnosis for analysis
-    binary_features = [
-        col
-        for col in df_updated.select_dtypes("int").columns
-        if col != "Diagnosis"
-    ]
-
-    # Create an empty dictionary for the results
-    binary_results = {}
-
-    # Loop through features, recreate contigency tables, and significance
-    for feature in binary_features:
-        table = pd.crosstab(df_updated[feature], df_updated["Diagnosis"])
-
-        # Run chi-square test
-        chi2, p_chi, dof, expected = chi2_contingency(table)
-
-        # Decide whether to use Fisher (if any expected count < 5)
-        if (expected < 5).any():
-            oddsratio, p_value = fisher_exact(table)
-            test_used = "Fisher's exact"
-        else:
-            p_value = p_chi
-            oddsratio = (table.iloc[1, 1] / table.iloc[1, 0]) / (
-                table.iloc[0, 1] / table.iloc[0, 0]
-            )
-            test_used = "Chi-square"
+    return collapse_categories(df)
 
-        # Significance
-        significance = (
-            "Significant" if p_value < 0.05 else "Not significant"
-        )
 
-        # Overview of the output
-        binary_results[feature] = {
-            "test": test_used,
-            "p-value": p_value,
-            "odds_ratio": oddsratio,
-            "significance": significance,
-        }
-
-    binary_results_df = pd.DataFrame(binary_results).T
-    binary_results_df.index.name = "Feature"
-    return binary_results_df
+cached_continuous_significance = result_cache(version=1)(
+    continuous_significance
+)
+cached_binary_significance = result_cache(version=1)(binary_significance)
 
 
-def feature_target_correlation_plot(df_updated):
+@result_cache(version=1)
+def feature_target_correlation(df_updated):
     """
-    Generates a heatmap of feature-target correlations for a Streamlit app.
+    Correlation of each feature with Diagnosis.
     """
     features = df_updated.drop(["Diagnosis"], axis=1)
     target = df_updated["Diagnosis"]
 
     correlation_matrix = features.corrwith(target)
-    fig, ax = plt.subplots(figsize=(8, 6))
-    corr_df = pd.DataFrame(correlation_matrix, columns=["Correlation"])
+    return pd.DataFrame(correlation_matrix, columns=["Correlation"])
+
 
+def draw_feature_target_correlation(fig, corr_df):
+    ax = fig.subplots()
     sns.heatmap(
         corr_df,
         annot=True,
@@ -310,4 +289,17 @@ def feature_target_correlation_plot(df_updated):
     )
 
     ax.set_title("Feature-Target Correlation Matrix", fontsize=14)
-    st.pyplot(fig)
+
+
+def feature_target_correlation_plot(df_updated):
+    """
+    Heatmap of feature-target correlations as PNG bytes, rendered once per
+    dataset and served from the figure cache afterwards.
+    """
+    corr_df = feature_target_correlation(df_updated)
+    return figure_cache.figure(
+        "feature_target_correlation",
+        draw_feature_target_correlation,
+        corr_df,
+        figsize=(8, 6),
+    )
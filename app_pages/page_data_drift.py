@@ -0,0 +1,82 @@
+import os
+
+import streamlit as st
+
+from src.data_management import model_registry
+from src.machine_learning.model_bundle import current_bundle
+from src.machine_learning.drift import (
+    PSI_ALERT,
+    PSI_WARN,
+    DriftMonitor,
+    drift_state_path,
+)
+
+
+@st.cache_data
+def load_drift_state(path, mtime):
+    # mtime is part of the cache key so a new batch invalidates the entry
+    monitor = DriftMonitor.load(path)
+    return monitor, monitor.report()
+
+
+def page_data_drift_body():
+    """
+    Streamlit page comparing scored patient batches with the training data.
+    """
+    st.title("Data Drift Monitor")
+
+    st.info(f"""
+        The model can only be trusted on patients who resemble those it was
+        trained on. Every scored batch is binned against a sketch of the
+        training set (X_train), and the running counts are compared with it.
+
+        * **PSI** (population stability index): below {PSI_WARN} is stable,
+            above {PSI_ALERT} indicates drift.
+        * **KS**: largest gap between the cumulative distributions.
+        * **Chi-square**: test that the binned counts come from the same
+            distribution; with large batches even small shifts are
+            significant, so read it alongside PSI.
+    """)
+
+    version = model_registry.latest_version("predict_asthma")
+    path = drift_state_path("predict_asthma", version)
+    if not os.path.exists(path):
+        st.warning(f"""
+            No batches have been monitored for model {version} yet. Score
+            a batch with drift monitoring on:
+
+            `python -m src.machine_learning.score patients.csv out.csv --drift`
+        """)
+        return
+
+    monitor, report = load_drift_state(path, os.path.getmtime(path))
+    with st.spinner(f"Loading the {version} model bundle..."):
+        bundle = current_bundle(model_registry, "predict_asthma", version)
+    if monitor.model_sha256 != bundle.model_sha256:
+        st.warning(f"""
+            The monitored batches were compared with the training data of
+            an earlier build of model {version}. The state starts afresh
+            against the current model with the next batch scored with
+            `--drift`.
+        """)
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Patients monitored", f"{monitor.rows:,}")
+    col2.metric("Batches", monitor.batches)
+    col3.metric("Features drifted", int((report["status"] == "drift").sum()))
+    st.write(f"Model {version}, last updated {monitor.updated} (UTC).")
+
+    st.dataframe(
+        report.style.format({
+            "psi": "{:.3f}", "ks": "{:.3f}", "ks_p": "{:.3g}",
+            "chi2": "{:.1f}", "chi2_p": "{:.3g}",
+        }, na_rep="-"),
+        hide_index=True,
+    )
+
+    feature = st.selectbox(
+        "Compare distributions", report.sort_values(
+            "psi", ascending=False
+        )["feature"],
+    )
+    st.bar_chart(monitor.distribution(feature), stack=False)
@@ -1,8 +1,19 @@
+import glob
+import json
+import os
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from src.data_management import load_patient_data, load_pkl_file
+from src.data_management import model_registry
+from src.machine_learning.model_bundle import BUNDLE_MANIFEST, current_bundle
 from src.machine_learning.evaluate_clf import clf_performance
+from src.machine_learning.explain import Explainer
+from src.machine_learning.routing import ShadowStats, shadow_stats_path
+from src.machine_learning.thresholds import (
+    bootstrap_threshold_ci,
+    metrics_at,
+    threshold_curve,
+)
 
 
 def page_predict_asthma_model_body():
@@ -11,31 +22,37 @@ def page_predict_asthma_model_body():
     """
     st.title("Machine Learning: Predicting Asthma Status")
 
-    # Load prediction pipeline
-    version = 'v1'
-    asthma_pipeline_dc_fe = load_pkl_file(
-        f"outputs/modeling_pipeline/predict_asthma/{version}/"
-        "clf_pipeline_data_cleaning_feat_eng.pkl"
-    )
-    asthma_pipeline_model = load_pkl_file(
-        f"outputs/modeling_pipeline/predict_asthma/{version}/"
-        "clf_pipeline_model.pkl"
-    )
-    asthma_feature_importance = plt.imread(
-        f"outputs/modeling_pipeline/predict_asthma/{version}/"
-        "features_importance.png"
+    # Load the model bundle (cached per process, reloaded if rebuilt);
+    # artifacts inside the bundle are only read when first used
+    versions = model_registry.versions("predict_asthma")
+    bundled = [
+        v for v in versions if os.path.exists(model_registry.artifact_path(
+            "predict_asthma", v, BUNDLE_MANIFEST
+        ))
+    ]
+    unbundled = [v for v in versions if v not in bundled]
+    if unbundled:
+        st.warning(f"""
+            Model versions without a bundle are not listed:
+            {", ".join(unbundled)}. Build one with
+            `python -m src.machine_learning.model_bundle <version>`.
+        """)
+    if not bundled:
+        return
+    version = st.selectbox(
+        "Model version", bundled, index=len(bundled) - 1
     )
+    # Only slow when a retrained pipeline means the bundle is rebuilt
+    with st.spinner(f"Loading the {version} model bundle..."):
+        bundle = current_bundle(model_registry, "predict_asthma", version)
+    asthma_pipeline_dc_fe = bundle.pipeline_dc_fe
+    asthma_pipeline_model = bundle.pipeline_model
+    asthma_feature_importance = bundle.feature_importance_png
 
-    X_train = pd.read_csv(
-        f"outputs/modeling_pipeline/predict_asthma/{version}/X_train.csv")
-    X_test = pd.read_csv(
-        f"outputs/modeling_pipeline/predict_asthma/{version}/X_test.csv")
-    y_train = pd.read_csv(
-        f"outputs/modeling_pipeline/predict_asthma/{version}"
-        "/y_train.csv").values
-    y_test = pd.read_csv(
-        f"outputs/modeling_pipeline/predict_asthma/{version}"
-        "/y_test.csv").values
+    X_train = bundle.split("X_train")
+    X_test = bundle.split("X_test")
+    y_train = bundle.split("y_train").values
+    y_test = bundle.split("y_test").values
 
     st.write("## Overview")
     st.write("---")
@@ -59,7 +76,10 @@ def page_predict_asthma_model_body():
         the focuses on feature scaling and modeling.)
     """)
     st.write(" * Pipeline One: Data cleaning and feature engineering")
-    st.write(asthma_pipeline_dc_fe)
+    if asthma_pipeline_dc_fe is None:
+        st.write("Not used: this version is trained on the raw features.")
+    else:
+        st.write(asthma_pipeline_dc_fe)
 
     st.write("* Pipeline Two: Feature scaling and modeling")
     st.write(asthma_pipeline_model)
@@ -74,7 +94,27 @@ def page_predict_asthma_model_body():
     """)
     st.write("The model was trained using the following features:")
     st.write(X_train.columns.to_list())
-    st.image(asthma_feature_importance)
+    stability = bundle.feature_stability
+    if stability is None:
+        st.image(asthma_feature_importance)
+    else:
+        st.write(
+            f"Feature stability of this model over "
+            f"{stability['folds'].iloc[0]} cross-validation folds of its "
+            "training set: the permutation importance (drop in recall) of "
+            "each feature on held-out patients, and how often feature "
+            "selection (median coefficient threshold) kept it."
+        )
+        st.dataframe(
+            stability.drop(columns=["folds"]).style.format({
+                "selection_frequency": "{:.0%}",
+                "importance_mean": "{:.4f}",
+                "importance_std": "{:.4f}",
+                "importance_q05": "{:.4f}",
+                "importance_q95": "{:.4f}",
+            }),
+            hide_index=True,
+        )
 
     st.info("""
         As identified during exploratory data analysis, exercise induced had 
@@ -82,6 +122,34 @@ def page_predict_asthma_model_body():
         and gender. Smoking had the greatest negative correlation with asthma.
     """)
 
+    if st.checkbox("Per-patient explanations"):
+        st.write(
+            "Why the model scored each test set patient as it did: the "
+            "contribution of each feature to the patient's log-odds of "
+            "asthma, relative to an average training patient. Positive "
+            "values push towards an asthma prediction."
+        )
+        explainer = Explainer(asthma_pipeline_model, background=X_train)
+        patient = st.number_input(
+            "Test set patient (row)", min_value=0,
+            max_value=len(X_test) - 1, value=0,
+        )
+        row = X_test.iloc[[patient]]
+        explanation = explainer.explain(row, k=3).iloc[0]
+        st.write(
+            f"Predicted asthma probability: "
+            f"{explanation['asthma_probability']:.2f}"
+        )
+        contributions = explainer.contributions(row).iloc[0]
+        st.bar_chart(
+            contributions[contributions != 0].sort_values().rename(
+                "contribution"
+            ),
+            horizontal=True,
+        )
+        st.write("Top three drivers for every test set patient:")
+        st.dataframe(explainer.explain(X_test, k=3).round(3))
+
     # Pipeline performance
     st.write("### Pipeline Performance")
     st.write("---")
@@ -91,9 +159,139 @@ def page_predict_asthma_model_body():
         X_test=X_test,
         y_test=y_test,
         pipeline=asthma_pipeline_model,
-        label_map=['No asthma', 'Asthma']
+        label_map=['No asthma', 'Asthma'],
+        evaluation=bundle.evaluation,
+        model_sha256=bundle.model_sha256,
+    )
+
+    if st.checkbox("ROC and precision-recall curves"):
+        for split in ("train", "test"):
+            roc = bundle.evaluation[split]["roc"]
+            pr = bundle.evaluation[split]["pr"]
+            st.write(
+                f"{split.title()} set: ROC AUC = {roc['auc']:.2f}, "
+                f"average precision = {pr['average_precision']:.2f}"
+            )
+            col1, col2 = st.columns(2)
+            col1.line_chart(
+                pd.DataFrame({"TPR": roc["tpr"]}, index=roc["fpr"])
+            )
+            col2.line_chart(
+                pd.DataFrame({"Precision": pr["precision"]},
+                             index=pr["recall"])
+            )
+        st.dataframe(
+            pd.DataFrame(bundle.evaluation["test"]["threshold_sweep"])
+        )
+
+    st.write("### Decision Threshold")
+    st.write("---")
+    st.info("""
+        The model predicts asthma when its probability is at or above the
+        decision threshold (0.5 by default). Lowering the threshold trades
+        precision for recall. Use the slider to explore test set
+        performance at other operating points; 95% confidence intervals
+        are bootstrapped from the test set.
+    """)
+    if bundle.evaluation.get("model_sha256") == bundle.model_sha256:
+        test_scores = bundle.evaluation["test"]["y_score"]
+    else:
+        test_scores = asthma_pipeline_model.predict_proba(X_test)[:, 1]
+    curve = threshold_curve(y_test, test_scores)
+
+    threshold = st.slider(
+        "Decision threshold", min_value=0.0, max_value=1.0, value=0.5,
+        step=0.01,
+    )
+    at_threshold = metrics_at(curve, threshold)
+    ci = bootstrap_threshold_ci(
+        y_test, test_scores, [threshold], n_boot=500
+    ).iloc[0]
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "value": [ci[m] for m in ("precision", "recall", "f_beta")],
+                "95% CI lower": [
+                    ci[f"{m}_lower"] for m in ("precision", "recall", "f_beta")
+                ],
+                "95% CI upper": [
+                    ci[f"{m}_upper"] for m in ("precision", "recall", "f_beta")
+                ],
+            },
+            index=["Precision", "Recall", "F1"],
+        ).round(2)
+    )
+    st.write(
+        f"* At {threshold:.2f}: {int(at_threshold['tp'])} true positives, "
+        f"{int(at_threshold['fp'])} false positives, "
+        f"{int(at_threshold['fn'])} false negatives."
+    )
+    st.line_chart(
+        curve.set_index("threshold")[["precision", "recall"]]
     )
 
+    calibration = bundle.calibration
+    if calibration is not None and st.checkbox("Calibrated risk"):
+        calibrator, report = calibration
+        st.info(f"""
+            The model was trained on oversampled, class-weighted data, so
+            its scores are not risks: the average score is far above the
+            {report['prevalence']['train']:.1%} asthma prevalence. A
+            {calibrator.method.replace('_', ' ')} calibration, fitted on
+            cross-validated training scores, maps each score to the
+            observed asthma rate of similar patients. Lower Brier scores are
+            better.
+        """)
+        st.dataframe(
+            pd.DataFrame(report["brier"]).T.rename(
+                index={"train_oof": "Train (cross-validated)",
+                       "test": "Test"},
+                columns={"raw": "Raw score", "calibrated": "Calibrated"},
+            ).style.format("{:.4f}")
+        )
+        curves = [
+            pd.DataFrame({**report["reliability"][key], "curve": label})
+            for key, label in (("test_raw", "Raw score"),
+                               ("test_calibrated", "Calibrated"))
+        ]
+        curves.append(pd.DataFrame({
+            "predicted": [0.0, 1.0], "observed": [0.0, 1.0],
+            "curve": "Perfect calibration",
+        }))
+        st.write("Reliability on the test set (quantile bins):")
+        st.line_chart(
+            pd.concat(curves), x="predicted", y="observed", color="curve"
+        )
+
+    comparisons = sorted(
+        set(glob.glob(shadow_stats_path(version, "*")))
+        | set(glob.glob(shadow_stats_path("*", version)))
+    )
+    if comparisons and st.checkbox("Champion vs challenger"):
+        st.info("""
+            Results of batch scoring with champion/challenger routing
+            (src.machine_learning.routing). In shadow mode both versions
+            score every patient, so their predictions can be compared
+            directly. Metrics use patients whose diagnosis was known.
+        """)
+        for path in comparisons:
+            with open(path) as f:
+                stats = ShadowStats.from_dict(json.load(f))
+            table, paired = stats.summary()
+            st.write(
+                f"**{stats.champion}** (champion) vs **{stats.challenger}** "
+                "(challenger)"
+            )
+            st.dataframe(table.style.format("{:.3f}", na_rep="-"))
+            if paired["compared"]:
+                st.write(
+                    f"* {paired['compared']} patients scored by both: "
+                    f"predictions disagree for "
+                    f"{paired['disagreement_rate']:.1%}, mean probability "
+                    f"difference {paired['mean_diff']:+.3f} "
+                    f"(mean absolute {paired['mean_abs_diff']:.3f})."
+                )
+
     st.write("### Performance summary")
     st.write("---")
     st.error("""
@@ -112,3 +310,6 @@ def page_predict_asthma_model_body():
         asthma, as well as more asthma patients, would be required to
         investigate this further.
     """)
+
+    if st.checkbox("Artifact load times"):
+        st.dataframe(model_registry.load_report())
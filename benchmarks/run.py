@@ -0,0 +1,258 @@
+"""
+Benchmark suite for data loading, statistics, scoring and page rendering.
+
+Each benchmark runs at 1x, 10x and 100x scale-ups of
+asthma_disease_data.csv. A scale-up resamples patients with replacement
+and gives them new PatientIDs. Page renders run once per page through
+Streamlit's AppTest, on the app's own data. Results are written as JSON.
+With --compare, the median of every benchmark is checked against a stored
+baseline. The run exits non-zero if any benchmark is slower than the
+baseline by more than --tolerance.
+
+    python benchmarks/run.py                          # all scales
+    python benchmarks/run.py --scales 1 10 --output results.json
+    python benchmarks/run.py --compare benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline          # refresh baseline
+
+Run from the repository root.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+SOURCE_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+BASELINE = os.path.join("benchmarks", "baseline.json")
+SCALES = [1, 10, 100]
+
+# Registered in app.py
+PAGES = {
+    "page_summary":
+        "app_pages.page_summary:page_summary_body",
+    "page_asthma_status_study":
+        "app_pages.page_asthma_status_study:page_asthma_status_study_body",
+    "page_project_hypothesis":
+        "app_pages.page_project_hypothesis:page_project_hypothesis_body",
+    "page_predict_asthma_model":
+        "app_pages.page_predict_asthma_model:page_predict_asthma_model_body",
+    "page_data_drift":
+        "app_pages.page_data_drift:page_data_drift_body",
+}
+
+
+def scaled_dataset(scale, out_dir, random_state=0):
+    """
+    Write a scale-up of the source data (CSV plus columnar export) and
+    return the CSV path.
+    """
+    from src.columnar_store import export_csv
+
+    df = pd.read_csv(SOURCE_DATA)
+    if scale != 1:
+        rng = np.random.default_rng(random_state)
+        df = df.iloc[rng.integers(0, len(df), len(df) * scale)]
+        df = df.reset_index(drop=True)
+        df["PatientID"] = np.arange(len(df)) + 1
+    path = os.path.join(out_dir, f"asthma_disease_data_x{scale}.csv")
+    df.to_csv(path, index=False)
+    export_csv(path)
+    return path
+
+
+def time_call(func, repeats, setup=None):
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "repeats": repeats,
+    }
+
+
+def data_benchmarks(csv_path):
+    """
+    (name, callable, setup) triples for one dataset. Cached functions are
+    timed through their uncached implementation.
+    """
+    from app_pages.page_asthma_status_study import (
+        draw_feature_target_correlation,
+        feature_target_correlation,
+        process_categorical,
+    )
+    from src.columnar_store import read_dataset
+    from src.data_management import clean_patient_data
+    from src.figure_cache import figure_cache
+    from src.machine_learning.evaluate_clf import clf_performance
+    from src.machine_learning.model_bundle import LABEL_MAP, ModelBundle
+    from src.machine_learning.score import model_inputs
+    from src.statistical_tests import (
+        binary_significance,
+        continuous_significance,
+    )
+
+    # load_patient_data reads a fixed path; time the loader it wraps
+    df = read_dataset(csv_path)
+    study_df = df.astype({"Age": "float64"}).drop(
+        columns=["PatientID", "DoctorInCharge"]
+    )
+    df_updated = process_categorical.__wrapped__(study_df)
+
+    bundle = ModelBundle.open("predict_asthma", "v1")
+    dc_fe, model = bundle.pipeline_dc_fe, bundle.pipeline_model
+    cleaned = clean_patient_data(df)
+    dc_fe_input = cleaned[dc_fe.feature_names_in_]
+    X = model_inputs(df, model)
+    y = cleaned["Diagnosis"].to_numpy()
+    split = len(X) * 4 // 5
+
+    def correlation_plot():
+        corr_df = feature_target_correlation.__wrapped__(df_updated)
+        figure_cache.figure(
+            "feature_target_correlation",
+            draw_feature_target_correlation,
+            corr_df,
+            figsize=(8, 6),
+        )
+
+    return [
+        ("load_patient_data", lambda: read_dataset(csv_path), None),
+        ("process_categorical",
+         lambda: process_categorical.__wrapped__(study_df), None),
+        ("continuous_significance",
+         lambda: continuous_significance(df_updated, bh=True), None),
+        ("binary_significance",
+         lambda: binary_significance(df_updated, bh=True), None),
+        ("feature_target_correlation_plot", correlation_plot,
+         figure_cache.clear),
+        ("pipeline_dc_fe_transform",
+         lambda: dc_fe.transform(dc_fe_input), None),
+        ("pipeline_model_predict", lambda: model.predict(X), None),
+        ("clf_performance",
+         lambda: clf_performance(
+             X.iloc[:split], y[:split], X.iloc[split:], y[split:],
+             model, LABEL_MAP,
+         ), None),
+    ]
+
+
+def page_benchmarks():
+    from streamlit.testing.v1 import AppTest
+
+    def render(target):
+        module, function = target.split(":")
+        script = f"from {module} import {function}\n{function}()\n"
+
+        def run():
+            at = AppTest.from_string(script, default_timeout=300).run()
+            if at.exception:
+                raise RuntimeError(
+                    f"{target} raised: {at.exception[0].message}"
+                )
+        return run
+
+    return [(name, render(target), None) for name, target in PAGES.items()]
+
+
+def run_suite(scales, repeats):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="asthma-bench-") as tmp:
+        for scale in scales:
+            csv_path = scaled_dataset(scale, tmp)
+            # Fewer repeats where a single run already takes a while
+            n = repeats if scale < 100 else max(1, repeats // 3)
+            for name, func, setup in data_benchmarks(csv_path):
+                key = f"{name}@{scale}x"
+                results[key] = time_call(func, n, setup)
+                print(f"{key:45s} {results[key]['median_s']:.4f}s")
+    for name, func, setup in page_benchmarks():
+        key = f"render:{name}"
+        results[key] = time_call(func, repeats, setup)
+        print(f"{key:45s} {results[key]['median_s']:.4f}s")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Benchmarks whose median is more than `tolerance` slower than baseline.
+    """
+    regressions = {}
+    for key, result in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        result["baseline_median_s"] = base["median_s"]
+        result["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions[key] = ratio
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the asthma app benchmark suite."
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"Write the results to {BASELINE}")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    # Every bare-mode Streamlit call warns about the missing script context
+    logging.getLogger(
+        "streamlit.runtime.scriptrunner_utils.script_run_context"
+    ).disabled = True
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "scales": args.scales,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": run_suite(args.scales, args.repeats),
+    }
+
+    regressions = {}
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report["results"], json.load(f),
+                                  args.tolerance)
+        report["regressions"] = regressions
+        for key, ratio in sorted(regressions.items()):
+            print(f"REGRESSION {key}: {ratio:.2f}x baseline")
+
+    for path in filter(None, [args.output,
+                              BASELINE if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Startup benchmark for the Streamlit app.
+
+Runs app.py in a fresh interpreter under `python -X importtime` and
+reports time-to-first-render (the default page rendered in bare mode),
+the slowest imports, and whether heavy analysis libraries were pulled in
+at startup.
+
+    python benchmarks/startup.py [--repeats 3] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = [
+    "scipy.stats", "seaborn", "matplotlib.pyplot", "sklearn", "joblib",
+]
+RUN_APP = (
+    "import time, runpy; start = time.perf_counter(); "
+    "runpy.run_path('app.py', run_name='__main__'); "
+    "print('FIRST_RENDER', time.perf_counter() - start)"
+)
+IMPORT_LINE = re.compile(
+    r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)"
+)
+
+
+def run_once():
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN_APP],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    first_render = float(
+        re.search(r"FIRST_RENDER ([\d.eE+-]+)", out.stdout).group(1)
+    )
+    imports = {}
+    total_us = 0
+    for match in IMPORT_LINE.finditer(out.stderr):
+        _, cumulative, indent, module = match.groups()
+        imports[module] = int(cumulative)
+        if len(indent) == 1:  # top-level import
+            total_us += int(cumulative)
+    return first_render, total_us / 1e6, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.repeats)]
+    imports = runs[-1][2]
+    result = {
+        "first_render_seconds": statistics.median(r[0] for r in runs),
+        "import_seconds": statistics.median(r[1] for r in runs),
+        "heavy_modules_at_startup": [
+            module for module in HEAVY_MODULES if module in imports
+        ],
+        "slowest_imports_ms": {
+            module: us / 1000
+            for module, us in sorted(
+                imports.items(), key=lambda item: item[1], reverse=True
+            )[:args.top]
+        },
+    }
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Streaming data-cleaning stage for raw asthma extracts.
+
+Applies the cleaning steps from 02_DataCleaning (drop PatientID and
+DoctorInCharge, cast Age to float) chunk by chunk, so extracts far larger
+than memory can be processed. Each chunk is validated against the dataset
+schema, aligned to the columns of the first chunk (so extracts with a
+different column order line up under the one CSV header), folded into
+running per-column statistics and appended to the output, which is
+swapped into place once the whole input has been read.
+
+    python -m src.cleaning [--chunksize 50000] [--collapse-categories]
+"""
+import argparse
+import glob
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import (
+    ASTHMA_SCHEMA,
+    BINARY_FLAGS,
+    CATEGORY_LABELS,
+    CONTINUOUS_MEASURES,
+)
+from src.data_management import collapse_categories
+
+RAW_DATA_DIR = "inputs/datasets/raw"
+CLEANED_DATA_PATH = "outputs/datasets/cleaned/asthma_disease_data_cleaned.csv"
+DROP_COLUMNS = ["PatientID", "DoctorInCharge"]
+REQUIRED_COLUMNS = list(ASTHMA_SCHEMA)
+
+
+def iter_raw_chunks(raw_dir=RAW_DATA_DIR, chunksize=50_000):
+    """
+    Yield DataFrame chunks from every CSV in raw_dir, in file name order.
+    """
+    paths = sorted(glob.glob(os.path.join(raw_dir, "*.csv")))
+    if not paths:
+        raise FileNotFoundError(f"No CSV files found in {raw_dir}")
+    for path in paths:
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            yield from reader
+
+
+def validate_chunk(chunk, offset=0):
+    """
+    Check a raw chunk against the dataset schema. offset is the number of
+    rows before this chunk, used to report absolute row numbers.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+    def bad_rows(mask):
+        return (np.flatnonzero(mask.to_numpy()) + offset)[:5].tolist()
+
+    for column in ["Age", *BINARY_FLAGS, *CATEGORY_LABELS]:
+        mask = chunk[column].isna()
+        if mask.any():
+            raise ValueError(f"{column} has missing values at rows "
+                             f"{bad_rows(mask)}")
+    for column in BINARY_FLAGS:
+        mask = ~chunk[column].isin([0, 1])
+        if mask.any():
+            raise ValueError(f"{column} must only contain 0/1 flags; see "
+                             f"rows {bad_rows(mask)}")
+    for column, labels in CATEGORY_LABELS.items():
+        mask = ~chunk[column].isin(range(len(labels)))
+        if mask.any():
+            raise ValueError(f"{column} must hold codes 0-{len(labels) - 1}"
+                             f"; see rows {bad_rows(mask)}")
+    for column in CONTINUOUS_MEASURES:
+        if not pd.api.types.is_numeric_dtype(chunk[column]):
+            raise ValueError(f"{column} is not numeric.")
+
+
+def clean_chunk(chunk, collapse=False):
+    """
+    The 02_DataCleaning steps for one chunk. With collapse=True Ethnicity
+    and EducationLevel are also reduced to binary categories, as done
+    before the statistical tests and modelling.
+    """
+    chunk = chunk.drop(columns=DROP_COLUMNS, errors="ignore")
+    chunk = chunk.astype({"Age": "float64"})
+    if collapse:
+        chunk = collapse_categories(chunk)
+    return chunk
+
+
+class RunningStats:
+    """
+    Per-column count, missing, min, max, mean and standard deviation,
+    accumulated one chunk at a time.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        numeric = chunk.select_dtypes("number")
+        for column in chunk.columns:
+            stats = self.columns.setdefault(column, {
+                "count": 0, "missing": 0, "min": np.nan, "max": np.nan,
+                "n": 0, "mean": 0.0, "m2": 0.0,
+            })
+            values = chunk[column]
+            n_missing = int(values.isna().sum())
+            stats["missing"] += n_missing
+            stats["count"] += len(values) - n_missing
+            if column in numeric.columns and n_missing < len(values):
+                stats["min"] = np.fmin(stats["min"], values.min())
+                stats["max"] = np.fmax(stats["max"], values.max())
+                values = values.to_numpy(dtype=float)
+                values = values[~np.isnan(values)]
+                # Merge chunk moments (Chan et al.), stable for large n
+                n = values.size
+                mean = values.mean()
+                m2 = ((values - mean) ** 2).sum()
+                total = stats["n"] + n
+                delta = mean - stats["mean"]
+                stats["mean"] += delta * n / total
+                stats["m2"] += m2 + delta ** 2 * stats["n"] * n / total
+                stats["n"] = total
+
+    def to_frame(self):
+        rows = []
+        for column, stats in self.columns.items():
+            n = stats["n"]
+            rows.append({
+                "feature": column,
+                "count": stats["count"],
+                "missing": stats["missing"],
+                "min": stats["min"],
+                "max": stats["max"],
+                "mean": stats["mean"] if n else np.nan,
+                "std": np.sqrt(stats["m2"] / (n - 1)) if n > 1 else np.nan,
+            })
+        return pd.DataFrame(rows).set_index("feature")
+
+
+def clean_stream(chunks, stats=None, collapse=False):
+    """
+    Generator of validated, cleaned chunks, all with the first chunk's
+    columns in its order; updates stats on the way. Columns a later chunk
+    adds are dropped with a warning, and optional columns it lacks are
+    left empty (missing required columns fail validation).
+    """
+    offset = 0
+    columns = None
+    dropped = set()
+    for chunk in chunks:
+        validate_chunk(chunk, offset)
+        offset += len(chunk)
+        cleaned = clean_chunk(chunk, collapse=collapse)
+        if columns is None:
+            columns = list(cleaned.columns)
+        else:
+            extra = [c for c in cleaned.columns
+                     if c not in columns and c not in dropped]
+            if extra:
+                warnings.warn(
+                    f"Dropping columns not in the first extract: {extra}"
+                )
+                dropped.update(extra)
+            cleaned = cleaned.reindex(columns=columns)
+        if stats is not None:
+            stats.update(cleaned)
+        yield cleaned
+
+
+def run_cleaning(raw_dir=RAW_DATA_DIR, out_path=CLEANED_DATA_PATH,
+                 chunksize=50_000, collapse=False):
+    """
+    Clean every raw extract into out_path in a single pass with memory
+    bounded by chunksize. Returns the running statistics as a DataFrame.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    stats = RunningStats()
+    try:
+        with open(tmp_path, "w", newline="") as f:
+            for i, chunk in enumerate(clean_stream(
+                iter_raw_chunks(raw_dir, chunksize), stats, collapse
+            )):
+                chunk.to_csv(f, header=(i == 0), index=False)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return stats.to_frame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Clean the raw asthma extracts chunk by chunk."
+    )
+    parser.add_argument("--raw-dir", default=RAW_DATA_DIR)
+    parser.add_argument("--output", default=CLEANED_DATA_PATH)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument(
+        "--collapse-categories", action="store_true",
+        help="Also collapse Ethnicity and EducationLevel to binary",
+    )
+    args = parser.parse_args(argv)
+
+    stats = run_cleaning(
+        args.raw_dir, args.output, args.chunksize, args.collapse_categories
+    )
+    rows = int((stats["count"] + stats["missing"]).max())
+    print(f"Cleaned {rows} rows into {args.output}")
+    print(stats.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,216 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import joblib
+from src.columnar_store import read_dataset
+from src.tracing import traced
+
+MODEL_PIPELINE_DIR = "outputs/modeling_pipeline"
+
+# Category collapsing used in 02_DataCleaning / 05_PredictingAsthma
+ETHNICITY_MAP = {0: 0, 1: 1, 2: 1, 3: 1}  # White vs other
+EDUCATION_LEVEL_MAP = {1: 1, 2: 1, 3: 0}  # Bachelor/Higher vs None/HS
+
 
-@st.cache_data
+@traced()
+@st.cache_resource
 def load_patient_data():
-    df = pd.read_csv("outputs/datasets/collection/asthma_disease_data.csv")
+    # Prefers the typed columnar export when it matches the CSV. Cached as
+    # a resource so the memory-mapped columns are shared, not pickled and
+    # copied on every call; callers must treat the frame as read-only
+    df = read_dataset("outputs/datasets/collection/asthma_disease_data.csv")
     return df
 
+@traced()
 def load_pkl_file(file_path):
-    return joblib.load(filename=file_path)
\ No newline at end of file
+    return joblib.load(filename=file_path)
+
+
+def clean_patient_data(df):
+    """
+    Apply the notebook cleaning steps: drop identifiers, cast Age to float
+    and collapse Ethnicity and EducationLevel into binary categories.
+    Columns that are absent (e.g. in a record holding only the model
+    features) are skipped.
+    """
+    df = df.drop(columns=["PatientID", "DoctorInCharge"], errors="ignore")
+    if "Age" in df.columns:
+        df = df.astype({"Age": "float64"})
+    return collapse_categories(df)
+
+
+def collapse_categories(df):
+    """
+    Consolidate Ethnicity and EducationLevel into simplified binary
+    categories, where present. Returns a copy.
+    """
+    df = df.copy()
+    if "Ethnicity" in df.columns:
+        df["Ethnicity"] = df["Ethnicity"].replace(ETHNICITY_MAP)
+    if "EducationLevel" in df.columns:
+        df["EducationLevel"] = df["EducationLevel"].replace(
+            EDUCATION_LEVEL_MAP
+        )
+    return df
+
+
+def file_signature(file_path):
+    """
+    Cheap change marker for a file: its mtime (ns) and size.
+    """
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_artifact(file_path):
+    """
+    Read a pipeline artifact from disk based on its file extension.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".pkl":
+        return load_pkl_file(file_path)
+    if extension == ".csv":
+        return pd.read_csv(file_path)
+    # Images and anything else are kept as raw bytes (st.image accepts them)
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def _artifact_nbytes(artifact, file_path):
+    """
+    Approximate in-memory size of a loaded artifact, used for LRU eviction.
+    """
+    if isinstance(artifact, pd.DataFrame):
+        return int(artifact.memory_usage(deep=True).sum())
+    if hasattr(artifact, "nbytes"):
+        return int(artifact.nbytes)
+    if isinstance(artifact, bytes):
+        return len(artifact)
+    # Unpickled estimators: on-disk size is a reasonable proxy
+    return os.path.getsize(file_path)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of model artifacts keyed by (model_name, version).
+
+    Artifacts are loaded once and shared across Streamlit sessions, so they
+    must be treated as read-only. Each access checks the file's mtime and
+    size; a changed file is reloaded, which means a retrained pipeline or a
+    new version directory is picked up without restarting the app. Memory is
+    bounded by evicting the least recently used artifacts.
+    """
+
+    def __init__(self, base_dir=MODEL_PIPELINE_DIR, max_bytes=256 * 1024**2):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._nbytes = 0
+        self._load_times = {}
+        self._lock = threading.RLock()
+
+    def artifact_path(self, model_name, version, artifact):
+        return os.path.join(self.base_dir, model_name, version, artifact)
+
+    def versions(self, model_name):
+        """
+        List available versions of a model, oldest first (v1, v2, ..., v10).
+        """
+        model_dir = os.path.join(self.base_dir, model_name)
+        if not os.path.isdir(model_dir):
+            return []
+        versions = [
+            name for name in os.listdir(model_dir)
+            if name.startswith("v") and name[1:].isdigit()
+            and os.path.isdir(os.path.join(model_dir, name))
+        ]
+        return sorted(versions, key=lambda name: int(name[1:]))
+
+    def latest_version(self, model_name):
+        versions = self.versions(model_name)
+        if not versions:
+            raise FileNotFoundError(
+                f"No versions found for model '{model_name}' "
+                f"in {self.base_dir}"
+            )
+        return versions[-1]
+
+    def get(self, model_name, version, artifact, loader=None):
+        """
+        Return a loaded artifact, reading it from disk only when it is not
+        cached or the file has changed since it was loaded. loader(path)
+        overrides the extension-based reader.
+        """
+        file_path = self.artifact_path(model_name, version, artifact)
+        signature = file_signature(file_path)
+        key = (model_name, version, artifact)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry["signature"] == signature:
+                self._cache.move_to_end(key)
+                return entry["value"]
+
+            start = time.perf_counter()
+            value = (loader or _read_artifact)(file_path)
+            seconds = time.perf_counter() - start
+            nbytes = _artifact_nbytes(value, file_path)
+
+            if entry is not None:
+                self._nbytes -= entry["nbytes"]
+            self._cache[key] = {
+                "value": value,
+                "signature": signature,
+                "nbytes": nbytes,
+            }
+            self._cache.move_to_end(key)
+            self._nbytes += nbytes
+            self._load_times[key] = {
+                "seconds": seconds,
+                "bytes": nbytes,
+                "loads": self._load_times.get(key, {}).get("loads", 0) + 1,
+            }
+            self._evict()
+            return value
+
+    def _evict(self):
+        # Always keep the most recently used artifact, even if oversized
+        while self._nbytes > self.max_bytes and len(self._cache) > 1:
+            _, entry = self._cache.popitem(last=False)
+            self._nbytes -= entry["nbytes"]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+    def load_report(self):
+        """
+        Per-artifact load latency, size and number of (re)loads.
+        """
+        with self._lock:
+            rows = [
+                {
+                    "model": key[0],
+                    "version": key[1],
+                    "artifact": key[2],
+                    "load_seconds": stats["seconds"],
+                    "bytes": stats["bytes"],
+                    "loads": stats["loads"],
+                    "cached": key in self._cache,
+                }
+                for key, stats in self._load_times.items()
+            ]
+        return pd.DataFrame(
+            rows,
+            columns=["model", "version", "artifact", "load_seconds",
+                     "bytes", "loads", "cached"],
+        )
+
+
+model_registry = ModelRegistry()
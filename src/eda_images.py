@@ -0,0 +1,288 @@
+"""
+Regenerate the EDA figures in outputs/eda_images/ from the current data.
+
+Reproduces the violin plots and categorical bar charts from
+03_DataExploration. Every subplot is a panel rendered on its own in a
+process pool (Agg backend). Rendered panels are kept under
+outputs/cache/eda_panels/, named by a hash of the panel's input columns
+and drawing options, so a rebuild only re-renders panels whose data
+changed. Panels are then tiled into the final images, which are all
+written to a temporary directory first and moved into place only once
+every image has been produced.
+
+    python -m src.eda_images [--jobs N] [--force]
+"""
+import argparse
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.columnar_store import CATEGORY_LABELS, CONTINUOUS_MEASURES
+from src.result_cache import CACHE_DIR, content_hash
+
+EDA_IMAGE_DIR = "outputs/eda_images"
+EDA_DATASET = "outputs/datasets/cleaned/asthma_disease_data_cleaned.csv"
+PANEL_CACHE_DIR = os.path.join(CACHE_DIR, "eda_panels")
+MANIFEST_FILE = "manifest.json"
+TARGET = "Diagnosis"
+
+# Bump when the drawing code changes so cached panels are re-rendered
+PANEL_VERSION = 1
+
+YES_NO = {0: "No", 1: "Yes"}
+ENCODING_MAPS = {
+    "Gender": {0: "Male", 1: "Female"},
+    TARGET: {0: "No asthma", 1: "Asthma"},
+    **{
+        column: dict(enumerate(labels))
+        for column, labels in CATEGORY_LABELS.items()
+    },
+}
+
+# Image name -> panel kind and rendering options (as in the notebook)
+FIGURES = {
+    "violin_plots": {
+        "kind": "violin", "panel_size": (5, 4), "dpi": 90, "columns": 3,
+    },
+    "boxplots": {
+        "kind": "proportion_bar", "panel_size": (5, 4), "dpi": 100,
+        "columns": 3,
+    },
+}
+
+
+def figure_features(df, kind):
+    """
+    Features drawn for a figure kind, in dataset column order.
+    """
+    if kind == "violin":
+        continuous = {"Age", *CONTINUOUS_MEASURES}
+        return [c for c in df.columns if c in continuous]
+    return [
+        c for c in df.columns
+        if c != TARGET and c not in CONTINUOUS_MEASURES and c != "Age"
+    ]
+
+
+def _draw_violin(ax, data, feature):
+    import seaborn as sns
+
+    sns.violinplot(
+        x=TARGET,
+        y=feature,
+        data=data,
+        hue=TARGET,
+        ax=ax,
+        inner="box",
+        palette="Set2",
+        legend=False,
+    )
+    ax.set_title(feature)
+    ax.set_xticks([0, 1])
+    ax.set_xticklabels([ENCODING_MAPS[TARGET][i] for i in [0, 1]])
+
+
+def _draw_proportion_bar(ax, data, feature):
+    import pandas as pd
+
+    target_labels = data[TARGET].map(ENCODING_MAPS[TARGET])
+    feature_labels = data[feature].map(ENCODING_MAPS.get(feature, YES_NO))
+    table = pd.crosstab(target_labels, feature_labels)
+    proportion_table = table.div(table.sum(axis=1), axis=0) * 100
+
+    proportion_table.plot(
+        kind="bar", stacked=False, ax=ax, colormap="tab10", legend=True
+    )
+    ax.set_title(feature)
+    ax.set_ylabel("Proportion (%)")
+    ax.set_ylim(0, 100)
+    ax.legend(title="Legend", fontsize=8)
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=0, ha="center")
+
+
+PANEL_DRAWERS = {
+    "violin": _draw_violin,
+    "proportion_bar": _draw_proportion_bar,
+}
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def render_panel(kind, data, feature, panel_size, dpi, path):
+    """
+    Render one subplot panel to a PNG file (run in a worker process).
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=panel_size, dpi=dpi)
+    try:
+        ax = fig.subplots()
+        PANEL_DRAWERS[kind](ax, data, feature)
+        fig.tight_layout()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fig.savefig(tmp_path, format="png", dpi=dpi)
+        os.replace(tmp_path, path)
+    finally:
+        fig.clear()
+    return path
+
+
+def tile_panels(panel_paths, columns):
+    """
+    Tile equally sized panel PNGs into one RGBA array, row by row.
+    Unused grid cells are left white.
+    """
+    from matplotlib.image import imread
+
+    panels = [imread(path) for path in panel_paths]
+    height, width, channels = panels[0].shape
+    rows = math.ceil(len(panels) / columns)
+    grid = np.ones((rows * height, columns * width, channels),
+                   dtype=panels[0].dtype)
+    for i, panel in enumerate(panels):
+        row, column = divmod(i, columns)
+        grid[row * height:(row + 1) * height,
+             column * width:(column + 1) * width] = panel
+    return grid
+
+
+def _read_manifest(image_dir):
+    try:
+        with open(os.path.join(image_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_eda_images(df=None, image_dir=EDA_IMAGE_DIR,
+                     panel_dir=PANEL_CACHE_DIR, n_jobs=None, force=False):
+    """
+    Regenerate every image in FIGURES; returns counts of rendered and
+    reused panels and the images that were rewritten.
+    """
+    from matplotlib.image import imsave
+
+    if df is None:
+        from src.columnar_store import read_dataset
+
+        df = read_dataset(EDA_DATASET)
+    os.makedirs(panel_dir, exist_ok=True)
+
+    # Plan every panel and its cache file
+    plan = {}
+    for name, spec in FIGURES.items():
+        panels = []
+        for feature in figure_features(df, spec["kind"]):
+            data = df[[feature, TARGET]]
+            key = content_hash(
+                PANEL_VERSION, spec["kind"], spec["panel_size"],
+                spec["dpi"], data,
+            )
+            path = os.path.join(panel_dir, f"{name}-{feature}-{key}.png")
+            panels.append((feature, key, path, data))
+        plan[name] = panels
+
+    todo = [
+        (spec, panel)
+        for name, spec in FIGURES.items()
+        for panel in plan[name]
+        if force or not os.path.exists(panel[2])
+    ]
+    if todo:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker
+        ) as pool:
+            futures = [
+                pool.submit(
+                    render_panel, spec["kind"], data, feature,
+                    spec["panel_size"], spec["dpi"], path,
+                )
+                for spec, (feature, _, path, data) in todo
+            ]
+            for future in futures:
+                future.result()
+
+    # Drop panels rendered for data that no longer exists
+    current = {path for panels in plan.values() for *_, path, _ in panels}
+    for name in FIGURES:
+        for entry in os.scandir(panel_dir):
+            if entry.name.startswith(f"{name}-") \
+                    and entry.path not in current:
+                os.remove(entry.path)
+
+    manifest = {
+        name: [key for _, key, _, _ in panels]
+        for name, panels in plan.items()
+    }
+    previous = _read_manifest(image_dir)
+    changed = [
+        name for name in FIGURES
+        if force
+        or previous.get(name) != manifest[name]
+        or not os.path.exists(os.path.join(image_dir, f"{name}.png"))
+    ]
+
+    if changed:
+        os.makedirs(image_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=image_dir, prefix=".tmp-eda-")
+        try:
+            for name in changed:
+                grid = tile_panels(
+                    [path for _, _, path, _ in plan[name]],
+                    FIGURES[name]["columns"],
+                )
+                buffer = io.BytesIO()
+                imsave(buffer, grid, format="png",
+                       dpi=FIGURES[name]["dpi"])
+                with open(os.path.join(tmp_dir, f"{name}.png"), "wb") as f:
+                    f.write(buffer.getvalue())
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+
+            # Only reached once every image rendered successfully
+            for name in changed:
+                os.replace(
+                    os.path.join(tmp_dir, f"{name}.png"),
+                    os.path.join(image_dir, f"{name}.png"),
+                )
+            os.replace(
+                os.path.join(tmp_dir, MANIFEST_FILE),
+                os.path.join(image_dir, MANIFEST_FILE),
+            )
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return {
+        "rendered": len(todo),
+        "reused": sum(len(p) for p in plan.values()) - len(todo),
+        "images_written": changed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Regenerate the EDA images from the current dataset."
+    )
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Re-render every panel, ignoring the panel cache",
+    )
+    args = parser.parse_args(argv)
+    print(json.dumps(
+        build_eda_images(n_jobs=args.jobs, force=args.force), indent=2
+    ))
+
+
+if __name__ == "__main__":
+    main()
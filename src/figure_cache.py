@@ -0,0 +1,107 @@
+"""
+Server-side cache of rendered figures as encoded PNG bytes.
+
+Streamlit reruns a page script on every widget change. Rather than
+building a matplotlib figure (or decoding a PNG into a float array) each
+time, pages ask figure_cache for PNG bytes and pass them straight to
+st.image:
+
+    png = figure_cache.figure("heatmap", draw_heatmap, corr_df)
+    st.image(png)
+
+Figures are keyed by a content hash of the plot name, data and drawing
+parameters; image files by their mtime and size. Figures are built as
+standalone matplotlib Figure objects (not through pyplot), so nothing is
+left registered with pyplot, and they are cleared as soon as they are
+encoded. Memory is bounded by evicting the least recently used images.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from matplotlib.figure import Figure
+
+from src.result_cache import content_hash
+
+
+class FigureCache:
+    """
+    Process-wide LRU cache of PNG bytes, bounded by total size.
+    """
+
+    def __init__(self, max_bytes=32 * 1024**2):
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "renders": 0}
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def _lookup(self, key):
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+            return png
+
+    def _store(self, key, png):
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._nbytes -= len(old)
+            self._cache[key] = png
+            self._nbytes += len(png)
+            # Always keep the most recent image, even if oversized
+            while self._nbytes > self.max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._nbytes -= len(evicted)
+        return png
+
+    def figure(self, name, draw, *data, figsize=(8, 6), dpi=100,
+               **params):
+        """
+        PNG bytes of the figure drawn by draw(fig, *data, **params).
+
+        draw receives an empty Figure and adds its own axes. The result is
+        rendered once per distinct (name, data, params, figsize, dpi).
+        """
+        key = ("figure", content_hash(name, data, params, figsize, dpi))
+        png = self._lookup(key)
+        if png is not None:
+            return png
+
+        fig = Figure(figsize=figsize, dpi=dpi)
+        try:
+            draw(fig, *data, **params)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+        finally:
+            fig.clear()
+        with self._lock:
+            self.stats["renders"] += 1
+        return self._store(key, buffer.getvalue())
+
+    def file(self, path):
+        """
+        Raw bytes of an image file, re-read only when the file changes.
+        """
+        stat = os.stat(path)
+        key = ("file", path, stat.st_mtime_ns, stat.st_size)
+        png = self._lookup(key)
+        if png is not None:
+            return png
+        with open(path, "rb") as f:
+            return self._store(key, f.read())
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+
+figure_cache = FigureCache()
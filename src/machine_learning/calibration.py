@@ -0,0 +1,247 @@
+"""
+Probability calibration for the modeling pipeline.
+
+The v1 model is trained on SMOTE-balanced data with class_weight=
+"balanced", so its predict_proba scores are centred on a 50% prevalence
+rather than the ~5% in the data. They rank patients but are not risks.
+This module fits a monotone map from raw score to calibrated risk on
+out-of-fold scores of the train split. Each fold refits a clone of the
+modeling pipeline, so the scores are honest. Three methods are
+available:
+
+    isotonic     isotonic regression on the out-of-fold scores
+    platt        logistic regression on the logit of the score
+    prior_shift  Bayes correction of the odds from the balanced training
+                 prior to the observed prevalence (nothing is fitted)
+
+"auto" keeps whichever has the lowest cross-validated Brier score. Every
+method is stored as a short piecewise-linear lookup table (score knots
+and calibrated values) in calibration.json, so applying it costs one
+np.interp. The file also holds Brier scores and reliability curves for
+the train (out-of-fold) and test splits. It is tagged with the model
+checksum and bundled for the prediction page.
+
+    python -m src.machine_learning.calibration v1 --method auto
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.calibration import calibration_curve
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss
+from sklearn.model_selection import StratifiedKFold
+
+from src.columnar_store import file_sha256
+from src.data_management import MODEL_PIPELINE_DIR, load_pkl_file
+
+CALIBRATION_FILE = "calibration.json"
+METHODS = ["isotonic", "platt", "prior_shift"]
+# Prevalence the model effectively trains on after SMOTE (ratio 1.0)
+BALANCED_PRIOR = 0.5
+# Knots of the Platt / prior-shift tables, evenly spaced in log-odds
+GRID_LOGIT = np.linspace(-12, 12, 97)
+RELIABILITY_BINS = 10
+
+
+def _logit(p):
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return np.log(p / (1 - p))
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-z))
+
+
+class Calibrator:
+    """
+    Piecewise-linear map from raw score to calibrated probability.
+    """
+
+    def __init__(self, method, knots, values):
+        self.method = method
+        self.knots = np.asarray(knots, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+    def __call__(self, scores):
+        return np.interp(scores, self.knots, self.values)
+
+    @classmethod
+    def fit(cls, method, scores, y, train_prior=BALANCED_PRIOR):
+        scores = np.asarray(scores, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if method == "isotonic":
+            iso = IsotonicRegression(
+                y_min=0.0, y_max=1.0, out_of_bounds="clip"
+            ).fit(scores, y)
+            return cls(method, iso.X_thresholds_, iso.y_thresholds_)
+
+        grid = _sigmoid(GRID_LOGIT)
+        if method == "platt":
+            lr = LogisticRegression(C=1e6).fit(_logit(scores)[:, None], y)
+            values = lr.predict_proba(_logit(grid)[:, None])[:, 1]
+        elif method == "prior_shift":
+            prior = y.mean()
+            shift = _logit(prior) - _logit(train_prior)
+            values = _sigmoid(GRID_LOGIT + shift)
+        else:
+            raise ValueError(
+                f"Unknown calibration method '{method}', expected one of "
+                f"{METHODS}"
+            )
+        return cls(method, grid, values)
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "knots": self.knots.tolist(),
+            "values": self.values.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["method"], data["knots"], data["values"])
+
+
+def out_of_fold_scores(pipeline, X, y, n_splits=5, random_state=0):
+    """
+    Raw positive-class scores of X, each from a clone of pipeline fitted
+    without that row's fold.
+    """
+    y = np.ravel(y)
+    scores = np.empty(len(X))
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True,
+                         random_state=random_state)
+    for train_idx, test_idx in cv.split(X, y):
+        model = clone(pipeline).fit(X.iloc[train_idx], y[train_idx])
+        scores[test_idx] = model.predict_proba(X.iloc[test_idx])[:, 1]
+    return scores
+
+
+def cross_validated_brier(method, scores, y, n_splits=5, random_state=0):
+    """
+    Brier score of a calibration method fitted and scored on disjoint
+    folds of (already out-of-fold) scores.
+    """
+    y = np.ravel(y)
+    calibrated = np.empty(len(scores))
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True,
+                         random_state=random_state)
+    for train_idx, test_idx in cv.split(scores.reshape(-1, 1), y):
+        calibrator = Calibrator.fit(method, scores[train_idx], y[train_idx])
+        calibrated[test_idx] = calibrator(scores[test_idx])
+    return float(brier_score_loss(y, calibrated))
+
+
+def reliability(y, probabilities, n_bins=RELIABILITY_BINS):
+    """
+    Mean predicted probability against observed frequency per quantile
+    bin of the predictions.
+    """
+    observed, predicted = calibration_curve(
+        np.ravel(y), probabilities, n_bins=n_bins, strategy="quantile"
+    )
+    return {"predicted": predicted.tolist(), "observed": observed.tolist()}
+
+
+def fit_calibration(pipeline, X_train, y_train, X_test, y_test,
+                    method="auto", n_splits=5, random_state=0):
+    """
+    Fit a calibrator on out-of-fold train scores. Returns the calibrator
+    and a report of Brier scores and reliability curves.
+    """
+    y_train = np.ravel(y_train)
+    y_test = np.ravel(y_test)
+    oof = out_of_fold_scores(pipeline, X_train, y_train, n_splits,
+                             random_state)
+    cv_brier = {
+        m: cross_validated_brier(m, oof, y_train, n_splits, random_state)
+        for m in METHODS
+    }
+    if method == "auto":
+        method = min(cv_brier, key=cv_brier.get)
+    calibrator = Calibrator.fit(method, oof, y_train)
+
+    test_raw = pipeline.predict_proba(X_test)[:, 1]
+    test_calibrated = calibrator(test_raw)
+    report = {
+        "prevalence": {"train": float(y_train.mean()),
+                       "test": float(y_test.mean())},
+        "cv_brier": cv_brier,
+        "brier": {
+            "train_oof": {
+                "raw": float(brier_score_loss(y_train, oof)),
+                "calibrated": cv_brier[method],
+            },
+            "test": {
+                "raw": float(brier_score_loss(y_test, test_raw)),
+                "calibrated": float(
+                    brier_score_loss(y_test, test_calibrated)
+                ),
+            },
+        },
+        "reliability": {
+            "test_raw": reliability(y_test, test_raw),
+            "test_calibrated": reliability(y_test, test_calibrated),
+        },
+    }
+    return calibrator, report
+
+
+def load_calibration(path, model_sha256=None):
+    """
+    Calibrator and report from a calibration.json. Returns None if the
+    file is missing or was fitted for a different model.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    if model_sha256 is not None and data["model_sha256"] != model_sha256:
+        return None
+    return Calibrator.from_dict(data["calibrator"]), data["report"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fit probability calibration for a model version."
+    )
+    parser.add_argument("version", help="e.g. v1")
+    parser.add_argument("--model-name", default="predict_asthma")
+    parser.add_argument("--base-dir", default=MODEL_PIPELINE_DIR)
+    parser.add_argument("--method", default="auto",
+                        choices=["auto", *METHODS])
+    parser.add_argument("--splits", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    version_dir = os.path.join(args.base_dir, args.model_name, args.version)
+    model_path = f"{version_dir}/clf_pipeline_model.pkl"
+    pipeline = load_pkl_file(model_path)
+    splits = {
+        name: pd.read_csv(f"{version_dir}/{name}.csv")
+        for name in ("X_train", "y_train", "X_test", "y_test")
+    }
+    calibrator, report = fit_calibration(
+        pipeline, splits["X_train"], splits["y_train"],
+        splits["X_test"], splits["y_test"],
+        method=args.method, n_splits=args.splits,
+    )
+
+    path = os.path.join(version_dir, CALIBRATION_FILE)
+    with open(path, "w") as f:
+        json.dump({
+            "model_sha256": file_sha256(model_path),
+            "calibrator": calibrator.to_dict(),
+            "report": report,
+        }, f, indent=2)
+    print(f"Wrote {path} ({calibrator.method}, "
+          f"{len(calibrator.knots)} knots)")
+    print(json.dumps(report["brier"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
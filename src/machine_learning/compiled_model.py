@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.data_management import EDUCATION_LEVEL_MAP, ETHNICITY_MAP
+
+CATEGORY_MAPS = {
+    "Ethnicity": ETHNICITY_MAP,
+    "EducationLevel": EDUCATION_LEVEL_MAP,
+}
+
+
+def linear_stage(pipeline_model):
+    """
+    Scaler mean/scale, selected-feature mask and logistic regression
+    coefficients of a modeling pipeline. Raises ValueError if the pipeline
+    is not scaler / selection / binary logistic model.
+    """
+    n_features = len(pipeline_model.feature_names_in_)
+    scaler_mean = np.zeros(n_features)
+    scaler_scale = np.ones(n_features)
+    support = np.ones(n_features, dtype=bool)
+    model = None
+    for name, step in pipeline_model.steps:
+        if hasattr(step, "fit_resample"):
+            continue  # samplers such as SMOTE only act during fit
+        if isinstance(step, StandardScaler):
+            if step.with_mean:
+                scaler_mean = step.mean_.astype(float)
+            if step.with_std:
+                scaler_scale = step.scale_.astype(float)
+        elif hasattr(step, "get_support"):
+            support = support.copy()
+            support[support] = step.get_support()
+        elif isinstance(step, LogisticRegression) or (
+            isinstance(step, SGDClassifier) and step.loss == "log_loss"
+        ):
+            model = step
+        else:
+            raise ValueError(
+                f"Cannot compile step '{name}' ({type(step).__name__})."
+            )
+    if model is None or model.coef_.shape[0] != 1:
+        raise ValueError(
+            "The modeling pipeline must end in a binary "
+            "LogisticRegression (or log-loss SGDClassifier) to be "
+            "compiled."
+        )
+    return {
+        "scaler_mean": scaler_mean,
+        "scaler_scale": scaler_scale,
+        "support": support,
+        "coef": model.coef_[0].astype(float),
+        "intercept": float(model.intercept_[0]),
+    }
+
+
+class CompiledLogisticModel:
+    """
+    Flat NumPy version of the predict_asthma modeling pipeline.
+
+    Holds the scaler mean/scale, selected-feature mask and logistic
+    regression coefficients extracted from the fitted pipeline, so a
+    patient is scored with a few vectorized operations instead of walking
+    the sklearn Pipeline. The v1 model was trained on raw patient values,
+    so inputs are raw values for `features` (category collapsing is
+    applied here).
+    """
+
+    def __init__(self, features, scaler_mean, scaler_scale, support, coef,
+                 intercept):
+        self.features = list(features)
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.support = support
+        self.coef = coef
+        self.intercept = intercept
+        self.selected_features = [
+            f for f, keep in zip(self.features, support) if keep
+        ]
+
+    @classmethod
+    def from_pipeline(cls, pipeline_model):
+        """
+        Extract the fitted parameters of the modeling pipeline into flat
+        arrays.
+        """
+        return cls(
+            features=pipeline_model.feature_names_in_,
+            **linear_stage(pipeline_model),
+        )
+
+    def to_array(self, records):
+        """
+        Build the raw feature matrix from a DataFrame or list of dicts.
+        """
+        if not isinstance(records, pd.DataFrame):
+            # Plain dicts skip DataFrame construction on the request path
+            maps = [CATEGORY_MAPS.get(feature) for feature in self.features]
+            return np.array(
+                [
+                    [
+                        record[feature] if mapping is None
+                        else mapping.get(record[feature], record[feature])
+                        for feature, mapping in zip(self.features, maps)
+                    ]
+                    for record in records
+                ],
+                dtype=float,
+            ).reshape(len(records), len(self.features))
+        X = np.empty((len(records), len(self.features)), dtype=float)
+        for i, feature in enumerate(self.features):
+            column = records[feature].to_numpy()
+            mapping = CATEGORY_MAPS.get(feature)
+            if mapping is not None:
+                column = np.array([mapping.get(v, v) for v in column])
+            X[:, i] = column
+        return X
+
+    def transform(self, X):
+        """
+        Scaled, selected model inputs for a raw feature matrix.
+        """
+        X = np.asarray(X, dtype=float)
+        X = (X - self.scaler_mean) / self.scaler_scale
+        return X[:, self.support]
+
+    def decision_function(self, X):
+        return self.transform(X) @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        """
+        Asthma probability (positive class only) for each row of X.
+        """
+        return 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+
+
+def verify_compiled(compiled, X, pipeline_model, atol=1e-9):
+    """
+    Check the compiled model against pipeline_model.predict_proba on the
+    model's own inputs (e.g. the bundled X_test). Returns the maximum
+    absolute difference, raising ValueError when it exceeds atol.
+    """
+    expected = pipeline_model.predict_proba(
+        X[pipeline_model.feature_names_in_]
+    )[:, 1]
+    actual = compiled.predict_proba(compiled.to_array(X))
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if max_diff > atol:
+        raise ValueError(
+            f"Compiled model differs from the pipeline by {max_diff:.3g} "
+            f"(tolerance {atol:.1g})."
+        )
+    return max_diff
@@ -0,0 +1,290 @@
+"""
+Data drift monitoring against the training distribution.
+
+At bundle build time a compact reference sketch is taken from X_train:
+quantile bin edges and bin counts for every continuous feature, and
+value counts for every binary one. Scored batches are then binned
+against the same edges as they stream past, so the state is a few
+counts per feature, whatever the number of rows seen. From those counts
+DriftMonitor reports, per feature:
+
+    psi    population stability index (< 0.1 stable, > 0.25 drifted)
+    ks     Kolmogorov-Smirnov distance between the binned CDFs
+    chi2   chi-square test of homogeneity of the bin counts
+
+The state is a small JSON file, which the Data Drift page reads without
+touching any raw data. It carries a copy of the reference and is keyed on
+the checksum of the model the bundle was built from: once the bundle is
+rebuilt for a different model, the next update starts a fresh state
+against the new reference.
+
+    python -m src.machine_learning.score patients.csv out.csv --drift
+    python -m src.machine_learning.drift update patients.csv
+    python -m src.machine_learning.drift report
+"""
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+
+REFERENCE_FILE = "drift_reference.json"
+DRIFT_DIR = "outputs/monitoring"
+STATE_FILE = "drift_state.json"
+N_BINS = 20
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# Stops empty bins making PSI infinite
+PSI_EPSILON = 1e-4
+
+
+def build_reference(X, n_bins=N_BINS):
+    """
+    Reference sketch of a training frame: bin edges and counts for
+    continuous columns, value counts for 0/1 columns.
+    """
+    features = {}
+    for column in X.columns:
+        values = X[column].to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if np.isin(values, (0.0, 1.0)).all():
+            features[column] = {
+                "kind": "binary",
+                "edges": [0.5],
+            }
+        else:
+            quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1))
+            features[column] = {
+                "kind": "continuous",
+                "edges": np.unique(quantiles[1:-1]).tolist(),
+            }
+        edges = np.asarray(features[column]["edges"])
+        features[column]["counts"] = _bin_counts(values, edges).tolist()
+    return {"rows": len(X), "features": features}
+
+
+def _bin_counts(values, edges):
+    # Bin i holds edges[i - 1] <= value < edges[i]
+    return np.bincount(
+        np.searchsorted(edges, values, side="right"),
+        minlength=len(edges) + 1,
+    )
+
+
+def drift_state_path(model_name, version, base_dir=DRIFT_DIR):
+    return os.path.join(base_dir, model_name, version, STATE_FILE)
+
+
+def psi(expected, actual):
+    p = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    q = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+class DriftMonitor:
+    """
+    Running bin counts of incoming data against a reference sketch.
+    """
+
+    def __init__(self, reference, counts=None, missing=None, batches=0,
+                 updated=None, model_sha256=None):
+        self.reference = reference
+        self.model_sha256 = model_sha256
+        features = reference["features"]
+        self.edges = {
+            column: np.asarray(f["edges"]) for column, f in features.items()
+        }
+        self.counts = {
+            column: np.asarray(
+                (counts or {}).get(column, np.zeros(len(f["counts"]))),
+                dtype=np.int64,
+            )
+            for column, f in features.items()
+        }
+        self.missing = {
+            column: int((missing or {}).get(column, 0))
+            for column in features
+        }
+        self.batches = batches
+        self.updated = updated
+
+    @classmethod
+    def load(cls, path, reference=None, model_sha256=None):
+        """
+        Monitor from a saved state. A fresh one for `reference` is
+        returned instead if there is no state at path yet, or if
+        model_sha256 is given and the state was kept for another model.
+        """
+        state = None
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+        if state is not None and model_sha256 is not None and (
+            state.get("model_sha256") != model_sha256
+        ):
+            state = None
+        if state is None:
+            if reference is None:
+                raise FileNotFoundError(
+                    f"No drift state for this model at {path}"
+                )
+            return cls(reference, model_sha256=model_sha256)
+        return cls(
+            state["reference"], state["counts"], state["missing"],
+            state["batches"], state["updated"], state.get("model_sha256"),
+        )
+
+    @classmethod
+    def for_bundle(cls, path, bundle):
+        """
+        The state at path if it was kept for the bundle's model, else a
+        fresh monitor against the bundle's reference.
+        """
+        return cls.load(path, bundle.drift_reference, bundle.model_sha256)
+
+    @property
+    def rows(self):
+        return int(max((c.sum() for c in self.counts.values()), default=0))
+
+    def update(self, df):
+        """
+        Add a batch. df needs the reference columns as produced by
+        clean_patient_data; extra columns are ignored.
+        """
+        for column, edges in self.edges.items():
+            values = df[column].to_numpy(dtype=float)
+            missing = np.isnan(values)
+            self.missing[column] += int(missing.sum())
+            self.counts[column] += _bin_counts(values[~missing], edges)
+        self.batches += 1
+        self.updated = datetime.datetime.now(
+            datetime.timezone.utc
+        ).isoformat(timespec="seconds")
+        return self
+
+    def save(self, path):
+        state = {
+            "reference": self.reference,
+            "counts": {c: v.tolist() for c, v in self.counts.items()},
+            "missing": self.missing,
+            "batches": self.batches,
+            "updated": self.updated,
+            "model_sha256": self.model_sha256,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def distribution(self, column):
+        """
+        Reference and current bin proportions of one feature.
+        """
+        import pandas as pd
+
+        edges = self.edges[column]
+        if self.reference["features"][column]["kind"] == "binary":
+            index = ["0", "1"]
+        else:
+            bounds = [-np.inf, *edges, np.inf]
+            index = [
+                f"[{low:.3g}, {high:.3g})"
+                for low, high in zip(bounds[:-1], bounds[1:])
+            ]
+        reference = np.asarray(self.reference["features"][column]["counts"])
+        current = self.counts[column]
+        return pd.DataFrame(
+            {
+                "reference": reference / max(reference.sum(), 1),
+                "current": current / max(current.sum(), 1),
+            },
+            index=index,
+        )
+
+    def report(self):
+        """
+        One row per feature with PSI, KS and chi-square statistics and a
+        status ("stable", "warning", "drift" or "no data").
+        """
+        import pandas as pd
+        from scipy.stats import chi2_contingency, kstwobign
+
+        rows = []
+        for column, f in self.reference["features"].items():
+            expected = np.asarray(f["counts"], dtype=float)
+            actual = self.counts[column].astype(float)
+            n, m = expected.sum(), actual.sum()
+            row = {"feature": column, "kind": f["kind"], "rows": int(m),
+                   "missing": self.missing[column]}
+            if m == 0:
+                rows.append({**row, "status": "no data"})
+                continue
+            ks = float(np.max(np.abs(
+                np.cumsum(expected) / n - np.cumsum(actual) / m
+            )))
+            observed = np.vstack([expected, actual])
+            observed = observed[:, observed.sum(axis=0) > 0]
+            if observed.shape[1] > 1:
+                chi2, chi2_p, _, _ = chi2_contingency(observed)
+            else:
+                chi2, chi2_p = 0.0, 1.0
+            row.update({
+                "psi": psi(expected, actual),
+                "ks": ks,
+                "ks_p": float(kstwobign.sf(ks * np.sqrt(n * m / (n + m)))),
+                "chi2": float(chi2),
+                "chi2_p": float(chi2_p),
+            })
+            row["status"] = (
+                "drift" if row["psi"] > PSI_ALERT
+                else "warning" if row["psi"] > PSI_WARN
+                else "stable"
+            )
+            rows.append(row)
+        return pd.DataFrame(rows, columns=[
+            "feature", "kind", "rows", "missing", "psi", "ks", "ks_p",
+            "chi2", "chi2_p", "status",
+        ])
+
+
+def main(argv=None):
+    import pandas as pd
+
+    from src.data_management import MODEL_PIPELINE_DIR, clean_patient_data
+    from src.machine_learning.model_bundle import ModelBundle
+
+    parser = argparse.ArgumentParser(
+        description="Update or report data drift for a model version."
+    )
+    parser.add_argument("command", choices=["update", "report", "reset"])
+    parser.add_argument("inputs", nargs="*", help="Patient CSVs (update)")
+    parser.add_argument("--model-name", default="predict_asthma")
+    parser.add_argument("--version", default="v1")
+    parser.add_argument("--base-dir", default=MODEL_PIPELINE_DIR)
+    parser.add_argument("--state", help="Drift state JSON")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    state = args.state or drift_state_path(args.model_name, args.version)
+    bundle = ModelBundle.open(args.model_name, args.version, args.base_dir)
+    if args.command == "reset":
+        DriftMonitor(
+            bundle.drift_reference, model_sha256=bundle.model_sha256
+        ).save(state)
+        print(f"Reset {state}")
+        return
+
+    monitor = DriftMonitor.for_bundle(state, bundle)
+    if args.command == "update":
+        for path in args.inputs:
+            for chunk in pd.read_csv(path, chunksize=args.chunksize):
+                monitor.update(clean_patient_data(chunk))
+        monitor.save(state)
+        print(f"Updated {state} ({monitor.rows} rows)")
+    print(monitor.report().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
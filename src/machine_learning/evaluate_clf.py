@@ -1,17 +1,94 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import (
+    auc,
+    average_precision_score,
+    classification_report,
+    confusion_matrix,
+    precision_recall_curve,
+    roc_curve,
+)
+from src.machine_learning.thresholds import metrics_at, threshold_curve
+from src.tracing import traced
 
+SWEEP_THRESHOLDS = np.round(np.arange(0.05, 1.0, 0.05), 2)
 
-# Guidance from "05_PredictingAsthma" but adapted to show data frames
-def confusion_matrix_and_report(X, y, pipeline, label_map):
-    # Predict
+
+def evaluate_split(X, y, pipeline, label_map):
+    """
+    Precompute everything the prediction page shows for one split:
+    confusion matrix, classification report, ROC and precision-recall
+    curves, and a threshold sweep.
+    """
+    y = np.ravel(y)
     y_pred = pipeline.predict(X)
+    y_score = pipeline.predict_proba(X)[:, 1]
+
+    fpr, tpr, roc_thresholds = roc_curve(y, y_score)
+    precision, recall, pr_thresholds = precision_recall_curve(y, y_score)
+
+    curve = threshold_curve(y, y_score)
+    sweep = [
+        {
+            "threshold": float(threshold),
+            **{
+                key: int(row[key]) for key in ("tp", "fp", "tn", "fn")
+            },
+            "precision": float(row["precision"]),
+            "recall": float(row["recall"]),
+        }
+        for threshold in SWEEP_THRESHOLDS
+        for row in [metrics_at(curve, threshold)]
+    ]
 
+    return {
+        "confusion_matrix": confusion_matrix(
+            y_true=y, y_pred=y_pred
+        ).tolist(),
+        "report": classification_report(
+            y, y_pred, target_names=label_map, output_dict=True
+        ),
+        "roc": {
+            "fpr": fpr.tolist(),
+            "tpr": tpr.tolist(),
+            # roc_curve starts at +inf, which JSON cannot hold
+            "thresholds": np.minimum(roc_thresholds, 1.0).tolist(),
+            "auc": float(auc(fpr, tpr)),
+        },
+        "pr": {
+            "precision": precision.tolist(),
+            "recall": recall.tolist(),
+            "thresholds": pr_thresholds.tolist(),
+            "average_precision": float(
+                average_precision_score(y, y_score)
+            ),
+        },
+        "threshold_sweep": sweep,
+        # Raw scores so thresholds can be explored without re-predicting
+        "y_score": y_score.tolist(),
+    }
+
+
+def compute_evaluation(X_train, y_train, X_test, y_test, pipeline,
+                       label_map, model_sha256=None):
+    """
+    Evaluation results for both splits, tagged with the model checksum so
+    they can be reused until the model changes.
+    """
+    return {
+        "model_sha256": model_sha256,
+        "label_map": list(label_map),
+        "train": evaluate_split(X_train, y_train, pipeline, label_map),
+        "test": evaluate_split(X_test, y_test, pipeline, label_map),
+    }
+
+
+def show_confusion_matrix_and_report(cm, report_dict, label_map):
     # Confusion matrix
     st.write("--- Confusion Matrix ---")
     cm_df = pd.DataFrame(
-        confusion_matrix(y_true=y, y_pred=y_pred),
+        cm,
         columns=[f"Predicted {label}" for label in label_map],
         index=[f"Actual {label}" for label in label_map],
     )
@@ -19,9 +96,6 @@ def confusion_matrix_and_report(X, y, pipeline, label_map):
 
     # Classification report with only precision and recall
     st.write("--- Precision & Recall ---")
-    report_dict = classification_report(
-        y, y_pred, target_names=label_map, output_dict=True
-    )
     # Convert to DataFrame
     report_df = pd.DataFrame(report_dict).transpose()
     report_df = report_df[
@@ -31,10 +105,50 @@ def confusion_matrix_and_report(X, y, pipeline, label_map):
     st.dataframe(report_df)
 
 
-def clf_performance(X_train, y_train, X_test, y_test, pipeline, label_map):
+# Guidance from "05_PredictingAsthma" but adapted to show data frames
+def confusion_matrix_and_report(X, y, pipeline, label_map):
+    # Predict
+    y_pred = pipeline.predict(X)
+
+    show_confusion_matrix_and_report(
+        confusion_matrix(y_true=y, y_pred=y_pred),
+        classification_report(
+            y, y_pred, target_names=label_map, output_dict=True
+        ),
+        label_map,
+    )
+
+
+@traced()
+def clf_performance(X_train, y_train, X_test, y_test, pipeline, label_map,
+                    evaluation=None, model_sha256=None):
+    """
+    Show train and test performance. Precomputed evaluation results are
+    used when they were produced for this model (matching checksum);
+    otherwise the pipeline is run on both splits.
+    """
+    precomputed = (
+        evaluation is not None
+        and model_sha256 is not None
+        and evaluation.get("model_sha256") == model_sha256
+    )
 
     st.write("#### Train Set ####")
-    confusion_matrix_and_report(X_train, y_train, pipeline, label_map)
+    if precomputed:
+        show_confusion_matrix_and_report(
+            evaluation["train"]["confusion_matrix"],
+            evaluation["train"]["report"],
+            label_map,
+        )
+    else:
+        confusion_matrix_and_report(X_train, y_train, pipeline, label_map)
 
     st.write("#### Test Set ####")
-    confusion_matrix_and_report(X_test, y_test, pipeline, label_map)
+    if precomputed:
+        show_confusion_matrix_and_report(
+            evaluation["test"]["confusion_matrix"],
+            evaluation["test"]["report"],
+            label_map,
+        )
+    else:
+        confusion_matrix_and_report(X_test, y_test, pipeline, label_map)
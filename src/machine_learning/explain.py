@@ -0,0 +1,186 @@
+"""
+Per-patient explanations for the modeling pipeline.
+
+For the exported scaler / selection / LogisticRegression pipeline the
+log-odds split exactly into one term per feature: coefficient x scaled
+value. The whole batch is explained with one element-wise product, and
+intercept + sum(contributions) reproduces the model's decision function.
+The scaler centres every feature on its training mean, so a contribution
+is relative to an average training patient.
+
+Other models (e.g. tree candidates from the hyperparameter search) fall
+back to a model-agnostic estimate. A feature's contribution is the
+change in log-odds when that feature alone is replaced by values from a
+background sample of the training data. All (row, feature, background)
+perturbations of a block of rows are scored in one predict_proba call.
+The background sample is drawn once per training set and cached. These
+contributions are not exactly additive.
+
+Inputs are the modeling pipeline's inputs, i.e. the output of
+model_inputs (or the X_train / X_test splits).
+
+    python -m src.machine_learning.score patients.csv out.csv --explain 3
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.machine_learning.compiled_model import linear_stage
+from src.result_cache import content_hash
+
+BACKGROUND_SIZE = 50
+BACKGROUND_CACHE_SIZE = 8
+# Rows per predict_proba call in the fallback (rows x features x background)
+MAX_EVAL_ROWS = 200_000
+# Tree models often predict exactly 0 or 1; clipping keeps their log-odds
+# (and so the fallback contributions) within about +-9
+PROBA_CLIP = 1e-4
+
+_background_cache = OrderedDict()
+_background_lock = threading.Lock()
+
+
+def background_sample(X, n_samples=BACKGROUND_SIZE, random_state=0):
+    """
+    Rows sampled without replacement from X, cached by the content of X.
+    """
+    key = content_hash(X, n_samples, random_state)
+    with _background_lock:
+        sample = _background_cache.get(key)
+        if sample is not None:
+            _background_cache.move_to_end(key)
+            return sample
+
+    rng = np.random.default_rng(random_state)
+    n = min(n_samples, len(X))
+    sample = np.asarray(X, dtype=float)[rng.choice(len(X), n, replace=False)]
+    with _background_lock:
+        _background_cache[key] = sample
+        while len(_background_cache) > BACKGROUND_CACHE_SIZE:
+            _background_cache.popitem(last=False)
+    return sample
+
+
+def top_drivers(contributions, k=3):
+    """
+    The k largest contributions (by absolute value) of each row, as
+    driver_i / contribution_i column pairs.
+    """
+    values = contributions.to_numpy()
+    k = min(k, values.shape[1])
+    top = np.argpartition(-np.abs(values), k - 1, axis=1)[:, :k]
+    top_values = np.take_along_axis(values, top, axis=1)
+    order = np.argsort(-np.abs(top_values), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_values = np.take_along_axis(top_values, order, axis=1)
+
+    names = np.asarray(contributions.columns)
+    out = {}
+    for i in range(k):
+        out[f"driver_{i + 1}"] = names[top[:, i]]
+        out[f"contribution_{i + 1}"] = top_values[:, i]
+    return pd.DataFrame(out, index=contributions.index)
+
+
+class Explainer:
+    """
+    Log-odds contributions of each feature for a fitted modeling pipeline.
+
+    method is "linear" (exact) when the pipeline is a scaler / selection /
+    logistic model, otherwise "background". The background fallback needs
+    `background`, usually X_train.
+    """
+
+    def __init__(self, pipeline_model, background=None,
+                 n_background=BACKGROUND_SIZE, random_state=0):
+        self.pipeline = pipeline_model
+        self.features = list(pipeline_model.feature_names_in_)
+        try:
+            self.linear = linear_stage(pipeline_model)
+        except ValueError:
+            self.linear = None
+        if self.linear is not None:
+            self.method = "linear"
+            self.background = None
+            self.base_value = self.linear["intercept"]
+            return
+
+        if background is None:
+            raise ValueError(
+                "A background sample is needed to explain "
+                f"{type(pipeline_model[-1]).__name__} models."
+            )
+        self.method = "background"
+        self.background = background_sample(
+            background[self.features], n_background, random_state
+        )
+        self.base_value = float(self._log_odds(self.background).mean())
+
+    def _log_odds(self, X):
+        proba = self.pipeline.predict_proba(
+            pd.DataFrame(X, columns=self.features)
+        )[:, 1]
+        proba = np.clip(proba, PROBA_CLIP, 1 - PROBA_CLIP)
+        return np.log(proba / (1 - proba))
+
+    def _background_contributions(self, X):
+        n_features = len(self.features)
+        n_background = len(self.background)
+        block = max(1, MAX_EVAL_ROWS // (n_features * n_background))
+        out = np.empty_like(X)
+        for start in range(0, len(X), block):
+            rows = X[start:start + block]
+            n = len(rows)
+            # (row, feature, background) perturbations, feature j of each
+            # copy replaced by the background value
+            perturbed = np.broadcast_to(
+                rows[:, None, None, :], (n, n_features, n_background,
+                                         n_features)
+            ).copy()
+            feature_index = np.arange(n_features)
+            perturbed[:, feature_index, :, feature_index] = (
+                self.background.T[:, None, :]
+            )
+            expected = self._log_odds(
+                perturbed.reshape(-1, n_features)
+            ).reshape(n, n_features, n_background).mean(axis=2)
+            out[start:start + n] = self._log_odds(rows)[:, None] - expected
+        return out
+
+    def contributions(self, X):
+        """
+        Per-row log-odds contribution of every model feature (features
+        dropped by selection get 0).
+        """
+        values = X[self.features].to_numpy(dtype=float)
+        if self.method == "linear":
+            stage = self.linear
+            scaled = (values - stage["scaler_mean"]) / stage["scaler_scale"]
+            contributions = np.zeros_like(scaled)
+            contributions[:, stage["support"]] = (
+                scaled[:, stage["support"]] * stage["coef"]
+            )
+        else:
+            contributions = self._background_contributions(values)
+        return pd.DataFrame(contributions, columns=self.features,
+                            index=X.index)
+
+    def drivers(self, X, k=3):
+        return top_drivers(self.contributions(X), k)
+
+    def explain(self, X, k=3):
+        """
+        Top-k drivers per row, plus the log-odds and probability they
+        explain (base_value + contributions for the linear method).
+        """
+        contributions = self.contributions(X)
+        drivers = top_drivers(contributions, k)
+        if self.method == "linear":
+            log_odds = self.base_value + contributions.to_numpy().sum(axis=1)
+        else:
+            log_odds = self._log_odds(X[self.features].to_numpy(dtype=float))
+        drivers.insert(0, "log_odds", log_odds)
+        drivers.insert(1, "asthma_probability", 1 / (1 + np.exp(-log_odds)))
+        return drivers
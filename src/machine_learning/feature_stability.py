@@ -0,0 +1,163 @@
+"""
+Cross-validated feature selection stability and permutation importance.
+
+The "features of importance" step in 05_PredictingAsthma took the
+SelectFromModel (median threshold) result of a single fit. Here a clone
+of the version's modeling pipeline is refit on every fold of a repeated
+stratified K-fold of its own X_train / y_train. For each fold we record
+which features the pipeline's selection step kept and the permutation
+importance of every feature on the held-out part. A pipeline without a
+selection step (such as v1) gets the notebook's rule instead: the
+features whose fold-model coefficient is at least the median, as
+SelectFromModel(threshold="median") would keep. Folds run in parallel
+with joblib; the training matrix is dumped once and handed to the workers
+as a read-only memmap, so it is shared rather than copied.
+
+The result is one row per feature with its selection frequency and the
+distribution of its importance across folds, written as
+feature_stability.csv next to the model and bundled for the prediction
+page.
+
+    python -m src.machine_learning.feature_stability v1
+"""
+import argparse
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.feature_selection import SelectFromModel
+from sklearn.inspection import permutation_importance
+from sklearn.model_selection import RepeatedStratifiedKFold
+
+from src.data_management import MODEL_PIPELINE_DIR, load_pkl_file
+
+STABILITY_FILE = "feature_stability.csv"
+# Threshold of the "features of importance" step in 05_PredictingAsthma
+SELECTION_THRESHOLD = "median"
+
+
+def selected_features(pipeline, n_features):
+    """
+    Mask of the features a fitted pipeline keeps. Selection steps are
+    found as in compiled_model.linear_stage (any step with get_support);
+    without one, the notebook's median SelectFromModel rule is applied to
+    the final model.
+    """
+    support = np.ones(n_features, dtype=bool)
+    has_selector = False
+    for _, step in pipeline.steps:
+        if hasattr(step, "get_support"):
+            support = support.copy()
+            support[support] = step.get_support()
+            has_selector = True
+    model = pipeline.steps[-1][1]
+    if not has_selector and (
+        hasattr(model, "coef_") or hasattr(model, "feature_importances_")
+    ):
+        support = SelectFromModel(
+            model, threshold=SELECTION_THRESHOLD, prefit=True
+        ).get_support()
+    return support
+
+
+def _fold_stability(pipeline, X, y, train_idx, test_idx, scoring,
+                    n_permutations, random_state):
+    """
+    Fit on one fold; return the selection mask and mean permutation
+    importance of each feature on the held-out rows.
+    """
+    pipeline.fit(X[train_idx], y[train_idx])
+    selected = selected_features(pipeline, X.shape[1])
+    importance = permutation_importance(
+        pipeline, X[test_idx], y[test_idx], scoring=scoring,
+        n_repeats=n_permutations, random_state=random_state,
+    )
+    return selected, importance.importances_mean
+
+
+def feature_stability(X, y, pipeline, n_splits=5, n_repeats=5,
+                      n_permutations=10, scoring="recall", n_jobs=-1,
+                      random_state=0):
+    """
+    Selection frequency and permutation importance distribution per
+    feature over n_splits x n_repeats folds, refitting a clone of pipeline
+    on each. Returns a DataFrame sorted by mean importance.
+    """
+    features = list(X.columns)
+    X_values = np.ascontiguousarray(X.to_numpy(dtype=float))
+    y_values = np.ravel(y).astype(int)
+
+    cv = RepeatedStratifiedKFold(
+        n_splits=n_splits, n_repeats=n_repeats, random_state=random_state
+    )
+    folds = list(cv.split(X_values, y_values))
+
+    with tempfile.TemporaryDirectory(prefix="feature-stability-") as tmp:
+        # Workers receive the memmaps by file reference, not by value
+        path = os.path.join(tmp, "train.joblib")
+        joblib.dump((X_values, y_values), path)
+        X_shared, y_shared = joblib.load(path, mmap_mode="r")
+
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fold_stability)(
+                clone(pipeline),
+                X_shared, y_shared, train_idx, test_idx, scoring,
+                n_permutations, random_state + i,
+            )
+            for i, (train_idx, test_idx) in enumerate(folds)
+        )
+
+    selected = np.array([r[0] for r in results])
+    importances = np.array([r[1] for r in results])
+    table = pd.DataFrame({
+        "feature": features,
+        "selection_frequency": selected.mean(axis=0),
+        "importance_mean": importances.mean(axis=0),
+        "importance_std": importances.std(axis=0),
+        "importance_q05": np.quantile(importances, 0.05, axis=0),
+        "importance_q95": np.quantile(importances, 0.95, axis=0),
+        "folds": len(folds),
+    })
+    return table.sort_values(
+        "importance_mean", ascending=False
+    ).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compute feature stability for a model version."
+    )
+    parser.add_argument("version", help="e.g. v1")
+    parser.add_argument("--model-name", default="predict_asthma")
+    parser.add_argument("--base-dir", default=MODEL_PIPELINE_DIR)
+    parser.add_argument("--splits", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--permutations", type=int, default=10)
+    parser.add_argument("--scoring", default="recall")
+    parser.add_argument("--jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    version_dir = os.path.join(args.base_dir, args.model_name, args.version)
+    pipeline = load_pkl_file(f"{version_dir}/clf_pipeline_model.pkl")
+
+    # The inputs the deployed model was trained on
+    X = pd.read_csv(f"{version_dir}/X_train.csv")
+    y = pd.read_csv(f"{version_dir}/y_train.csv")
+    table = feature_stability(
+        X[pipeline.feature_names_in_], y, pipeline, n_splits=args.splits,
+        n_repeats=args.repeats, n_permutations=args.permutations,
+        scoring=args.scoring, n_jobs=args.jobs,
+    )
+
+    path = os.path.join(version_dir, STABILITY_FILE)
+    table.to_csv(path, index=False)
+    print(f"Wrote {path}")
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Out-of-core training path for the asthma classifier.
+
+For extracts too large for the in-memory fit in 05_PredictingAsthma, the
+training CSV is streamed in chunks:
+
+1. One pass fits the StandardScaler with partial_fit on the chunks and
+   counts the classes.
+2. `epochs` passes fit an SGDClassifier (log loss, i.e. logistic
+   regression) with partial_fit on shuffled minibatches. Balanced class
+   weights are given as sample weights in place of SMOTE.
+
+As with v1, whose final model was refit on the cleaned raw features, the
+model is trained on the raw model features, so no data-cleaning/feature-
+engineering pipeline is fitted or exported.
+
+The result is written in the v1 layout (clf_pipeline_model.pkl, X/y
+splits as CSV, features_importance.png), so `python -m
+src.machine_learning.model_bundle <version>` can bundle it and the X/y
+splits are the model's own inputs. A parity report compares it with an
+in-memory LogisticRegression (class_weight="balanced") fitted on the same
+training CSV, both scored on the same test CSV.
+
+    python -m src.machine_learning.incremental v2 [--epochs 20]
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import precision_score, recall_score, roc_auc_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.data_management import MODEL_PIPELINE_DIR, load_pkl_file
+
+TRAIN_DATA = "outputs/datasets/cleaned/TrainSetCleaned.csv"
+TEST_DATA = "outputs/datasets/cleaned/TestSetCleaned.csv"
+TARGET = "Diagnosis"
+REFERENCE_VERSION = "v1"
+
+
+def iter_chunks(csv_path, chunksize):
+    with pd.read_csv(csv_path, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def fit_incremental(train_csv, features, chunksize=50_000, epochs=20,
+                    alpha=1e-4, random_state=0, verbose=True):
+    """
+    Fit an SGD logistic model (on the raw features, like v1) from a CSV
+    that is only ever read chunk by chunk. Returns the model pipeline and
+    timing statistics.
+    """
+    rng = np.random.default_rng(random_state)
+    stats = {"passes": 0, "rows_read": 0, "seconds": {}}
+
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    class_counts = {}
+    for chunk in iter_chunks(train_csv, chunksize):
+        scaler.partial_fit(chunk[features])
+        for label, count in chunk[TARGET].value_counts().items():
+            class_counts[int(label)] = class_counts.get(int(label), 0) + count
+    n_rows = sum(class_counts.values())
+    classes = np.array(sorted(class_counts))
+    # Same weights as class_weight="balanced" on the full data
+    class_weight = {
+        label: n_rows / (len(classes) * count)
+        for label, count in class_counts.items()
+    }
+    stats["seconds"]["scaler"] = time.perf_counter() - start
+    stats["passes"] += 1
+    stats["rows_read"] += n_rows
+
+    start = time.perf_counter()
+    model = SGDClassifier(
+        loss="log_loss", alpha=alpha, average=True,
+        random_state=random_state,
+    )
+    for epoch in range(epochs):
+        for chunk in iter_chunks(train_csv, chunksize):
+            chunk = chunk.iloc[rng.permutation(len(chunk))]
+            X = scaler.transform(chunk[features])
+            y = chunk[TARGET].to_numpy()
+            weights = np.vectorize(class_weight.get)(y)
+            model.partial_fit(X, y, classes=classes, sample_weight=weights)
+        if verbose:
+            print(f"Epoch {epoch + 1}/{epochs} done")
+    stats["seconds"]["sgd"] = time.perf_counter() - start
+    stats["passes"] += epochs
+    stats["rows_read"] += epochs * n_rows
+
+    total = sum(stats["seconds"].values())
+    stats["rows_per_second"] = stats["rows_read"] / total
+    stats["training_rows"] = n_rows
+    stats["class_counts"] = class_counts
+
+    pipeline_model = Pipeline([("scaler", scaler), ("model", model)])
+    return pipeline_model, stats
+
+
+def _write_split(csv_path, out_dir, split, features, chunksize):
+    """
+    Stream a cleaned CSV into X_<split>.csv and y_<split>.csv.
+    """
+    paths = {
+        name: os.path.join(out_dir, f"{name}_{split}.csv")
+        for name in ("X", "y")
+    }
+    with open(paths["X"], "w", newline="") as fx, \
+            open(paths["y"], "w", newline="") as fy:
+        for i, chunk in enumerate(iter_chunks(csv_path, chunksize)):
+            chunk[features].to_csv(fx, header=(i == 0), index=False)
+            chunk[[TARGET]].to_csv(fy, header=(i == 0), index=False)
+
+
+def _feature_importance_png(pipeline_model, features, path):
+    from matplotlib.figure import Figure
+
+    df_feature_importance = pd.DataFrame({
+        "Feature": features,
+        "Importance": pipeline_model["model"].coef_[0],
+    }).sort_values(by="Importance", ascending=False)
+    fig = Figure(figsize=(6.4, 4.8))
+    try:
+        ax = fig.subplots()
+        df_feature_importance.plot(
+            kind="bar", x="Feature", y="Importance", ax=ax
+        )
+        fig.savefig(path, bbox_inches="tight")
+    finally:
+        fig.clear()
+
+
+def export_v1_layout(pipeline_model, out_dir, train_csv, test_csv,
+                     features, chunksize=50_000):
+    """
+    Write artifacts with the same names and formats as the v1 directory.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(
+        value=pipeline_model, filename=f"{out_dir}/clf_pipeline_model.pkl"
+    )
+    _write_split(train_csv, out_dir, "train", features, chunksize)
+    _write_split(test_csv, out_dir, "test", features, chunksize)
+    _feature_importance_png(
+        pipeline_model, features, f"{out_dir}/features_importance.png"
+    )
+
+
+def _test_metrics(y_true, y_score, seconds):
+    y_pred = (y_score >= 0.5).astype(int)
+    return {
+        "test_rows": len(y_true),
+        "recall": recall_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, zero_division=0),
+        "roc_auc": roc_auc_score(y_true, y_score),
+        "scoring_rows_per_second": len(y_true) / seconds,
+    }
+
+
+def fit_in_memory(train_csv, features):
+    """
+    The in-memory counterpart of fit_incremental: the same features and
+    class weighting, fitted with LogisticRegression on the whole CSV.
+    """
+    train = pd.read_csv(train_csv, usecols=[*features, TARGET])
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("model", LogisticRegression(class_weight="balanced",
+                                     max_iter=1000)),
+    ]).fit(train[features], train[TARGET])
+
+
+def parity_report(test_csv, candidate, reference, chunksize=50_000):
+    """
+    Test-set metrics of the incremental pipeline next to the in-memory
+    reference, both scored on every row of test_csv, and how often their
+    predictions agree.
+    """
+    features = list(candidate.feature_names_in_)
+    y_true = []
+    scores = {"incremental": [], "in_memory": []}
+    seconds = {"incremental": 0.0, "in_memory": 0.0}
+    for chunk in iter_chunks(test_csv, chunksize):
+        y_true.append(chunk[TARGET].to_numpy())
+        for name, pipeline in (("incremental", candidate),
+                               ("in_memory", reference)):
+            start = time.perf_counter()
+            scores[name].append(
+                pipeline.predict_proba(chunk[features])[:, 1]
+            )
+            seconds[name] += time.perf_counter() - start
+
+    y_true = np.concatenate(y_true)
+    scores = {name: np.concatenate(s) for name, s in scores.items()}
+    results = {
+        name: _test_metrics(y_true, scores[name], seconds[name])
+        for name in ("in_memory", "incremental")
+    }
+    results["prediction_agreement"] = float(np.mean(
+        (scores["incremental"] >= 0.5) == (scores["in_memory"] >= 0.5)
+    ))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Train the asthma classifier out of core."
+    )
+    parser.add_argument("version", help="Output version, e.g. v2")
+    parser.add_argument("--model-name", default="predict_asthma")
+    parser.add_argument("--base-dir", default=MODEL_PIPELINE_DIR)
+    parser.add_argument("--train", default=TRAIN_DATA)
+    parser.add_argument("--test", default=TEST_DATA)
+    parser.add_argument("--reference", default=REFERENCE_VERSION,
+                        help="Version to take the model features from")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--alpha", type=float, default=1e-4)
+    args = parser.parse_args(argv)
+
+    reference_dir = os.path.join(
+        args.base_dir, args.model_name, args.reference
+    )
+    features = list(load_pkl_file(
+        f"{reference_dir}/clf_pipeline_model.pkl"
+    ).feature_names_in_)
+
+    pipeline_model, stats = fit_incremental(
+        args.train, features, args.chunksize, args.epochs, args.alpha,
+    )
+    out_dir = os.path.join(args.base_dir, args.model_name, args.version)
+    export_v1_layout(
+        pipeline_model, out_dir, args.train, args.test, features,
+        args.chunksize,
+    )
+    report = {
+        "training": stats,
+        "parity": parity_report(
+            args.test, pipeline_model, fit_in_memory(args.train, features),
+            args.chunksize,
+        ),
+    }
+    with open(os.path.join(out_dir, "incremental_report.json"), "w") as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"Wrote {out_dir}")
+    print(json.dumps(report, indent=2, default=float))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+Versioned model artifact bundle.
+
+A bundle lives in `<version dir>/bundle/` and holds everything a page needs
+for one model version:
+
+    manifest.json       versions, features, checksums, metrics and the
+                        checksums of the loose .pkl files it was built from
+    pipelines/*.joblib  uncompressed joblib dumps (loaded with mmap_mode)
+    splits/*.cols       X/y splits in the typed columnar format
+    evaluation.json     precomputed evaluation results, ROC/PR curves and
+                        threshold sweeps, tagged with the model checksum
+    features_importance.png
+    feature_stability.csv  cross-validated selection frequency and
+                        permutation importance, when computed
+    drift_reference.json   X_train sketch the drift monitor compares to
+    calibration.json    calibration lookup table, Brier scores and
+                        reliability curves, when fitted for this model
+
+ModelBundle reads only the manifest up front; every other artifact is
+materialized the first time it is accessed. current_bundle rebuilds a
+bundle whose loose .pkl files have changed since it was built; a loose
+file is only hashed again when its mtime or size changes. Builds hold an
+exclusive lock on `<version dir>/.bundle.lock`, so concurrent sessions
+and the CLI never build the same bundle at once.
+
+    python -m src.machine_learning.model_bundle v1   # build from loose files
+"""
+import argparse
+import datetime
+import fcntl
+import json
+import os
+import shutil
+import sys
+import tempfile
+import warnings
+from contextlib import contextmanager
+from functools import cached_property
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from src.columnar_store import (
+    ASTHMA_SCHEMA,
+    CONTINUOUS_MEASURES,
+    export_columnar,
+    file_sha256,
+    load_columnar,
+)
+from src.data_management import (
+    MODEL_PIPELINE_DIR,
+    file_signature,
+    load_pkl_file,
+)
+from src.machine_learning.calibration import (
+    CALIBRATION_FILE,
+    load_calibration,
+)
+from src.machine_learning.drift import REFERENCE_FILE, build_reference
+from src.machine_learning.evaluate_clf import compute_evaluation
+from src.machine_learning.feature_stability import STABILITY_FILE
+
+BUNDLE_DIR = "bundle"
+MANIFEST_FILE = "manifest.json"
+BUNDLE_MANIFEST = f"{BUNDLE_DIR}/{MANIFEST_FILE}"
+BUNDLE_FORMAT = 1
+LOCK_FILE = ".bundle.lock"
+PIPELINES = {
+    "data_cleaning_feat_eng": "clf_pipeline_data_cleaning_feat_eng",
+    "model": "clf_pipeline_model",
+}
+SPLITS = ["X_train", "X_test", "y_train", "y_test"]
+LABEL_MAP = ["No asthma", "Asthma"]
+
+# Splits keep full precision so bundled evaluation is reproducible
+SPLIT_SCHEMA = {
+    **ASTHMA_SCHEMA,
+    **{column: "float64" for column in CONTINUOUS_MEASURES},
+}
+
+
+def bundle_path(model_name, version, base_dir=MODEL_PIPELINE_DIR):
+    return os.path.join(base_dir, model_name, version, BUNDLE_DIR)
+
+
+def _library_versions():
+    import feature_engine
+    import imblearn
+
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+        "imbalanced-learn": imblearn.__version__,
+        "feature-engine": feature_engine.__version__,
+        "joblib": joblib.__version__,
+    }
+
+
+def _checksums(bundle_dir):
+    checksums = {}
+    for root, _, files in os.walk(bundle_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, bundle_dir)
+            rel_path = rel_path.replace(os.sep, "/")
+            if rel_path == MANIFEST_FILE:
+                continue
+            checksums[rel_path] = {
+                "sha256": file_sha256(path),
+                "bytes": os.path.getsize(path),
+            }
+    return checksums
+
+
+@contextmanager
+def _bundle_lock(version_dir):
+    """
+    Exclusive lock on a version directory's bundle, across threads and
+    processes.
+    """
+    with open(os.path.join(version_dir, LOCK_FILE), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build_bundle(model_name, version, base_dir=MODEL_PIPELINE_DIR,
+                 label_map=LABEL_MAP):
+    """
+    Build a bundle from the loose v1-style files in a version directory.
+    The bundle is assembled in a temporary directory and swapped in.
+    """
+    version_dir = os.path.join(base_dir, model_name, version)
+    with _bundle_lock(version_dir):
+        return _build_bundle(model_name, version, base_dir, label_map)
+
+
+def _build_bundle(model_name, version, base_dir, label_map):
+    version_dir = os.path.join(base_dir, model_name, version)
+    out_dir = bundle_path(model_name, version, base_dir)
+    tmp_dir = tempfile.mkdtemp(dir=version_dir, prefix=".tmp-bundle-")
+    old_dir = None
+    try:
+        os.makedirs(os.path.join(tmp_dir, "pipelines"))
+        os.makedirs(os.path.join(tmp_dir, "splits"))
+
+        pipelines = {}
+        sources = {}
+        for name, file_name in PIPELINES.items():
+            path = f"{version_dir}/{file_name}.pkl"
+            if name != "model" and not os.path.exists(path):
+                # e.g. out-of-core versions, which train on raw features
+                continue
+            sources[name] = file_sha256(path)
+            pipeline = load_pkl_file(path)
+            # Uncompressed so arrays can be memory-mapped on load
+            joblib.dump(
+                pipeline,
+                os.path.join(tmp_dir, "pipelines", f"{name}.joblib"),
+            )
+            pipelines[name] = pipeline
+
+        splits = {}
+        for split in SPLITS:
+            df = pd.read_csv(f"{version_dir}/{split}.csv")
+            export_columnar(
+                df,
+                os.path.join(tmp_dir, "splits", f"{split}.cols"),
+                source_sha256=file_sha256(f"{version_dir}/{split}.csv"),
+                schema=SPLIT_SCHEMA,
+            )
+            splits[split] = df
+
+        image = f"{version_dir}/features_importance.png"
+        if os.path.exists(image):
+            shutil.copy(
+                image, os.path.join(tmp_dir, "features_importance.png")
+            )
+
+        stability = f"{version_dir}/{STABILITY_FILE}"
+        if os.path.exists(stability):
+            shutil.copy(stability, os.path.join(tmp_dir, STABILITY_FILE))
+
+        calibration = f"{version_dir}/{CALIBRATION_FILE}"
+        if os.path.exists(calibration):
+            if load_calibration(calibration, sources["model"]) is None:
+                warnings.warn(
+                    f"{calibration} was fitted for a different model; "
+                    "not bundled. Rerun src.machine_learning.calibration."
+                )
+            else:
+                shutil.copy(
+                    calibration, os.path.join(tmp_dir, CALIBRATION_FILE)
+                )
+
+        with open(os.path.join(tmp_dir, REFERENCE_FILE), "w") as f:
+            json.dump(build_reference(splits["X_train"]), f)
+
+        evaluation = compute_evaluation(
+            splits["X_train"], splits["y_train"],
+            splits["X_test"], splits["y_test"],
+            pipelines["model"], label_map, model_sha256=sources["model"],
+        )
+        with open(os.path.join(tmp_dir, "evaluation.json"), "w") as f:
+            json.dump(evaluation, f, indent=2)
+
+        positive = label_map[1]
+        manifest = {
+            "bundle_format": BUNDLE_FORMAT,
+            "model_name": model_name,
+            "version": version,
+            "created": datetime.datetime.now(
+                datetime.timezone.utc
+            ).isoformat(timespec="seconds"),
+            "libraries": _library_versions(),
+            "features": {
+                "input": list(pipelines.get(
+                    "data_cleaning_feat_eng", pipelines["model"]
+                ).feature_names_in_),
+                "model": list(pipelines["model"].feature_names_in_),
+            },
+            "metrics": {
+                split: {
+                    "precision": evaluation[split]["report"][positive][
+                        "precision"],
+                    "recall": evaluation[split]["report"][positive][
+                        "recall"],
+                }
+                for split in ("train", "test")
+            },
+            "artifacts": _checksums(tmp_dir),
+            "sources": sources,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        os.chmod(tmp_dir, 0o755)  # mkdtemp creates it private
+        # Move the old bundle aside rather than deleting it first, so the
+        # bundle path is missing only between two renames
+        if os.path.isdir(out_dir):
+            old_dir = tempfile.mkdtemp(dir=version_dir, prefix=".old-bundle-")
+            os.replace(out_dir, os.path.join(old_dir, BUNDLE_DIR))
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if old_dir is not None and not os.path.exists(out_dir):
+            os.replace(os.path.join(old_dir, BUNDLE_DIR), out_dir)
+        raise
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+
+class ModelBundle:
+    """
+    Lazy loader for a model bundle; artifacts load on first access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._splits = {}
+        # Signatures of loose .pkl files already hashed and found unchanged
+        self._verified_sources = {}
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("bundle_format") != BUNDLE_FORMAT:
+            raise ValueError(
+                f"Unsupported bundle format in {path}: "
+                f"{self.manifest.get('bundle_format')}"
+            )
+
+    @classmethod
+    def open(cls, model_name, version, base_dir=MODEL_PIPELINE_DIR):
+        return cls(bundle_path(model_name, version, base_dir))
+
+    @classmethod
+    def from_manifest(cls, manifest_path):
+        """
+        Loader for ModelRegistry.get(..., BUNDLE_MANIFEST, loader=...).
+        """
+        return cls(os.path.dirname(manifest_path))
+
+    @property
+    def nbytes(self):
+        return sum(a["bytes"] for a in self.manifest["artifacts"].values())
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def features(self):
+        return self.manifest["features"]["model"]
+
+    @property
+    def metrics(self):
+        return self.manifest["metrics"]
+
+    @property
+    def model_sha256(self):
+        """
+        Checksum of the clf_pipeline_model.pkl the bundle was built from.
+        """
+        return self.manifest["sources"]["model"]
+
+    def changed_sources(self):
+        """
+        Pipelines whose loose .pkl in the version directory no longer
+        matches the one the bundle was built from. A file is hashed only
+        if its mtime or size changed since it was last found to match.
+        """
+        version_dir = os.path.dirname(self.path)
+        changed = []
+        for name, sha256 in self.manifest["sources"].items():
+            path = os.path.join(version_dir, f"{PIPELINES[name]}.pkl")
+            if not os.path.exists(path):
+                continue
+            signature = file_signature(path)
+            if self._verified_sources.get(name) == signature:
+                continue
+            if file_sha256(path) == sha256:
+                self._verified_sources[name] = signature
+            else:
+                changed.append(name)
+        return changed
+
+    def _pipeline(self, name):
+        return joblib.load(
+            os.path.join(self.path, "pipelines", f"{name}.joblib"),
+            mmap_mode="r",
+        )
+
+    @cached_property
+    def pipeline_dc_fe(self):
+        """
+        Data-cleaning/feature-engineering pipeline, or None if the version
+        has none.
+        """
+        if "data_cleaning_feat_eng" not in self.manifest["sources"]:
+            return None
+        return self._pipeline("data_cleaning_feat_eng")
+
+    @cached_property
+    def pipeline_model(self):
+        return self._pipeline("model")
+
+    def split(self, name):
+        """
+        One of X_train, X_test, y_train, y_test as a memory-mapped frame.
+        """
+        if name not in SPLITS:
+            raise KeyError(f"Unknown split '{name}', expected one of {SPLITS}")
+        if name not in self._splits:
+            self._splits[name] = load_columnar(
+                os.path.join(self.path, "splits", f"{name}.cols")
+            )
+        return self._splits[name]
+
+    @cached_property
+    def evaluation(self):
+        with open(os.path.join(self.path, "evaluation.json")) as f:
+            return json.load(f)
+
+    @cached_property
+    def feature_importance_png(self):
+        image = os.path.join(self.path, "features_importance.png")
+        with open(image, "rb") as f:
+            return f.read()
+
+    @cached_property
+    def feature_stability(self):
+        """
+        Feature stability table, or None if it was not computed.
+        """
+        path = os.path.join(self.path, STABILITY_FILE)
+        if not os.path.exists(path):
+            return None
+        return pd.read_csv(path)
+
+    @cached_property
+    def drift_reference(self):
+        with open(os.path.join(self.path, REFERENCE_FILE)) as f:
+            return json.load(f)
+
+    @cached_property
+    def calibration(self):
+        """
+        (Calibrator, report) for this model, or None if not calibrated.
+        """
+        return load_calibration(
+            os.path.join(self.path, CALIBRATION_FILE), self.model_sha256
+        )
+
+    def verify(self):
+        """
+        Recompute checksums; returns the artifacts that do not match.
+        """
+        actual = _checksums(self.path)
+        expected = self.manifest["artifacts"]
+        return sorted(
+            name for name in set(actual) | set(expected)
+            if actual.get(name, {}).get("sha256")
+            != expected.get(name, {}).get("sha256")
+        )
+
+
+def current_bundle(registry, model_name, version):
+    """
+    A version's bundle from the registry, rebuilt first if its loose
+    pipelines were replaced (e.g. a retrained clf_pipeline_model.pkl).
+    The rebuild happens under the bundle lock, and only if the bundle is
+    still stale once the lock is held, so concurrent callers build it once.
+    """
+    def get():
+        return registry.get(
+            model_name, version, BUNDLE_MANIFEST,
+            loader=ModelBundle.from_manifest,
+        )
+
+    bundle = get()
+    if bundle.changed_sources():
+        version_dir = os.path.dirname(bundle.path)
+        with _bundle_lock(version_dir):
+            if ModelBundle(bundle.path).changed_sources():
+                _build_bundle(model_name, version, registry.base_dir,
+                              LABEL_MAP)
+        bundle = get()
+    return bundle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a model bundle from a version directory."
+    )
+    parser.add_argument("version", help="e.g. v1")
+    parser.add_argument("--model-name", default="predict_asthma")
+    parser.add_argument("--base-dir", default=MODEL_PIPELINE_DIR)
+    args = parser.parse_args(argv)
+
+    out_dir = build_bundle(args.model_name, args.version, args.base_dir)
+    bundle = ModelBundle(out_dir)
+    print(f"Built {out_dir}")
+    print(json.dumps(bundle.metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from sklearn.base import clone
+from sklearn.feature_selection import (
+    RFE,
+    SelectFromModel,
+    SelectKBest,
+    f_classif,
+)
+from sklearn.preprocessing import PowerTransformer, StandardScaler
+from sklearn.pipeline import Pipeline
+from imblearn.pipeline import Pipeline as ImbPipeline
+from feature_engine.wrappers import SklearnTransformerWrapper
+
+from src.machine_learning.resampling import CachedBorderlineSMOTE
+
+
+# Taken from "05_PredictingAsthma"
+def PipelineDataCleaningAndFeatureEngineering():
+    """
+    Custom function to apply Yeo-Johnson transformation.
+    """
+    pipeline_base = Pipeline(
+        [
+            (
+                "yeojohnson_transform",
+                SklearnTransformerWrapper(
+                    transformer=PowerTransformer(method="yeo-johnson"),
+                    variables=[
+                        "BMI",
+                        "LungFunctionFEV1",
+                        "LungFunctionFVC",
+                        "SleepQuality",
+                    ],
+                ),
+            )
+        ]
+    )
+
+    return pipeline_base
+
+
+def PipelineClf(
+    model,
+    use_feature_selection=True,
+    use_smote=True,
+    smote_ratio=1.0,
+    k_neighbors=20,
+    feature_selection_threshold="median",
+    min_features=1,
+    smote_kind="borderline-1",
+    use_scaling=True,
+    class_weight="balanced",
+    feature_selection_method="select_from_model",
+):
+    """
+    Classification pipeline with optional feature scaling,
+    and Borderline-SMOTE oversampling. The SMOTE step reuses its
+    neighbour index across refits on the same fold data.
+    """
+    model_copy = clone(model)
+
+    if "class_weight" in model_copy.get_params():
+        model_copy.set_params(class_weight=class_weight)
+
+    steps = []
+
+    # Scaling
+    if use_scaling:
+        steps.append(("scaler", StandardScaler()))
+
+    # SMOTE
+    if use_smote:
+        steps.append(
+            (
+                "smote",
+                CachedBorderlineSMOTE(
+                    kind=smote_kind,
+                    sampling_strategy=smote_ratio,
+                    k_neighbors=k_neighbors,
+                    random_state=42,
+                ),
+            )
+        )
+
+    # Feature selection
+    if use_feature_selection:
+        if feature_selection_method == "select_from_model":
+            selector = SelectFromModel(
+                model_copy, threshold=feature_selection_threshold
+            )
+        elif feature_selection_method == "select_k_best":
+            selector = SelectKBest(f_classif, k=min_features)
+        elif feature_selection_method == "rfe":
+            selector = RFE(model_copy, n_features_to_select=min_features)
+        else:
+            raise ValueError("Invalid feature selection method")
+
+        steps.append(("feat_selection", selector))
+
+    # Final model
+    steps.append(("model", model_copy))
+
+    return ImbPipeline(steps)
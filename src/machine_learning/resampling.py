@@ -0,0 +1,134 @@
+"""
+BorderlineSMOTE with a cached neighbour index.
+
+In a hyperparameter search every candidate refits PipelineClf on the same
+folds, and BorderlineSMOTE rebuilds the same two k-nearest-neighbour
+queries (m-neighbours to find samples "in danger", k-neighbours to pick
+interpolation partners) each time. CachedBorderlineSMOTE stores the result
+of those queries - danger indices and neighbour indices, no data - keyed
+by a content hash of the fold's (scaled) training data and the neighbour
+settings, so candidates that differ only in model params reuse them.
+
+Synthetic samples are generated in one vectorized step with the same
+random draws as imblearn, so for a fixed random_state the output is
+identical to BorderlineSMOTE's. The cache is per process; each search
+worker keeps its own.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from imblearn.over_sampling import BorderlineSMOTE
+from scipy import sparse
+from sklearn.utils import check_random_state
+
+from src.result_cache import content_hash
+
+NEIGHBOR_CACHE_SIZE = 64
+
+_neighbor_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def neighbor_cache_info():
+    with _cache_lock:
+        return {**_cache_stats, "entries": len(_neighbor_cache)}
+
+
+def clear_neighbor_cache():
+    with _cache_lock:
+        _neighbor_cache.clear()
+        _cache_stats.update(hits=0, misses=0)
+
+
+class CachedBorderlineSMOTE(BorderlineSMOTE):
+    """
+    Drop-in BorderlineSMOTE that reuses neighbour queries across fits on
+    identical data. Sparse input falls back to the parent implementation.
+    """
+
+    def _neighbors(self, X, y, class_sample):
+        """
+        Danger indices within the class and the k-neighbours of each danger
+        sample (indices into the array sampled from), cached per fold.
+        """
+        key = content_hash(
+            X, y, class_sample, self.kind, repr(self.k_neighbors),
+            repr(self.m_neighbors),
+        )
+        with _cache_lock:
+            entry = _neighbor_cache.get(key)
+            if entry is not None:
+                _neighbor_cache.move_to_end(key)
+                _cache_stats["hits"] += 1
+                return entry
+
+        target_class_indices = np.flatnonzero(y == class_sample)
+        X_class = X[target_class_indices]
+        self.nn_m_.fit(X)
+        mask_danger = self._in_danger_noise(
+            self.nn_m_, X_class, class_sample, y, kind="danger"
+        )
+        danger = np.flatnonzero(mask_danger)
+        nns = None
+        if danger.size:
+            X_to_sample_from = X_class if self.kind == "borderline-1" else X
+            self.nn_k_.fit(X_to_sample_from)
+            nns = self.nn_k_.kneighbors(
+                X_class[danger], return_distance=False
+            )[:, 1:]
+        entry = (target_class_indices, danger, nns)
+
+        with _cache_lock:
+            _cache_stats["misses"] += 1
+            _neighbor_cache[key] = entry
+            while len(_neighbor_cache) > NEIGHBOR_CACHE_SIZE:
+                _neighbor_cache.popitem(last=False)
+        return entry
+
+    def _fit_resample(self, X, y):
+        if sparse.issparse(X):
+            return super()._fit_resample(X, y)
+        self._validate_estimator()
+
+        X_parts, y_parts = [X], [y]
+        self.in_danger_indices = {}
+        for class_sample, n_samples in self.sampling_strategy_.items():
+            if n_samples == 0:
+                continue
+            target_class_indices, danger, nns = self._neighbors(
+                X, y, class_sample
+            )
+            if not danger.size:
+                continue
+            self.in_danger_indices[class_sample] = (
+                target_class_indices[danger]
+            )
+            X_danger = X[target_class_indices[danger]]
+            if self.kind == "borderline-1":
+                X_to_sample_from = X[target_class_indices]
+            else:
+                X_to_sample_from = X
+
+            # Same draws, in the same order, as BaseSMOTE._make_samples
+            random_state = check_random_state(self.random_state)
+            samples_indices = random_state.randint(
+                low=0, high=nns.size, size=n_samples
+            )
+            steps = random_state.uniform(size=n_samples)[:, np.newaxis]
+            rows, cols = np.divmod(samples_indices, nns.shape[1])
+            neighbors = nns[rows, cols]
+            diffs = X_to_sample_from[neighbors] - X_danger[rows]
+            if self.kind == "borderline-2":
+                random_state = check_random_state(self.random_state)
+                mask_pair_samples = y[neighbors] != class_sample
+                diffs[mask_pair_samples] *= random_state.uniform(
+                    low=0.0, high=0.5, size=(mask_pair_samples.sum(), 1)
+                )
+            X_new = (X_danger[rows] + steps * diffs).astype(X.dtype)
+
+            X_parts.append(X_new)
+            y_parts.append(np.full(n_samples, class_sample, dtype=y.dtype))
+
+        return np.vstack(X_parts), np.hstack(y_parts)
@@ -0,0 +1,390 @@
+"""
+Champion / challenger routing and shadow evaluation for batch scoring.
+
+Several versions of a model are loaded side by side. Each patient is
+routed to the champion or, for a configurable share of patients, to the
+challenger. The split is a hash of PatientID, so a patient always lands
+on the same version. In shadow mode both versions score every row and
+only the routed result is written. The other result is used to compare
+the two versions.
+
+Each version scores the same inputs as the score CLI (score.model_inputs:
+the cleaned raw features the model was trained on). Each chunk is cleaned
+once and every version takes its feature columns from the cleaned frame,
+so shadowing costs one extra column selection and predict_proba per chunk.
+
+Comparisons are kept as running sums in ShadowStats: rows routed to
+each version, prediction disagreements, probability differences and,
+when the batch carries Diagnosis, confusion counts and Brier sums per
+version. Worker partials and successive runs are merged into one small
+JSON file.
+
+    python -m src.machine_learning.routing patients.csv out.csv \\
+        --champion v1 --challenger v2 --share 0.1 --shadow
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.data_management import clean_patient_data
+from src.machine_learning.drift import DRIFT_DIR
+from src.machine_learning.score import MODEL_DIR, load_pipelines
+
+TARGET = "Diagnosis"
+# Multiplier for the PatientID hash (Knuth's multiplicative hashing)
+ROUTE_HASH = 2654435761
+
+_worker_router = {}
+
+
+def shadow_stats_path(champion, challenger, model_name="predict_asthma",
+                      base_dir=DRIFT_DIR):
+    return os.path.join(
+        base_dir, model_name, f"shadow_{champion}_vs_{challenger}.json"
+    )
+
+
+def route(df, share):
+    """
+    Boolean mask of rows routed to the challenger, stable per PatientID
+    (falls back to the row index without one).
+    """
+    if "PatientID" in df.columns:
+        ids = df["PatientID"].to_numpy(dtype=np.uint64)
+    else:
+        ids = df.index.to_numpy(dtype=np.uint64)
+    bucket = (ids * np.uint64(ROUTE_HASH)) % np.uint64(2**32)
+    return bucket / 2**32 < share
+
+
+class ShadowStats:
+    """
+    Running champion/challenger comparison; every field is a sum, so
+    partials from chunks, workers and runs merge by addition.
+    """
+
+    PER_VERSION = ["routed", "scored", "labelled", "tp", "fp", "fn", "tn",
+                   "brier_sum"]
+    PAIRED = ["compared", "disagreements", "abs_diff_sum", "diff_sum"]
+
+    def __init__(self, champion, challenger, versions=None, paired=None,
+                 max_abs_diff=0.0):
+        self.champion = champion
+        self.challenger = challenger
+        self.versions = versions or {
+            v: dict.fromkeys(self.PER_VERSION, 0)
+            for v in (champion, challenger)
+        }
+        self.paired = paired or dict.fromkeys(self.PAIRED, 0)
+        self.max_abs_diff = max_abs_diff
+
+    def add_version(self, version, routed, proba, prediction, y=None):
+        stats = self.versions[version]
+        stats["routed"] += int(routed)
+        stats["scored"] += len(proba)
+        if y is not None:
+            stats["labelled"] += len(y)
+            stats["tp"] += int(np.sum((prediction == 1) & (y == 1)))
+            stats["fp"] += int(np.sum((prediction == 1) & (y == 0)))
+            stats["fn"] += int(np.sum((prediction == 0) & (y == 1)))
+            stats["tn"] += int(np.sum((prediction == 0) & (y == 0)))
+            stats["brier_sum"] += float(np.sum((proba - y) ** 2))
+
+    def add_pair(self, champion_proba, challenger_proba, champion_pred,
+                 challenger_pred):
+        diff = challenger_proba - champion_proba
+        self.paired["compared"] += len(diff)
+        self.paired["disagreements"] += int(
+            np.sum(champion_pred != challenger_pred)
+        )
+        self.paired["abs_diff_sum"] += float(np.abs(diff).sum())
+        self.paired["diff_sum"] += float(diff.sum())
+        if diff.size:
+            self.max_abs_diff = max(self.max_abs_diff,
+                                    float(np.abs(diff).max()))
+
+    def merge(self, other):
+        for version, stats in other.versions.items():
+            for key, value in stats.items():
+                self.versions[version][key] += value
+        for key, value in other.paired.items():
+            self.paired[key] += value
+        self.max_abs_diff = max(self.max_abs_diff, other.max_abs_diff)
+        return self
+
+    def to_dict(self):
+        return {
+            "champion": self.champion,
+            "challenger": self.challenger,
+            "versions": self.versions,
+            "paired": self.paired,
+            "max_abs_diff": self.max_abs_diff,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["champion"], data["challenger"], data["versions"],
+                   data["paired"], data["max_abs_diff"])
+
+    @classmethod
+    def load(cls, path, champion, challenger):
+        if not os.path.exists(path):
+            return cls(champion, challenger)
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        """
+        Per-version metrics (with challenger - champion deltas) and the
+        paired comparison, as a DataFrame and a dict.
+        """
+        rows = {}
+        for version, s in self.versions.items():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rows[version] = {
+                    "routed": s["routed"],
+                    "scored": s["scored"],
+                    "labelled": s["labelled"],
+                    "precision": np.float64(s["tp"]) / (s["tp"] + s["fp"]),
+                    "recall": np.float64(s["tp"]) / (s["tp"] + s["fn"]),
+                    "brier": np.float64(s["brier_sum"]) / s["labelled"],
+                }
+        table = pd.DataFrame(rows).T
+        table.loc["delta"] = (
+            table.loc[self.challenger] - table.loc[self.champion]
+        )
+        table.loc["delta", ["routed", "scored", "labelled"]] = np.nan
+        n = self.paired["compared"]
+        paired = {
+            "compared": n,
+            "disagreement_rate": (
+                self.paired["disagreements"] / n if n else None
+            ),
+            "mean_abs_diff": self.paired["abs_diff_sum"] / n if n else None,
+            "mean_diff": self.paired["diff_sum"] / n if n else None,
+            "max_abs_diff": self.max_abs_diff if n else None,
+        }
+        return table, paired
+
+
+def check_routing(champion, challenger=None, share=0.0, shadow=False):
+    """
+    Raise ValueError for routing settings ModelRouter cannot serve.
+    """
+    if challenger is None and (share or shadow):
+        raise ValueError("share and shadow need a challenger version.")
+    if challenger == champion:
+        # ShadowStats would count every row twice under one key
+        raise ValueError(
+            "The challenger must be a different version from the champion."
+        )
+    if not 0.0 <= share <= 1.0:
+        raise ValueError("share must be between 0 and 1.")
+
+
+class ModelRouter:
+    """
+    Champion and optional challenger modeling pipelines.
+    """
+
+    def __init__(self, champion, challenger=None, share=0.0, shadow=False,
+                 model_dir=MODEL_DIR, threshold=0.5):
+        check_routing(champion, challenger, share, shadow)
+        self.champion = champion
+        self.challenger = challenger
+        self.share = share
+        self.shadow = shadow
+        self.threshold = threshold
+        self.models = {
+            version: load_pipelines(version, model_dir)[1]
+            for version in filter(None, (champion, challenger))
+        }
+
+    def _inputs(self, df):
+        # Same as score.model_inputs per version, but cleaned only once
+        cleaned = clean_patient_data(df)
+        return {
+            version: cleaned[model.feature_names_in_]
+            for version, model in self.models.items()
+        }
+
+    def score(self, df):
+        """
+        Scores of the routed version for every row of df, and the
+        ShadowStats for this chunk.
+        """
+        stats = ShadowStats(self.champion, self.challenger or self.champion)
+        to_challenger = (
+            route(df, self.share) if self.challenger
+            else np.zeros(len(df), dtype=bool)
+        )
+        y = df[TARGET].to_numpy() if TARGET in df.columns else None
+        inputs = self._inputs(df)
+
+        proba = {}
+        for version, rows in ((self.champion, ~to_challenger),
+                              (self.challenger, to_challenger)):
+            if version is None:
+                continue
+            # Shadow mode scores every row with both versions
+            if not self.shadow:
+                inputs[version] = inputs[version][rows]
+            if len(inputs[version]):
+                p = self.models[version].predict_proba(
+                    inputs[version]
+                )[:, 1]
+            else:
+                p = np.empty(0)
+            proba[version] = p
+            stats.add_version(
+                version, rows.sum(), p, (p >= self.threshold).astype(int),
+                None if y is None else (y if self.shadow else y[rows]),
+            )
+
+        served = np.empty(len(df))
+        if self.shadow or self.challenger is None:
+            served[:] = proba[self.champion]
+            if self.challenger is not None:
+                served[to_challenger] = proba[self.challenger][to_challenger]
+                stats.add_pair(
+                    proba[self.champion], proba[self.challenger],
+                    proba[self.champion] >= self.threshold,
+                    proba[self.challenger] >= self.threshold,
+                )
+        else:
+            served[~to_challenger] = proba[self.champion]
+            served[to_challenger] = proba[self.challenger]
+
+        ids = [col for col in ("PatientID",) if col in df.columns]
+        out = pd.DataFrame(
+            {
+                "asthma_probability": served,
+                "prediction": (served >= self.threshold).astype("int8"),
+                "model_version": np.where(
+                    to_challenger, self.challenger or "", self.champion
+                ),
+            },
+            index=df.index,
+        )
+        return pd.concat([df[ids], out], axis=1), stats
+
+
+def _init_worker(kwargs):
+    _worker_router["router"] = ModelRouter(**kwargs)
+
+
+def _route_chunk(df):
+    return _worker_router["router"].score(df)
+
+
+def route_csv(input_path, output_path, champion, challenger=None,
+              share=0.0, shadow=False, model_dir=MODEL_DIR,
+              chunksize=50_000, n_jobs=None, threshold=0.5,
+              stats_path=None):
+    """
+    score_csv with routing: writes the routed scores to output_path and
+    merges this run's comparison into the ShadowStats at stats_path.
+    """
+    # Fail before starting the pool on invalid settings
+    check_routing(champion, challenger, share, shadow)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    router_kwargs = {
+        "champion": champion, "challenger": challenger, "share": share,
+        "shadow": shadow, "model_dir": model_dir, "threshold": threshold,
+    }
+    stats = ShadowStats(champion, challenger or champion)
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+
+    n_rows = 0
+    start = time.perf_counter()
+    with open(output_path, "w", newline="") as out, ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_init_worker,
+        initargs=(router_kwargs,),
+    ) as pool:
+        pending = []
+
+        def write_next():
+            nonlocal n_rows
+            result, chunk_stats = pending.pop(0).result()
+            result.to_csv(out, header=n_rows == 0, index=False)
+            n_rows += len(result)
+            stats.merge(chunk_stats)
+
+        for chunk in reader:
+            pending.append(pool.submit(_route_chunk, chunk))
+            if len(pending) >= 2 * n_jobs:
+                write_next()
+        while pending:
+            write_next()
+
+    if stats_path is not None and challenger is not None:
+        ShadowStats.load(stats_path, champion, challenger).merge(
+            stats
+        ).save(stats_path)
+    seconds = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "seconds": seconds,
+        "rows_per_second": n_rows / seconds if seconds else float("nan"),
+        "stats": stats,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Batch score with champion/challenger routing."
+    )
+    parser.add_argument("input", help="Patient CSV to score")
+    parser.add_argument("output", help="Where to write predictions (CSV)")
+    parser.add_argument("--champion", default="v1")
+    parser.add_argument("--challenger")
+    parser.add_argument("--share", type=float, default=0.0,
+                        help="Share of patients served by the challenger")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Score every patient with both versions")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    stats_path = None
+    if args.challenger:
+        stats_path = shadow_stats_path(
+            args.champion, args.challenger,
+            os.path.basename(os.path.normpath(args.model_dir)),
+        )
+    report = route_csv(
+        args.input, args.output, args.champion, args.challenger,
+        share=args.share, shadow=args.shadow, model_dir=args.model_dir,
+        chunksize=args.chunksize, n_jobs=args.n_jobs,
+        threshold=args.threshold, stats_path=stats_path,
+    )
+    print(
+        f"Scored {report['rows']} rows in {report['seconds']:.2f}s "
+        f"({report['rows_per_second']:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+    if stats_path:
+        table, paired = ShadowStats.load(
+            stats_path, args.champion, args.challenger
+        ).summary()
+        print(table.to_string(), file=sys.stderr)
+        print(json.dumps(paired, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
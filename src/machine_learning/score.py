@@ -0,0 +1,243 @@
+"""
+Batch scoring for the predict_asthma pipelines.
+
+Streams a patient CSV in fixed-size chunks, cleans each chunk and scores
+it with the modeling pipeline, and appends the results to the output CSV
+as chunks complete. The v1 model was refit on the cleaned raw features
+(X_train / X_test), so the Yeo-Johnson data cleaning / feature
+engineering pipeline is not part of the scoring path.
+With --drift, every chunk is also added to the version's drift monitor
+state (see src.machine_learning.drift). With --explain K, the top K
+drivers of each prediction are added to the output (see
+src.machine_learning.explain). With --calibrated, a calibrated_probability
+column gives the risk on the real prevalence scale (see
+src.machine_learning.calibration); predictions still use the raw score.
+The calibrator is fitted on scores of X_train, so it is only valid for
+probabilities computed from the same model inputs (model_inputs).
+
+    python -m src.machine_learning.score patients.csv predictions.csv
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.columnar_store import file_sha256
+from src.data_management import clean_patient_data, load_pkl_file
+from src.machine_learning.calibration import (
+    CALIBRATION_FILE,
+    load_calibration,
+)
+from src.machine_learning.drift import DriftMonitor, drift_state_path
+from src.machine_learning.explain import Explainer
+from src.machine_learning.model_bundle import BUNDLE_DIR, ModelBundle
+
+MODEL_DIR = "outputs/modeling_pipeline/predict_asthma"
+ID_COLUMNS = ["PatientID"]
+
+# Pipelines loaded once per worker process by _init_worker
+_worker_pipelines = {}
+
+
+def load_pipelines(version="v1", model_dir=MODEL_DIR):
+    """
+    Load the two v1-style pipelines for a version directory. The
+    data-cleaning/feature-engineering pipeline is None if there is none.
+    """
+    file_path = os.path.join(model_dir, version)
+    dc_fe_path = f"{file_path}/clf_pipeline_data_cleaning_feat_eng.pkl"
+    pipeline_dc_fe = (
+        load_pkl_file(dc_fe_path) if os.path.exists(dc_fe_path) else None
+    )
+    pipeline_model = load_pkl_file(f"{file_path}/clf_pipeline_model.pkl")
+    return pipeline_dc_fe, pipeline_model
+
+
+def model_inputs(df, pipeline_model):
+    """
+    Clean a raw patient frame and keep only the columns the model was
+    trained on, i.e. the same inputs as the X_train / X_test splits.
+    """
+    return clean_patient_data(df)[pipeline_model.feature_names_in_]
+
+
+def score_frame(df, pipeline_model, threshold=0.5, explainer=None,
+                explain_top=3, calibrator=None):
+    """
+    Return asthma probability and predicted class for each patient in df,
+    the calibrated probability if a Calibrator is given, and the top
+    explain_top drivers if an Explainer is given.
+    """
+    X = model_inputs(df, pipeline_model)
+    proba = pipeline_model.predict_proba(X)[:, 1]
+
+    scores = pd.DataFrame(
+        {
+            "asthma_probability": proba,
+            "prediction": (proba >= threshold).astype("int8"),
+        },
+        index=df.index,
+    )
+    if calibrator is not None:
+        scores["calibrated_probability"] = calibrator(proba)
+    ids = [col for col in ID_COLUMNS if col in df.columns]
+    parts = [df[ids], scores]
+    if explainer is not None:
+        parts.append(explainer.drivers(X, explain_top))
+    return pd.concat(parts, axis=1)
+
+
+def _init_worker(version, model_dir, explain_top, calibrated):
+    _, pipeline_model = load_pipelines(version, model_dir)
+    _worker_pipelines["model"] = pipeline_model
+    if calibrated:
+        _worker_pipelines["calibrator"] = _load_calibrator(version, model_dir)
+    if explain_top:
+        # Only used as background when the model is not linear
+        X_train = pd.read_csv(os.path.join(model_dir, version, "X_train.csv"))
+        _worker_pipelines["explainer"] = Explainer(
+            pipeline_model, background=X_train
+        )
+
+
+def _load_calibrator(version, model_dir):
+    model_path = os.path.join(model_dir, version, "clf_pipeline_model.pkl")
+    calibration = load_calibration(
+        os.path.join(model_dir, version, CALIBRATION_FILE),
+        file_sha256(model_path),
+    )
+    if calibration is None:
+        raise FileNotFoundError(
+            f"No calibration for the current {version} model; run "
+            f"python -m src.machine_learning.calibration {version}"
+        )
+    return calibration[0]
+
+
+def _score_chunk(df, threshold, explain_top):
+    return score_frame(
+        df, _worker_pipelines["model"], threshold,
+        explainer=_worker_pipelines.get("explainer"),
+        explain_top=explain_top,
+        calibrator=_worker_pipelines.get("calibrator"),
+    )
+
+
+def score_csv(
+    input_path,
+    output_path,
+    version="v1",
+    model_dir=MODEL_DIR,
+    chunksize=50_000,
+    n_jobs=None,
+    threshold=0.5,
+    drift_state=None,
+    explain_top=0,
+    calibrated=False,
+):
+    """
+    Score input_path chunk by chunk and write predictions to output_path.
+
+    At most two chunks per worker are in flight, so memory stays flat
+    regardless of file size. If drift_state is a path, each chunk also
+    updates the drift monitor saved there. explain_top > 0 adds that many
+    top drivers per patient, and calibrated=True a calibrated probability.
+    Returns a dict with rows scored, elapsed seconds and rows per second.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if calibrated:
+        # Fail before starting the pool if there is no usable calibration
+        _load_calibrator(version, model_dir)
+    monitor = None
+    if drift_state is not None:
+        bundle = ModelBundle(os.path.join(model_dir, version, BUNDLE_DIR))
+        monitor = DriftMonitor.for_bundle(drift_state, bundle)
+    max_pending = 2 * n_jobs
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+
+    n_rows = 0
+    start = time.perf_counter()
+    with open(output_path, "w", newline="") as out, ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_init_worker,
+        initargs=(version, model_dir, explain_top, calibrated),
+    ) as pool:
+        pending = []
+        write_header = True
+
+        def write_next():
+            nonlocal n_rows, write_header
+            result = pending.pop(0).result()
+            result.to_csv(out, header=write_header, index=False)
+            write_header = False
+            n_rows += len(result)
+
+        for chunk in reader:
+            pending.append(pool.submit(
+                _score_chunk, chunk, threshold, explain_top
+            ))
+            if monitor is not None:
+                monitor.update(clean_patient_data(chunk))
+            if len(pending) >= max_pending:
+                write_next()
+        while pending:
+            write_next()
+    if monitor is not None:
+        monitor.save(drift_state)
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "seconds": seconds,
+        "rows_per_second": n_rows / seconds if seconds else float("nan"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Batch score a patient CSV with the predict_asthma model."
+    )
+    parser.add_argument("input", help="Patient CSV to score")
+    parser.add_argument("output", help="Where to write predictions (CSV)")
+    parser.add_argument("--version", default="v1")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--drift", action="store_true",
+                        help="Add the batch to the drift monitor state")
+    parser.add_argument("--explain", type=int, default=0, metavar="K",
+                        help="Add the top K drivers of each prediction")
+    parser.add_argument("--calibrated", action="store_true",
+                        help="Add the calibrated asthma probability")
+    args = parser.parse_args(argv)
+    drift_state = None
+    if args.drift:
+        drift_state = drift_state_path(
+            os.path.basename(os.path.normpath(args.model_dir)), args.version
+        )
+
+    report = score_csv(
+        args.input,
+        args.output,
+        version=args.version,
+        model_dir=args.model_dir,
+        chunksize=args.chunksize,
+        n_jobs=args.n_jobs,
+        threshold=args.threshold,
+        drift_state=drift_state,
+        explain_top=args.explain,
+        calibrated=args.calibrated,
+    )
+    print(
+        f"Scored {report['rows']} rows in {report['seconds']:.2f}s "
+        f"({report['rows_per_second']:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
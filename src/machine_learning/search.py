@@ -0,0 +1,336 @@
+"""
+Parallel, resumable hyperparameter search.
+
+Promoted from the HyperparameterOptimizationSearch class in
+05_PredictingAsthma. Every (model, params, fold) combination is an
+independent task run on a process pool. Each fold score is appended to a
+cache log under outputs/cache/search/ as soon as it finishes, keyed on the
+training data hash, fold indices, model, pipeline settings, params and
+scoring, so an interrupted or extended search only fits the folds it has
+not seen. Successive halving can drop weak candidates of each model after
+the first folds. Randomized searches need a fixed random_state (default
+0), otherwise each run would draw new candidates and never hit the cache.
+"""
+import json
+import math
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import (
+    ParameterGrid,
+    ParameterSampler,
+    StratifiedKFold,
+)
+
+from src.machine_learning.pipelines import PipelineClf
+from src.result_cache import content_hash
+
+SEARCH_CACHE_DIR = "outputs/cache/search"
+
+# Training data shared with each worker process by _init_worker
+_worker_data = {}
+
+
+def _init_worker(X, y):
+    _worker_data["X"] = X
+    _worker_data["y"] = y
+
+
+def _fit_and_score(estimator, train_idx, test_idx, scoring):
+    X, y = _worker_data["X"], _worker_data["y"]
+    estimator.fit(X.iloc[train_idx], y.iloc[train_idx])
+    X_test, y_test = X.iloc[test_idx], y.iloc[test_idx]
+    if scoring is None:
+        return float(estimator.score(X_test, y_test))
+    return float(get_scorer(scoring)(estimator, X_test, y_test))
+
+
+class FoldScoreCache:
+    """
+    Append-only JSON-lines log of fold scores for one training set. A
+    partial last line left by an interrupted run is cut off on load, so
+    the next entry starts on a line of its own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.scores = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                content = f.read()
+                end = content.rfind(b"\n") + 1
+                if end < len(content):
+                    f.truncate(end)
+            for line in content[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.scores[entry["key"]] = entry["score"]
+
+    def get(self, key):
+        return self.scores.get(key)
+
+    def add(self, key, score):
+        with self._lock:
+            self.scores[key] = score
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": key, "score": score}) + "\n")
+
+
+class SearchResult:
+    """
+    Mirrors the attributes of a fitted GridSearchCV used in the notebook.
+    """
+
+    def __init__(self, best_params_, best_score_, best_estimator_):
+        self.best_params_ = best_params_
+        self.best_score_ = best_score_
+        self.best_estimator_ = best_estimator_
+
+
+class HyperparameterOptimizationSearch:
+    """
+    Custom class for hyperparameter optimization.
+    Grid or randomized search over PipelineClf-wrapped models.
+    """
+
+    def __init__(
+        self, models, params, search_type="grid", n_iter=10,
+        random_state=0, pipeline_factory=PipelineClf,
+        cache_dir=SEARCH_CACHE_DIR,
+    ):
+        self.models = models
+        self.params = params
+        self.keys = list(models.keys())
+        self.search_type = search_type.lower()
+        if self.search_type == "random" and random_state is None:
+            raise ValueError(
+                "A randomized search needs a fixed random_state, or every "
+                "run samples new candidates and the fold cache never hits."
+            )
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.pipeline_factory = pipeline_factory
+        self.cache_dir = cache_dir
+        self.searches = {}
+        self.fold_scores = {}
+        self.stats = {"fitted": 0, "cached": 0, "pruned": 0}
+
+    def _candidates(self, key):
+        if self.search_type == "grid":
+            return list(ParameterGrid(self.params[key]))
+        if self.search_type == "random":
+            grid = self.params[key]
+            if not grid:
+                return [{}]
+            return list(ParameterSampler(
+                grid, n_iter=self.n_iter, random_state=self.random_state
+            ))
+        raise ValueError("search_type must be either 'grid' or 'random'.")
+
+    def fit(self, X, y, cv=5, n_jobs=-1, verbose=1, scoring=None,
+            refit=True, halving=False, eta=3, min_folds=1):
+        """
+        Run the search. With halving=True, candidates are scored on
+        min_folds folds first, and only the best 1/eta continue to the next
+        rung, whose fold budget is eta times larger (successive halving).
+        """
+        X = pd.DataFrame(X).reset_index(drop=True)
+        y = pd.Series(np.ravel(y), name="y")
+        if isinstance(cv, int):
+            cv = StratifiedKFold(n_splits=cv)
+        folds = list(cv.split(X, y))
+        fold_keys = [content_hash(test_idx) for _, test_idx in folds]
+
+        data_hash = content_hash(X, y)
+        cache = FoldScoreCache(
+            os.path.join(self.cache_dir, f"{data_hash}.jsonl")
+        )
+        n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+
+        candidates = {
+            key: self._candidates(key) for key in self.keys
+        }
+        # The factory's settings (SMOTE, scaling, selection, ...) show up
+        # in the pipeline's params, so a different factory misses the cache
+        model_ids = {
+            key: content_hash(
+                type(self.models[key]).__name__,
+                self.pipeline_factory(self.models[key]).get_params(),
+            )
+            for key in self.keys
+        }
+
+        def task_key(key, params, fold):
+            return content_hash(
+                model_ids[key], params, fold_keys[fold], scoring
+            )
+
+        # Rungs of fold budgets, e.g. [1, 3, 5] for 5 folds and eta=3
+        if halving:
+            budgets = []
+            budget = min_folds
+            while budget < len(folds):
+                budgets.append(budget)
+                budget *= eta
+            budgets.append(len(folds))
+        else:
+            budgets = [len(folds)]
+
+        alive = [
+            (key, i) for key in self.keys
+            for i in range(len(candidates[key]))
+        ]
+        scores = {}
+
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker, initargs=(X, y)
+        ) as pool:
+            for rung, budget in enumerate(budgets):
+                if verbose:
+                    print(
+                        f"Rung {rung}: {len(alive)} candidates "
+                        f"x {budget} folds"
+                    )
+                futures = {}
+                for key, i in alive:
+                    params = candidates[key][i]
+                    for fold in range(budget):
+                        if (key, i, fold) in scores:
+                            continue
+                        cache_key = task_key(key, params, fold)
+                        cached = cache.get(cache_key)
+                        if cached is not None:
+                            scores[(key, i, fold)] = cached
+                            self.stats["cached"] += 1
+                            continue
+                        estimator = self.pipeline_factory(
+                            self.models[key]
+                        ).set_params(**params)
+                        train_idx, test_idx = folds[fold]
+                        future = pool.submit(
+                            _fit_and_score, estimator, train_idx,
+                            test_idx, scoring,
+                        )
+                        futures[future] = (key, i, fold, cache_key)
+
+                for future in as_completed(futures):
+                    key, i, fold, cache_key = futures[future]
+                    score = future.result()
+                    cache.add(cache_key, score)
+                    scores[(key, i, fold)] = score
+                    self.stats["fitted"] += 1
+
+                if budget < len(folds):
+                    # Prune within each model, so one strong model family
+                    # cannot eliminate every candidate of another
+                    mean = {
+                        cand: np.mean(
+                            [scores[(*cand, f)] for f in range(budget)]
+                        )
+                        for cand in alive
+                    }
+                    survivors = []
+                    for key in self.keys:
+                        ranked = sorted(
+                            (cand for cand in alive if cand[0] == key),
+                            key=mean.get, reverse=True,
+                        )
+                        keep = math.ceil(len(ranked) / eta)
+                        self.stats["pruned"] += len(ranked) - keep
+                        survivors.extend(ranked[:keep])
+                    alive = survivors
+
+        # Collect results per model, as cv_results_ would
+        self.fold_scores = {}
+        for key in self.keys:
+            rows = []
+            for i, params in enumerate(candidates[key]):
+                fold_scores = [
+                    scores[(key, i, f)] for f in range(len(folds))
+                    if (key, i, f) in scores
+                ]
+                rows.append({
+                    "params": params,
+                    "scores": fold_scores,
+                    "complete": len(fold_scores) == len(folds),
+                })
+            self.fold_scores[key] = rows
+
+        for key in self.keys:
+            complete = [r for r in self.fold_scores[key] if r["complete"]]
+            if not complete:
+                warnings.warn(
+                    f"No candidate of '{key}' was scored on every fold; "
+                    "it has no search result."
+                )
+                continue
+            best = max(complete, key=lambda r: np.mean(r["scores"]))
+            best_estimator = None
+            if refit:
+                best_estimator = self.pipeline_factory(
+                    clone(self.models[key])
+                ).set_params(**best["params"])
+                best_estimator.fit(X, y)
+            self.searches[key] = SearchResult(
+                best["params"], float(np.mean(best["scores"])),
+                best_estimator,
+            )
+
+        if verbose:
+            print(
+                f"Fitted {self.stats['fitted']} folds, reused "
+                f"{self.stats['cached']} from cache, pruned "
+                f"{self.stats['pruned']} candidates."
+            )
+        return self
+
+    def score_summary(self, sort_by="mean_score"):
+        """
+        Returns a summary dataframe of the search results, with one row per
+        fully evaluated candidate, and the per-model search results.
+        """
+
+        def row(key, scores, params):
+            d = {
+                "estimator": key,
+                "min_score": np.min(scores),
+                "max_score": np.max(scores),
+                "mean_score": np.mean(scores),
+                "std_score": np.std(scores),
+            }
+            return pd.Series({**params, **d})
+
+        rows = [
+            row(key, result["scores"], result["params"])
+            for key in self.fold_scores
+            for result in self.fold_scores[key]
+            if result["complete"]
+        ]
+
+        df = pd.concat(rows, axis=1).T.sort_values(
+            [sort_by], ascending=False
+        )
+        columns = [
+            "estimator", "min_score", "mean_score", "max_score", "std_score"
+        ]
+        columns = columns + [c for c in df.columns if c not in columns]
+        return df[columns], self.searches
+
+    def write_summary(self, path, sort_by="mean_score"):
+        """
+        Save score_summary as CSV.
+        """
+        summary, _ = self.score_summary(sort_by=sort_by)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        summary.to_csv(path, index=False)
+        return path
@@ -0,0 +1,226 @@
+"""
+Local HTTP scoring service for the predict_asthma model.
+
+    python -m src.machine_learning.serve --mode compiled --port 8000
+
+POST /predict with a JSON patient record (or a list of records) and the
+service replies with the asthma probability and predicted class. Both
+modes need the model features (GET /health lists them); other fields are
+ignored. A record without them gets HTTP 400. GET /metrics (p50/p99
+latency) is also available.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from src.machine_learning.compiled_model import (
+    CompiledLogisticModel,
+    verify_compiled,
+)
+from src.machine_learning.score import MODEL_DIR, load_pipelines, score_frame
+
+BENCHMARK_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+# Bundled test split the compiled model is checked against at startup
+VERIFY_SPLIT = "X_test.csv"
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent request latencies and reports percentiles.
+    """
+
+    def __init__(self, maxlen=10_000):
+        self._latencies = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def summary(self):
+        with self._lock:
+            latencies = np.array(self._latencies)
+        if latencies.size == 0:
+            return {"count": 0, "p50_ms": None, "p99_ms": None}
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        return {"count": int(latencies.size), "p50_ms": p50, "p99_ms": p99}
+
+
+class AsthmaScorer:
+    """
+    Scores patient records with either the sklearn pipelines ("pipeline")
+    or the flat NumPy fast path ("compiled"). Pipelines are loaded once.
+    """
+
+    def __init__(self, version="v1", model_dir=MODEL_DIR, mode="compiled",
+                 threshold=0.5):
+        if mode not in ("pipeline", "compiled"):
+            raise ValueError("mode must be either 'pipeline' or 'compiled'.")
+        self.version = version
+        self.mode = mode
+        self.threshold = threshold
+        self.pipeline_dc_fe, self.pipeline_model = load_pipelines(
+            version, model_dir
+        )
+        # Raw fields every record needs, whichever mode scores it
+        self.features = list(self.pipeline_model.feature_names_in_)
+        self.compiled = None
+        self.max_abs_diff = None
+        if mode == "compiled":
+            self.compiled = CompiledLogisticModel.from_pipeline(
+                self.pipeline_model
+            )
+            self.max_abs_diff = verify_compiled(
+                self.compiled,
+                pd.read_csv(os.path.join(model_dir, version, VERIFY_SPLIT)),
+                self.pipeline_model,
+            )
+
+    def predict(self, records):
+        """
+        Return a list of {"asthma_probability", "prediction"} dicts.
+        Raises ValueError if a record lacks any of self.features.
+        """
+        missing = [
+            feature for feature in self.features
+            if any(feature not in record for record in records)
+        ]
+        if missing:
+            raise ValueError(f"Missing feature(s): {', '.join(missing)}")
+        if self.mode == "compiled":
+            proba = self.compiled.predict_proba(
+                self.compiled.to_array(records)
+            )
+        else:
+            proba = score_frame(
+                pd.DataFrame.from_records(records),
+                self.pipeline_model,
+            )["asthma_probability"].to_numpy()
+        return [
+            {
+                "asthma_probability": float(p),
+                "prediction": int(p >= self.threshold),
+            }
+            for p in proba
+        ]
+
+
+def latency_benchmark(scorer, record, n_requests=1_000):
+    """
+    Time n_requests single-patient predictions and return p50/p99 in ms.
+    """
+    tracker = LatencyTracker(maxlen=n_requests)
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        scorer.predict([record])
+        tracker.record(time.perf_counter() - start)
+    return tracker.summary()
+
+
+def make_handler(scorer, tracker):
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {
+                    "status": "ok",
+                    "version": scorer.version,
+                    "mode": scorer.mode,
+                    "features": scorer.features,
+                })
+            elif self.path == "/metrics":
+                self._send_json(200, tracker.summary())
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "Not found"})
+                return
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                single = isinstance(payload, dict)
+                records = [payload] if single else payload
+                predictions = scorer.predict(records)
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            tracker.record(time.perf_counter() - start)
+            self._send_json(200, predictions[0] if single else predictions)
+
+        def log_message(self, format, *args):
+            pass  # keep the hot path quiet
+
+    return ScoringHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve predict_asthma predictions over HTTP."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--version", default="v1")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument(
+        "--mode", choices=["pipeline", "compiled"], default="compiled"
+    )
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument(
+        "--benchmark", action="store_true",
+        help="Report p50/p99 latency of both modes and exit",
+    )
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        record = pd.read_csv(BENCHMARK_DATA).iloc[0].to_dict()
+        for mode in ("pipeline", "compiled"):
+            scorer = AsthmaScorer(args.version, args.model_dir, mode)
+            stats = latency_benchmark(scorer, record)
+            print(
+                f"{mode:>8}: p50 {stats['p50_ms']:.3f} ms, "
+                f"p99 {stats['p99_ms']:.3f} ms"
+            )
+        return
+
+    scorer = AsthmaScorer(
+        args.version, args.model_dir, args.mode, args.threshold
+    )
+    if scorer.max_abs_diff is not None:
+        print(
+            "Compiled model verified against pipeline "
+            f"(max abs diff {scorer.max_abs_diff:.2e})"
+        )
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(scorer, LatencyTracker())
+    )
+    print(f"Serving {args.version} ({args.mode}) on "
+          f"http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
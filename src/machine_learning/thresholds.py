@@ -0,0 +1,146 @@
+"""
+Decision-threshold analysis from a single set of predict_proba scores.
+
+threshold_curve sorts the scores once and derives confusion counts,
+precision, recall and F-beta for every distinct threshold from cumulative
+sums (O(n log n), no re-prediction). bootstrap_threshold_ci resamples
+patients in batched NumPy to put confidence intervals on those metrics.
+A patient is predicted positive when its score is >= the threshold.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _f_beta(precision, recall, beta):
+    b2 = beta ** 2
+    denominator = b2 * precision + recall
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            denominator > 0,
+            (1 + b2) * precision * recall / denominator,
+            0.0,
+        )
+
+
+def _metrics(tp, fp, fn, beta):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+    return precision, recall, _f_beta(precision, recall, beta)
+
+
+def threshold_curve(y_true, y_score, beta=1.0):
+    """
+    Confusion counts and metrics at every distinct score threshold.
+
+    Returns a DataFrame sorted by descending threshold with columns
+    threshold, tp, fp, fn, tn, precision, recall and f_beta.
+    """
+    y_true = np.ravel(y_true).astype(np.int64)
+    y_score = np.ravel(y_score).astype(float)
+
+    order = np.argsort(-y_score, kind="mergesort")
+    scores = y_score[order]
+    labels = y_true[order]
+
+    # Last index of each run of equal scores
+    last = np.r_[np.flatnonzero(np.diff(scores)), scores.size - 1]
+    tp = np.cumsum(labels)[last]
+    fp = (last + 1) - tp
+    n_pos = labels.sum()
+    n_neg = labels.size - n_pos
+    fn = n_pos - tp
+    tn = n_neg - fp
+    precision, recall, f_beta = _metrics(tp, fp, fn, beta)
+
+    return pd.DataFrame({
+        "threshold": scores[last],
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision,
+        "recall": recall,
+        "f_beta": f_beta,
+    })
+
+
+def metrics_at(curve, threshold):
+    """
+    Row of a threshold_curve for an arbitrary threshold (binary search).
+    """
+    # Thresholds are descending; find the lowest one still >= threshold
+    ascending = curve["threshold"].to_numpy()[::-1]
+    pos = np.searchsorted(ascending, threshold, side="left")
+    if pos == ascending.size:
+        # Nothing is predicted positive
+        last = curve.iloc[-1]
+        n_pos = last["tp"] + last["fn"]
+        n_neg = last["fp"] + last["tn"]
+        return pd.Series({
+            "threshold": threshold, "tp": 0, "fp": 0, "fn": n_pos,
+            "tn": n_neg, "precision": 0.0, "recall": 0.0, "f_beta": 0.0,
+        })
+    row = curve.iloc[curve.shape[0] - 1 - pos].copy()
+    row["threshold"] = threshold
+    return row
+
+
+def bootstrap_threshold_ci(y_true, y_score, thresholds, beta=1.0,
+                           n_boot=1000, alpha=0.05, random_state=0,
+                           batch_size=250):
+    """
+    Bootstrap confidence intervals for precision, recall and F-beta at
+    the given thresholds.
+
+    Each patient's score is binned against the thresholds once; every
+    bootstrap replicate is then a vector of resampling counts, and all
+    replicates in a batch are reduced with one matrix product.
+    """
+    y_true = np.ravel(y_true).astype(np.int64)
+    y_score = np.ravel(y_score).astype(float)
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+    order = np.argsort(thresholds)
+    sorted_thresholds = thresholds[order]
+    n, m = y_score.size, sorted_thresholds.size
+
+    # score >= threshold j  <=>  j < bin
+    bins = np.searchsorted(sorted_thresholds, y_score, side="right")
+    one_hot = np.zeros((n, m + 1))
+    one_hot[np.arange(n), bins] = 1.0
+    pos_hist = one_hot * y_true[:, None]
+    neg_hist = one_hot - pos_hist
+
+    rng = np.random.default_rng(random_state)
+    results = {"precision": [], "recall": [], "f_beta": []}
+    for start in range(0, n_boot, batch_size):
+        size = min(batch_size, n_boot - start)
+        weights = rng.multinomial(n, np.full(n, 1.0 / n), size=size)
+        pos = weights @ pos_hist
+        neg = weights @ neg_hist
+        # Counts with score >= threshold j: reverse cumulative sum over bins
+        tp = np.cumsum(pos[:, ::-1], axis=1)[:, ::-1][:, 1:]
+        fp = np.cumsum(neg[:, ::-1], axis=1)[:, ::-1][:, 1:]
+        fn = pos.sum(axis=1, keepdims=True) - tp
+        precision, recall, f_beta = _metrics(tp, fp, fn, beta)
+        results["precision"].append(precision)
+        results["recall"].append(recall)
+        results["f_beta"].append(f_beta)
+
+    # Point estimates on the original sample
+    pos = one_hot.T @ y_true
+    neg = one_hot.sum(axis=0) - pos
+    tp = np.cumsum(pos[::-1])[::-1][1:]
+    fp = np.cumsum(neg[::-1])[::-1][1:]
+    fn = pos.sum() - tp
+    point = dict(zip(("precision", "recall", "f_beta"),
+                     _metrics(tp, fp, fn, beta)))
+
+    inverse = np.argsort(order)
+    table = {"threshold": thresholds}
+    for metric, batches in results.items():
+        samples = np.concatenate(batches, axis=0)
+        lower, upper = np.percentile(
+            samples, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0
+        )
+        table[metric] = point[metric][inverse]
+        table[f"{metric}_lower"] = lower[inverse]
+        table[f"{metric}_upper"] = upper[inverse]
+    return pd.DataFrame(table)
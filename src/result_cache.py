@@ -0,0 +1,136 @@
+"""
+Content-addressed, on-disk cache for analysis results.
+
+A result is stored under outputs/cache/ keyed by a hash of the function
+name, an explicit version and the *contents* of its arguments (DataFrames
+are hashed row by row), so entries survive restarts, are shared between
+worker processes, and are never served for a changed dataset.
+
+    @result_cache(version=1)
+    def expensive_summary(df):
+        ...
+
+Bump `version` whenever the function's logic changes.
+"""
+import functools
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "outputs/cache"
+
+
+def _update_hash(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(b"DataFrame")
+        h.update(repr(list(value.columns)).encode())
+        h.update(repr(list(value.dtypes.astype(str))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values)
+    elif isinstance(value, pd.Series):
+        h.update(b"Series")
+        h.update(repr((value.name, str(value.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values)
+    elif isinstance(value, np.ndarray):
+        h.update(b"ndarray")
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(type(value).__name__.encode())
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, dict):
+        h.update(b"dict")
+        for key in sorted(value, key=repr):
+            _update_hash(h, key)
+            _update_hash(h, value[key])
+    else:
+        h.update(repr(value).encode())
+
+
+def content_hash(*values):
+    """
+    Stable hex digest of the contents of the given values.
+    """
+    h = hashlib.sha256()
+    for value in values:
+        _update_hash(h, value)
+    return h.hexdigest()
+
+
+def result_cache(version=1, cache_dir=CACHE_DIR, max_entries=16,
+                 memory_entries=32):
+    """
+    Decorator caching a function's return value on disk by content hash.
+
+    Results are written atomically (temporary file + rename) so concurrent
+    processes never read a partial entry. Only the newest `max_entries`
+    files per function are kept on disk, and the most recent
+    `memory_entries` results are also held in memory to skip the disk read
+    on repeated calls. Cached results are shared and must not be mutated.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        prefix = func.__qualname__.replace(".", "_")
+        memory = OrderedDict()
+        lock = threading.Lock()
+
+        def cache_path(key):
+            return os.path.join(cache_dir, f"{prefix}-{key}.pkl")
+
+        def prune():
+            paths = sorted(
+                glob.glob(os.path.join(cache_dir, f"{prefix}-*.pkl")),
+                key=os.path.getmtime,
+            )
+            for path in paths[:-max_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = content_hash(name, version, args, kwargs)
+
+            with lock:
+                if key in memory:
+                    memory.move_to_end(key)
+                    return memory[key]
+
+            path = cache_path(key)
+            try:
+                result = joblib.load(path)
+            except Exception:
+                # Missing or unreadable (e.g. written by another version)
+                result = func(*args, **kwargs)
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = (
+                    f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                )
+                joblib.dump(result, tmp_path)
+                os.replace(tmp_path, path)
+                prune()
+
+            with lock:
+                memory[key] = result
+                while len(memory) > memory_entries:
+                    memory.popitem(last=False)
+            return result
+
+        def cache_clear():
+            with lock:
+                memory.clear()
+            for path in glob.glob(os.path.join(cache_dir, f"{prefix}-*.pkl")):
+                os.remove(path)
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
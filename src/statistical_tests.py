@@ -0,0 +1,420 @@
+"""
+Batch significance tests for the Asthma Status Study page.
+
+All features are tested against Diagnosis at once: 2x2 contingency tables
+come from a single matrix product, and chi-square, Fisher's exact,
+Shapiro-Wilk, Welch's t-test and Mann-Whitney U run over every feature in
+vectorized form. The loop implementations the page originally used are
+kept as `*_loop` references for the equivalence check and benchmark:
+
+    python -m src.statistical_tests
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+from scipy.stats import (
+    chi2,
+    chi2_contingency,
+    fisher_exact,
+    mannwhitneyu,
+    shapiro,
+    ttest_ind,
+)
+
+from src.tracing import traced
+
+
+def benjamini_hochberg(p_values):
+    """
+    Benjamini-Hochberg adjusted p-values (false discovery rate).
+    """
+    p = np.asarray(p_values, dtype=float)
+    n = p.size
+    if n == 0:
+        return p
+    order = np.argsort(p)
+    ranked = p[order] * n / np.arange(1, n + 1)
+    # Enforce monotonicity from the largest p-value down
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    adjusted = np.empty(n)
+    adjusted[order] = np.minimum(ranked, 1.0)
+    return adjusted
+
+
+def contingency_tables(features, target):
+    """
+    2x2 tables for every binary feature against a binary target.
+
+    Returns an array of shape (n_features, 2, 2) where axis 1 is the
+    feature value (0, 1) and axis 2 the target value (0, 1), matching
+    pd.crosstab(feature, target).
+    """
+    X = np.asarray(features, dtype=np.int64)
+    y = np.asarray(target, dtype=np.int64)
+    n = y.size
+    n_pos = y.sum()
+
+    c11 = X.T @ y
+    c10 = X.sum(axis=0) - c11
+    c01 = n_pos - c11
+    c00 = n - n_pos - c10
+
+    return np.stack(
+        [np.stack([c00, c01], axis=1), np.stack([c10, c11], axis=1)],
+        axis=1,
+    )
+
+
+def chi2_2x2(tables):
+    """
+    Yates-corrected chi-square test on a stack of 2x2 tables, as
+    scipy.stats.chi2_contingency does for a single table.
+    """
+    observed = tables.astype(float)
+    n = observed.sum(axis=(1, 2), keepdims=True)
+    expected = (
+        observed.sum(axis=2, keepdims=True)
+        * observed.sum(axis=1, keepdims=True)
+        / n
+    )
+    diff = expected - observed
+    corrected = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+    statistic = ((corrected - expected) ** 2 / expected).sum(axis=(1, 2))
+    return statistic, chi2.sf(statistic, 1), expected
+
+
+def _log_hypergeom_pmf(x, total, n_success, n_draws):
+    return (
+        gammaln(n_success + 1) - gammaln(x + 1) - gammaln(n_success - x + 1)
+        + gammaln(total - n_success + 1) - gammaln(n_draws - x + 1)
+        - gammaln(total - n_success - n_draws + x + 1)
+        - gammaln(total + 1) + gammaln(n_draws + 1)
+        + gammaln(total - n_draws + 1)
+    )
+
+
+def fisher_exact_2x2(tables):
+    """
+    Two-sided Fisher's exact test on a stack of 2x2 tables.
+
+    The hypergeometric pmf is evaluated over each table's full support in
+    one padded array, and tables at least as extreme as the observed one
+    are summed. Returns (odds_ratio, p_value) like scipy.stats.fisher_exact.
+    """
+    c = tables.astype(np.int64)
+    row1 = c[:, 0, 0] + c[:, 0, 1]
+    row2 = c[:, 1, 0] + c[:, 1, 1]
+    col1 = c[:, 0, 0] + c[:, 1, 0]
+    total = row1 + row2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        odds_ratio = np.where(
+            (c[:, 1, 0] > 0) & (c[:, 0, 1] > 0),
+            c[:, 0, 0] * c[:, 1, 1] / (c[:, 1, 0] * c[:, 0, 1]),
+            np.inf,
+        )
+
+    low = np.maximum(0, col1 - row2)
+    high = np.minimum(row1, col1)
+    support = low[:, None] + np.arange((high - low).max() + 1)[None, :]
+    valid = support <= high[:, None]
+
+    log_pmf = _log_hypergeom_pmf(
+        np.where(valid, support, low[:, None]),
+        total[:, None], row1[:, None], col1[:, None],
+    )
+    log_observed = _log_hypergeom_pmf(c[:, 0, 0], total, row1, col1)
+    # Relative tolerance for ties, as in R's fisher.test
+    extreme = valid & (log_pmf <= log_observed[:, None] + 1e-7)
+    p_value = np.minimum(
+        np.where(extreme, np.exp(log_pmf), 0.0).sum(axis=1), 1.0
+    )
+
+    # Degenerate tables (an empty row or column)
+    empty = (np.minimum(row1, row2) == 0) | (
+        np.minimum(col1, total - col1) == 0
+    )
+    odds_ratio = np.where(empty, np.nan, odds_ratio)
+    p_value = np.where(empty, 1.0, p_value)
+    return odds_ratio, p_value
+
+
+def _significance(p_values):
+    return np.where(p_values < 0.05, "Significant", "Not significant")
+
+
+def _results_frame(columns, features, bh):
+    results_df = pd.DataFrame(columns, index=features).astype(object)
+    if bh:
+        results_df["p-value (BH)"] = benjamini_hochberg(
+            results_df["p-value"].astype(float)
+        )
+    results_df.index.name = "Feature"
+    return results_df
+
+
+@traced()
+def continuous_significance(df_updated, bh=False):
+    """
+    Create a dataframe for continuous results.
+
+    Shapiro-Wilk decides per feature between Welch's t-test (both groups
+    normal) and Mann-Whitney U. bh=True adds Benjamini-Hochberg adjusted
+    p-values.
+    """
+    continuous_features = df_updated.select_dtypes(
+        include="float"
+    ).columns.tolist()
+
+    values = df_updated[continuous_features].to_numpy(dtype=float)
+    diagnosis = df_updated["Diagnosis"].to_numpy()
+    group0 = values[diagnosis == 0]
+    group1 = values[diagnosis == 1]
+
+    n0 = np.sum(~np.isnan(group0), axis=0)
+    n1 = np.sum(~np.isnan(group1), axis=0)
+    nan_policy = "omit" if np.isnan(values).any() else "propagate"
+
+    # Shapiro needs at least three observations; treat fewer as non-normal
+    p0 = np.zeros(len(continuous_features))
+    p1 = np.zeros(len(continuous_features))
+    if (n0 >= 3).any():
+        p0[n0 >= 3] = shapiro(
+            group0[:, n0 >= 3], axis=0, nan_policy=nan_policy
+        ).pvalue
+    if (n1 >= 3).any():
+        p1[n1 >= 3] = shapiro(
+            group1[:, n1 >= 3], axis=0, nan_policy=nan_policy
+        ).pvalue
+
+    # Only run the test each feature needs
+    normal = (p0 > 0.05) & (p1 > 0.05)
+    statistic = np.empty(len(continuous_features))
+    p_values = np.empty(len(continuous_features))
+    if normal.any():
+        statistic[normal], p_values[normal] = ttest_ind(
+            group0[:, normal], group1[:, normal], axis=0, equal_var=False,
+            nan_policy=nan_policy,
+        )
+    if (~normal).any():
+        statistic[~normal], p_values[~normal] = mannwhitneyu(
+            group0[:, ~normal], group1[:, ~normal], alternative="two-sided",
+            axis=0, nan_policy=nan_policy,
+        )
+
+    return _results_frame(
+        {
+            "test": np.where(normal, "t-test", "Mann-Whitney U"),
+            "statistic": statistic,
+            "p-value": p_values,
+            "significance": _significance(p_values),
+        },
+        continuous_features,
+        bh,
+    )
+
+
+@traced()
+def binary_significance(df_updated, bh=False):
+    """
+    Create a dataframe for binary results.
+
+    Chi-square is used unless any expected count is below five, in which
+    case Fisher's exact test is used. Features with more than two levels
+    fall back to the per-feature loop. bh=True adds Benjamini-Hochberg
+    adjusted p-values.
+    """
+    # Remove diagnosis for analysis
+    binary_features = [
+        col
+        for col in df_updated.select_dtypes("integer").columns
+        if col != "Diagnosis"
+    ]
+
+    values = df_updated[binary_features].to_numpy()
+    is_binary = ((values == 0) | (values == 1)).all(axis=0)
+    is_binary &= values.min(axis=0) != values.max(axis=0)
+    batch_features = [f for f, b in zip(binary_features, is_binary) if b]
+
+    tables = contingency_tables(
+        values[:, is_binary], df_updated["Diagnosis"].to_numpy()
+    )
+    _, p_chi, expected = chi2_2x2(tables)
+    use_fisher = (expected < 5).any(axis=(1, 2))
+
+    odds_ratio = np.empty(len(batch_features))
+    p_values = np.empty(len(batch_features))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        odds_ratio[~use_fisher] = (
+            tables[~use_fisher, 1, 1] / tables[~use_fisher, 1, 0]
+        ) / (tables[~use_fisher, 0, 1] / tables[~use_fisher, 0, 0])
+    p_values[~use_fisher] = p_chi[~use_fisher]
+    if use_fisher.any():
+        odds_ratio[use_fisher], p_values[use_fisher] = fisher_exact_2x2(
+            tables[use_fisher]
+        )
+
+    results_df = pd.DataFrame(
+        {
+            "test": np.where(use_fisher, "Fisher's exact", "Chi-square"),
+            "p-value": p_values,
+            "odds_ratio": odds_ratio,
+            "significance": _significance(p_values),
+        },
+        index=batch_features,
+    )
+
+    other_features = [f for f, b in zip(binary_features, is_binary) if not b]
+    if other_features:
+        results_df = pd.concat(
+            [
+                results_df,
+                binary_significance_loop(
+                    df_updated[other_features + ["Diagnosis"]]
+                ),
+            ]
+        ).loc[binary_features]
+
+    return _results_frame(
+        results_df.to_dict(orient="list"), results_df.index, bh
+    )
+
+
+def continuous_significance_loop(df_updated):
+    """
+    Reference per-feature implementation of continuous_significance.
+    """
+    continuous_features = df_updated.select_dtypes(
+        include="float"
+    ).columns.tolist()
+
+    continuous_results = {}
+
+    for feature in continuous_features:
+        group0 = df_updated[df_updated["Diagnosis"] == 0][feature].dropna()
+        group1 = df_updated[df_updated["Diagnosis"] == 1][feature].dropna()
+
+        # Check normality
+        _, p0 = shapiro(group0) if len(group0) >= 3 else (None, 0)
+        _, p1 = shapiro(group1) if len(group1) >= 3 else (None, 0)
+
+        # Choose t-test if normal distribution, else Mann-Whitney
+        if p0 > 0.05 and p1 > 0.05:
+            stat, p = ttest_ind(group0, group1, equal_var=False)
+            test_name = "t-test"
+        else:
+            stat, p = mannwhitneyu(group0, group1, alternative="two-sided")
+            test_name = "Mann-Whitney U"
+
+        significance = "Significant" if p < 0.05 else "Not significant"
+
+        continuous_results[feature] = {
+            "test": test_name,
+            "statistic": stat,
+            "p-value": p,
+            "significance": significance,
+        }
+
+    continuous_results_df = pd.DataFrame(continuous_results).T
+    continuous_results_df.index.name = "Feature"
+    return continuous_results_df
+
+
+def binary_significance_loop(df_updated):
+    """
+    Reference per-feature implementation of binary_significance.
+    """
+    binary_features = [
+        col
+        for col in df_updated.select_dtypes("integer").columns
+        if col != "Diagnosis"
+    ]
+
+    binary_results = {}
+
+    for feature in binary_features:
+        table = pd.crosstab(df_updated[feature], df_updated["Diagnosis"])
+
+        chi2_stat, p_chi, dof, expected = chi2_contingency(table)
+
+        # Decide whether to use Fisher (if any expected count < 5)
+        if (expected < 5).any():
+            oddsratio, p_value = fisher_exact(table)
+            test_used = "Fisher's exact"
+        else:
+            p_value = p_chi
+            oddsratio = (table.iloc[1, 1] / table.iloc[1, 0]) / (
+                table.iloc[0, 1] / table.iloc[0, 0]
+            )
+            test_used = "Chi-square"
+
+        significance = (
+            "Significant" if p_value < 0.05 else "Not significant"
+        )
+
+        binary_results[feature] = {
+            "test": test_used,
+            "p-value": p_value,
+            "odds_ratio": oddsratio,
+            "significance": significance,
+        }
+
+    binary_results_df = pd.DataFrame(binary_results).T
+    binary_results_df.index.name = "Feature"
+    return binary_results_df
+
+
+def benchmark(df_updated, scales=(1, 10, 100), repeats=3):
+    """
+    Time the batch tests against the loop references on row-replicated
+    copies of df_updated. Returns a DataFrame of best-of-repeats seconds.
+    """
+    rows = []
+    for scale in scales:
+        df_scaled = pd.concat([df_updated] * scale, ignore_index=True)
+        for name, batch, loop in (
+            ("continuous", continuous_significance,
+             continuous_significance_loop),
+            ("binary", binary_significance, binary_significance_loop),
+        ):
+            timings = {}
+            for label, func in (("loop", loop), ("batch", batch)):
+                best = np.inf
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    func(df_scaled)
+                    best = min(best, time.perf_counter() - start)
+                timings[label] = best
+            rows.append({
+                "tests": name,
+                "rows": len(df_scaled),
+                "loop_seconds": timings["loop"],
+                "batch_seconds": timings["batch"],
+                "speedup": timings["loop"] / timings["batch"],
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    from src.data_management import clean_patient_data
+
+    df = clean_patient_data(
+        pd.read_csv("outputs/datasets/collection/asthma_disease_data.csv")
+    )
+    for batch, loop in (
+        (continuous_significance, continuous_significance_loop),
+        (binary_significance, binary_significance_loop),
+    ):
+        expected = loop(df)
+        actual = batch(df)
+        pd.testing.assert_index_equal(actual.index, expected.index)
+        assert (actual["test"] == expected["test"]).all()
+        np.testing.assert_allclose(
+            actual["p-value"].astype(float),
+            expected["p-value"].astype(float),
+            rtol=1e-6,
+        )
+    print("Batch results match the loop implementations.")
+    print(benchmark(df).to_string(index=False))
@@ -0,0 +1,227 @@
+"""
+Subgroup analytics cube for asthma prevalence and model performance.
+
+Patients are counted in every combination of Age band x Gender x
+Ethnicity x EducationLevel (both collapsed as in process_categorical) x
+the six symptom flags: 5 x 2 x 2 x 2 x 2^6 = 2,560 cells. Each cell holds
+six additive measures (patients, asthma cases, and the evaluated
+patients, their asthma cases, predicted cases and true positives), filled
+in one bincount pass. Prevalence, recall and precision are derived from
+the summed measures. Roll-ups and slices are therefore sums over a small
+dense array: microseconds, and exact at every level.
+
+Prevalence counts every patient. Recall and precision count only the
+evaluated patients: those held out from training, i.e. the model
+version's test split (see held_out), so they are not in-sample figures.
+
+    python -m src.subgroup_cube --by AgeBand Gender
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import CATEGORY_LABELS
+from src.data_management import EDUCATION_LEVEL_MAP, ETHNICITY_MAP
+
+TARGET = "Diagnosis"
+AGE_EDGES = [18, 35, 50, 65]
+AGE_BANDS = ["5-17", "18-34", "35-49", "50-64", "65+"]
+SYMPTOMS = [
+    "Wheezing", "ShortnessOfBreath", "ChestTightness", "Coughing",
+    "NighttimeSymptoms", "ExerciseInduced",
+]
+MEASURES = ["patients", "asthma", "evaluated", "evaluated_asthma",
+            "predicted", "true_positive"]
+# Cells below this size are flagged in roll-ups (cf. the merged groups)
+MIN_CELL_SIZE = 30
+
+
+def _collapsed_labels(column, mapping):
+    # e.g. Ethnicity 1 -> "African American/Asian/Other"
+    labels = CATEGORY_LABELS[column]
+    codes = sorted({mapping.get(code, code) for code in range(len(labels))})
+    return [
+        "/".join(
+            label for code, label in enumerate(labels)
+            if mapping.get(code, code) == collapsed
+        )
+        for collapsed in codes
+    ]
+
+
+DIMENSIONS = {
+    "AgeBand": AGE_BANDS,
+    "Gender": ["Male", "Female"],
+    "Ethnicity": _collapsed_labels("Ethnicity", ETHNICITY_MAP),
+    "EducationLevel": _collapsed_labels(
+        "EducationLevel", EDUCATION_LEVEL_MAP
+    ),
+    **{symptom: ["No", "Yes"] for symptom in SYMPTOMS},
+}
+
+
+def dimension_codes(df):
+    """
+    Integer code of every patient on each cube dimension, from raw
+    (uncollapsed) patient data.
+    """
+    codes = {
+        "AgeBand": np.searchsorted(
+            AGE_EDGES, df["Age"].to_numpy(), side="right"
+        ),
+        "Gender": df["Gender"].to_numpy(),
+        "Ethnicity": df["Ethnicity"].map(ETHNICITY_MAP).to_numpy(),
+        "EducationLevel": (
+            df["EducationLevel"].replace(EDUCATION_LEVEL_MAP).to_numpy()
+        ),
+    }
+    for symptom in SYMPTOMS:
+        codes[symptom] = df[symptom].to_numpy()
+    return {name: np.asarray(c, dtype=np.intp) for name, c in codes.items()}
+
+
+def held_out(df, pipeline_model, X_test):
+    """
+    Mask of the patients in raw patient data whose model inputs are a row
+    of X_test (the version's test split). Values are compared at float32
+    precision, so frames from a columnar export match too.
+    """
+    from src.machine_learning.score import model_inputs
+
+    def key(X):
+        return X[list(pipeline_model.feature_names_in_)].astype("float32")
+
+    merged = key(model_inputs(df, pipeline_model)).merge(
+        key(X_test).drop_duplicates(), how="left", indicator=True
+    )
+    return merged["_merge"].eq("both").to_numpy()
+
+
+def _rates(table):
+    table = table.copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table["prevalence"] = table["asthma"] / table["patients"]
+        table["recall"] = table["true_positive"] / table["evaluated_asthma"]
+        table["precision"] = table["true_positive"] / table["predicted"]
+    table["small"] = table["patients"] < MIN_CELL_SIZE
+    return table
+
+
+class SubgroupCube:
+    """
+    Dense array of additive measures over named dimensions.
+    """
+
+    def __init__(self, values, dims):
+        self.values = values
+        self.dims = dims
+
+    @classmethod
+    def build(cls, df, predictions=None, evaluated=None):
+        """
+        Cube from raw patient data and, optionally, the model's predicted
+        class for each patient (model measures are 0 without it). Only
+        patients in the boolean mask `evaluated` (default: all) count
+        towards the model measures.
+        """
+        codes = dimension_codes(df)
+        shape = tuple(len(labels) for labels in DIMENSIONS.values())
+        cell = np.ravel_multi_index(
+            [codes[name] for name in DIMENSIONS], shape
+        )
+        asthma = df[TARGET].to_numpy(dtype=float)
+        if predictions is None:
+            predicted = np.zeros(len(df))
+        else:
+            predicted = np.asarray(predictions, dtype=float)
+        if evaluated is None:
+            evaluated = np.ones(len(df))
+        else:
+            evaluated = np.asarray(evaluated, dtype=float)
+        predicted = predicted * evaluated
+        weights = np.stack([
+            np.ones(len(df)), asthma, evaluated, asthma * evaluated,
+            predicted, asthma * predicted,
+        ])
+        size = int(np.prod(shape))
+        values = np.stack(
+            [np.bincount(cell, weights=w, minlength=size) for w in weights],
+            axis=-1,
+        ).astype(np.int64)
+        return cls(values.reshape(*shape, len(MEASURES)), dict(DIMENSIONS))
+
+    def slice(self, **selection):
+        """
+        Sub-cube for fixed dimension labels, e.g. slice(Gender="Female",
+        Wheezing="Yes"); fixed dimensions are dropped.
+        """
+        index = []
+        dims = {}
+        for name, labels in self.dims.items():
+            if name in selection:
+                index.append(labels.index(selection[name]))
+            else:
+                index.append(slice(None))
+                dims[name] = labels
+        return SubgroupCube(self.values[tuple(index)], dims)
+
+    def rollup(self, *by):
+        """
+        Measures and rates summed over every dimension not in `by`, one
+        row per combination of the `by` labels.
+        """
+        names = list(self.dims)
+        unknown = set(by) - set(names)
+        if unknown:
+            raise KeyError(f"Unknown dimensions: {sorted(unknown)}")
+        summed = self.values.sum(
+            axis=tuple(i for i, name in enumerate(names) if name not in by)
+        )
+        # Summed axes keep their original order; reorder to match `by`
+        kept = [name for name in names if name in by]
+        summed = np.moveaxis(
+            summed, [kept.index(name) for name in by], range(len(by))
+        )
+        if by:
+            index = pd.MultiIndex.from_product(
+                [self.dims[name] for name in by], names=list(by)
+            )
+        else:
+            index = pd.Index(["All"])
+        table = pd.DataFrame(
+            summed.reshape(-1, len(MEASURES)), index=index, columns=MEASURES
+        )
+        return _rates(table)
+
+
+def main(argv=None):
+    from src.machine_learning.score import (
+        MODEL_DIR,
+        load_pipelines,
+        score_frame,
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Roll up the subgroup cube along some dimensions."
+    )
+    parser.add_argument("--by", nargs="*", default=["AgeBand"],
+                        choices=list(DIMENSIONS))
+    parser.add_argument(
+        "--data", default="outputs/datasets/collection/asthma_disease_data.csv"
+    )
+    parser.add_argument("--version", default="v1")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.data)
+    _, pipeline_model = load_pipelines(args.version)
+    predictions = score_frame(df, pipeline_model)["prediction"]
+    X_test = pd.read_csv(f"{MODEL_DIR}/{args.version}/X_test.csv")
+    cube = SubgroupCube.build(
+        df, predictions, held_out(df, pipeline_model, X_test)
+    )
+    print(cube.rollup(*args.by).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Synthetic patient data for load and scale testing.
+
+SyntheticPatientModel is fitted on asthma_disease_data.csv separately
+for each Diagnosis class:
+
+* continuous measures and Age: a Gaussian copula. The empirical marginal
+  of each column is kept, and the correlation of their normal scores is
+  reproduced.
+* binary flags: Bernoulli rates conditional on the class.
+* Ethnicity and EducationLevel: category frequencies conditional on the
+  class.
+
+Generated data has the source schema (same columns, order and dtypes;
+PatientID continues after the source IDs; DoctorInCharge is constant).
+Every chunk is generated from its own child seed, so the output depends
+only on the seed and chunk size, not on the number of workers. Workers
+also format their chunk as CSV, leaving the parent process to write
+bytes in order.
+
+Float formatting dominates CSV output (about 6 MB/s per core at full
+precision). --float-format (e.g. %.6f) trims it somewhat. --format
+columnar writes each chunk as a typed columnar part
+(src.columnar_store.export_columnar) instead, which is more than an
+order of magnitude faster; load_synthetic reads the parts back.
+
+    python -m src.synthetic_data --rows 10000000 --output big.csv --jobs 8
+    python -m src.synthetic_data --rows 10000000 --output big.cols \
+        --format columnar
+"""
+import argparse
+import glob
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from src.columnar_store import (
+    BINARY_FLAGS,
+    CATEGORY_LABELS,
+    CONTINUOUS_MEASURES,
+    export_columnar,
+    load_columnar,
+)
+
+SOURCE_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+TARGET = "Diagnosis"
+COPULA_COLUMNS = ["Age", *CONTINUOUS_MEASURES]
+FLAG_COLUMNS = [c for c in BINARY_FLAGS if c != TARGET]
+
+
+class SyntheticPatientModel:
+    """
+    Per-class copula/Bernoulli/categorical model of the patient table.
+    """
+
+    def __init__(self, columns, dtypes, class_prior, classes, id_start,
+                 doctor):
+        self.columns = columns
+        self.dtypes = dtypes
+        self.class_prior = class_prior
+        self.classes = classes
+        self.id_start = id_start
+        self.doctor = doctor
+
+    @classmethod
+    def fit(cls, df):
+        classes = {}
+        labels = np.sort(df[TARGET].unique())
+        for label in labels:
+            part = df[df[TARGET] == label]
+            values = part[COPULA_COLUMNS].to_numpy(dtype=float)
+            n = len(values)
+            # Normal scores from ranks; their correlation defines the copula
+            ranks = values.argsort(axis=0).argsort(axis=0) + 1
+            scores = ndtri(ranks / (n + 1))
+            corr = np.corrcoef(scores, rowvar=False)
+            classes[int(label)] = {
+                "sorted": np.sort(values, axis=0),
+                "cholesky": np.linalg.cholesky(
+                    corr + 1e-10 * np.eye(len(COPULA_COLUMNS))
+                ),
+                "flag_rates": part[FLAG_COLUMNS].mean().to_numpy(),
+                "category_cdf": {
+                    column: np.cumsum(
+                        part[column].value_counts(normalize=True)
+                        .reindex(range(len(labels_)), fill_value=0.0)
+                        .to_numpy()
+                    )
+                    for column, labels_ in CATEGORY_LABELS.items()
+                },
+            }
+        prior = df[TARGET].value_counts(normalize=True).reindex(labels)
+        return cls(
+            columns=list(df.columns),
+            dtypes=df.dtypes.astype(str).to_dict(),
+            class_prior=prior.to_numpy(),
+            classes=classes,
+            id_start=int(df["PatientID"].max()) + 1,
+            doctor=str(df["DoctorInCharge"].mode().iloc[0]),
+        )
+
+    def _sample_class(self, params, n, rng):
+        sorted_values = params["sorted"]
+        m = sorted_values.shape[0]
+        z = rng.standard_normal((n, len(COPULA_COLUMNS)))
+        u = ndtr(z @ params["cholesky"].T)
+        # Empirical quantile function, linearly interpolated
+        position = u * (m - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, m - 1)
+        frac = position - low
+        columns = np.arange(len(COPULA_COLUMNS))
+        copula = (
+            sorted_values[low, columns] * (1 - frac)
+            + sorted_values[high, columns] * frac
+        )
+
+        flags = (rng.random((n, len(FLAG_COLUMNS)))
+                 < params["flag_rates"]).astype(np.int64)
+        categories = {
+            column: np.searchsorted(cdf, rng.random(n) * cdf[-1],
+                                    side="right")
+            for column, cdf in params["category_cdf"].items()
+        }
+        return copula, flags, categories
+
+    def sample(self, n, rng, id_offset=0):
+        """
+        n synthetic patients as a DataFrame with the source schema.
+        """
+        labels = np.array(sorted(self.classes))
+        target = labels[
+            np.searchsorted(np.cumsum(self.class_prior), rng.random(n),
+                            side="right").clip(max=len(labels) - 1)
+        ]
+        data = {
+            "PatientID": self.id_start + id_offset + np.arange(n),
+            TARGET: target,
+            "DoctorInCharge": np.full(n, self.doctor, dtype=object),
+        }
+        for column in COPULA_COLUMNS + FLAG_COLUMNS:
+            data[column] = np.zeros(n)
+        for column in CATEGORY_LABELS:
+            data[column] = np.zeros(n, dtype=np.int64)
+
+        for label, params in self.classes.items():
+            rows = np.flatnonzero(target == label)
+            if not rows.size:
+                continue
+            copula, flags, categories = self._sample_class(
+                params, rows.size, rng
+            )
+            for i, column in enumerate(COPULA_COLUMNS):
+                data[column][rows] = copula[:, i]
+            for i, column in enumerate(FLAG_COLUMNS):
+                data[column][rows] = flags[:, i]
+            for column, values in categories.items():
+                data[column][rows] = values
+
+        df = pd.DataFrame(data)[self.columns]
+        integer_columns = [
+            c for c, dtype in self.dtypes.items() if dtype.startswith("int")
+        ]
+        df[integer_columns] = np.rint(df[integer_columns]).astype(np.int64)
+        return df
+
+
+def chunk_seeds(seed, n_chunks):
+    return np.random.SeedSequence(seed).spawn(n_chunks)
+
+
+def iter_synthetic(model, n_rows, chunksize=100_000, seed=0):
+    """
+    Yield synthetic chunks serially (same data as the parallel writer).
+    """
+    n_chunks = -(-n_rows // chunksize)
+    for i, child in enumerate(chunk_seeds(seed, n_chunks)):
+        n = min(chunksize, n_rows - i * chunksize)
+        yield model.sample(n, np.random.default_rng(child), i * chunksize)
+
+
+_worker_model = {}
+
+
+def _init_worker(model):
+    _worker_model["model"] = model
+
+
+def _sample_chunk(n, child_seed, id_offset):
+    return _worker_model["model"].sample(
+        n, np.random.default_rng(child_seed), id_offset
+    )
+
+
+def _csv_chunk(n, child_seed, id_offset, header, float_format):
+    df = _sample_chunk(n, child_seed, id_offset)
+    return df.to_csv(
+        header=header, index=False, float_format=float_format
+    ).encode()
+
+
+def _columnar_chunk(n, child_seed, id_offset, out_dir):
+    export_columnar(_sample_chunk(n, child_seed, id_offset), out_dir)
+    return sum(
+        os.path.getsize(os.path.join(out_dir, name))
+        for name in os.listdir(out_dir)
+    )
+
+
+def load_synthetic(path):
+    """
+    Read a columnar synthetic dataset (a directory of parts) as one
+    DataFrame.
+    """
+    parts = sorted(glob.glob(os.path.join(path, "part-*.cols")))
+    return pd.concat(
+        [load_columnar(part, mmap=False) for part in parts],
+        ignore_index=True,
+    )
+
+
+def write_synthetic(output_path, n_rows, model=None, chunksize=100_000,
+                    n_jobs=None, seed=0, output_format="csv",
+                    float_format=None):
+    """
+    Generate n_rows patients into output_path in parallel, as CSV or as a
+    directory of columnar parts (output_format="columnar"). At most two
+    chunks per worker are in flight. Returns rows, bytes and timing.
+    """
+    if output_format not in ("csv", "columnar"):
+        raise ValueError("output_format must be either 'csv' or 'columnar'.")
+    if model is None:
+        model = SyntheticPatientModel.fit(pd.read_csv(SOURCE_DATA))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_chunks = -(-n_rows // chunksize)
+    seeds = chunk_seeds(seed, n_chunks)
+    columnar = output_format == "columnar"
+
+    start = time.perf_counter()
+    n_bytes = 0
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        if columnar:
+            os.makedirs(tmp_path)
+            out = None
+        else:
+            out = open(tmp_path, "wb")
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker, initargs=(model,)
+        ) as pool:
+            pending = []
+
+            def write_next():
+                nonlocal n_bytes
+                result = pending.pop(0).result()
+                n_bytes += result if columnar else out.write(result)
+
+            for i in range(n_chunks):
+                n = min(chunksize, n_rows - i * chunksize)
+                if columnar:
+                    part = os.path.join(tmp_path, f"part-{i:05d}.cols")
+                    future = pool.submit(
+                        _columnar_chunk, n, seeds[i], i * chunksize, part
+                    )
+                else:
+                    future = pool.submit(
+                        _csv_chunk, n, seeds[i], i * chunksize, i == 0,
+                        float_format,
+                    )
+                pending.append(future)
+                if len(pending) >= 2 * n_jobs:
+                    write_next()
+            while pending:
+                write_next()
+        if out is not None:
+            out.close()
+        if columnar and os.path.isdir(output_path):
+            shutil.rmtree(output_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if out is not None:
+            out.close()
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "bytes": n_bytes,
+        "seconds": seconds,
+        "rows_per_second": n_rows / seconds if seconds else float("nan"),
+        "mb_per_second": n_bytes / 1e6 / seconds if seconds else float("nan"),
+    }
+
+
+def compare(source, synthetic):
+    """
+    Per-class means of every feature in the source and synthetic data.
+    """
+    features = [c for c in source.columns
+                if c not in ("PatientID", "DoctorInCharge", TARGET)]
+    return pd.concat(
+        {
+            "source": source.groupby(TARGET)[features].mean().T,
+            "synthetic": synthetic.groupby(TARGET)[features].mean().T,
+        },
+        axis=1,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic asthma patient data."
+    )
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--source", default=SOURCE_DATA)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["csv", "columnar"],
+                        default="csv")
+    parser.add_argument("--float-format", default=None,
+                        help="CSV float format, e.g. %%.6f (default: full "
+                             "precision, like the source)")
+    args = parser.parse_args(argv)
+
+    model = SyntheticPatientModel.fit(pd.read_csv(args.source))
+    stats = write_synthetic(
+        args.output, args.rows, model, args.chunksize, args.jobs, args.seed,
+        args.format, args.float_format,
+    )
+    print(
+        f"Wrote {stats['rows']} rows ({stats['bytes'] / 1e6:.1f} MB) to "
+        f"{args.output} in {stats['seconds']:.2f}s "
+        f"({stats['mb_per_second']:.0f} MB/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Lightweight tracing for the app's hot paths.
+
+Decorate a function with @traced() (or wrap a block in `with
+trace("name"):`) to record its wall time, CPU time and memory for every
+call. Records go into a fixed-size ring buffer, and running totals are
+kept per name. Both can be dumped as JSON or in Prometheus text format
+and are shown in a hidden sidebar panel (open the app with ?debug=1).
+
+Tracing is off unless ASTHMA_TRACE=1 is set (or set_enabled(True) is
+called). When off, a traced call costs one attribute check. Memory is
+measured with tracemalloc, which is started only while tracing is on.
+tracemalloc is process-wide, so memory figures for calls that overlap in
+concurrent sessions include each other's allocations.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+RING_SIZE = 2_000
+
+
+class _Tracer:
+    def __init__(self, ring_size=RING_SIZE):
+        self.enabled = False
+        self.records = deque(maxlen=ring_size)
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+
+_tracer = _Tracer()
+
+
+def set_enabled(enabled=True):
+    _tracer.enabled = bool(enabled)
+    if _tracer.enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not _tracer.enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _tracer.enabled
+
+
+def start_rerun(label=None):
+    """
+    Mark the start of a Streamlit rerun on this thread; later records are
+    tagged with it so the panel can show the current rerun only.
+    """
+    _tracer.local.rerun = (label, time.time())
+    return _tracer.local.rerun
+
+
+def _current_rerun():
+    return getattr(_tracer.local, "rerun", (None, None))
+
+
+@contextmanager
+def trace(name):
+    """
+    Record wall time, CPU time and memory of the enclosed block.
+    """
+    if not _tracer.enabled:
+        yield
+        return
+
+    stack = _tracer.stack()
+    memory = tracemalloc.is_tracing()
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # Keep the enclosing call's peak before resetting it
+            stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+        tracemalloc.reset_peak()
+    else:
+        current = 0
+    frame = {"start_memory": current, "child_peak": 0}
+    stack.append(frame)
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    started = time.time()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+        stack.pop()
+        peak_bytes = net_bytes = 0
+        if memory and tracemalloc.is_tracing():
+            after, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame["child_peak"])
+            peak_bytes = max(0, peak - frame["start_memory"])
+            net_bytes = after - frame["start_memory"]
+            if stack:
+                stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+        label, rerun_started = _current_rerun()
+        record = {
+            "name": name,
+            "started": started,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "peak_memory_bytes": peak_bytes,
+            "net_memory_bytes": net_bytes,
+            "depth": len(stack),
+            "thread": threading.current_thread().name,
+            "rerun": label,
+            "rerun_started": rerun_started,
+            "error": error,
+        }
+        with _tracer.lock:
+            _tracer.records.append(record)
+            totals = _tracer.totals.setdefault(name, {
+                "calls": 0, "errors": 0, "wall_seconds": 0.0,
+                "cpu_seconds": 0.0, "max_peak_memory_bytes": 0,
+            })
+            totals["calls"] += 1
+            totals["errors"] += error is not None
+            totals["wall_seconds"] += wall
+            totals["cpu_seconds"] += cpu
+            totals["max_peak_memory_bytes"] = max(
+                totals["max_peak_memory_bytes"], peak_bytes
+            )
+
+
+def traced(name=None):
+    """
+    Decorator form of trace(); the name defaults to module.qualname.
+    """
+
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with trace(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def records(rerun_started=None):
+    """
+    Buffered call records, optionally only those of one rerun.
+    """
+    import pandas as pd
+
+    with _tracer.lock:
+        rows = list(_tracer.records)
+    if rerun_started is not None:
+        rows = [r for r in rows if r["rerun_started"] == rerun_started]
+    return pd.DataFrame(rows, columns=[
+        "name", "started", "wall_seconds", "cpu_seconds",
+        "peak_memory_bytes", "net_memory_bytes", "depth", "thread",
+        "rerun", "rerun_started", "error",
+    ])
+
+
+def summary():
+    """
+    Per-name totals since start-up, with p50/p95 wall time from the
+    buffered records.
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = records()
+    rows = []
+    with _tracer.lock:
+        totals = {name: dict(t) for name, t in _tracer.totals.items()}
+    for name, t in totals.items():
+        wall = df.loc[df["name"] == name, "wall_seconds"].to_numpy()
+        rows.append({
+            "name": name,
+            **t,
+            "mean_wall_seconds": t["wall_seconds"] / t["calls"],
+            "p50_wall_seconds": (
+                float(np.percentile(wall, 50)) if wall.size else None
+            ),
+            "p95_wall_seconds": (
+                float(np.percentile(wall, 95)) if wall.size else None
+            ),
+        })
+    return pd.DataFrame(rows).sort_values(
+        "wall_seconds", ascending=False
+    ) if rows else pd.DataFrame(rows)
+
+
+def to_json():
+    return json.dumps(
+        {
+            "enabled": _tracer.enabled,
+            "summary": summary().to_dict(orient="records"),
+            "records": records().to_dict(orient="records"),
+        },
+        indent=2,
+        default=str,
+    )
+
+
+def to_prometheus(prefix="asthma_trace"):
+    """
+    Running totals in the Prometheus text exposition format.
+    """
+    with _tracer.lock:
+        totals = {name: dict(t) for name, t in _tracer.totals.items()}
+    metrics = [
+        ("calls", "counter", "Traced calls", "calls"),
+        ("errors", "counter", "Traced calls that raised", "errors"),
+        ("wall_seconds", "counter", "Wall time in traced calls",
+         "wall_seconds"),
+        ("cpu_seconds", "counter", "CPU time in traced calls",
+         "cpu_seconds"),
+        ("peak_memory_bytes", "gauge",
+         "Largest peak memory of a single call", "max_peak_memory_bytes"),
+    ]
+    lines = []
+    for metric, kind, help_text, key in metrics:
+        full_name = f"{prefix}_{metric}"
+        if kind == "counter":
+            full_name += "_total"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for name, t in sorted(totals.items()):
+            escaped = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{full_name}{{name="{escaped}"}} {t[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    with _tracer.lock:
+        _tracer.records.clear()
+        _tracer.totals.clear()
+
+
+def render_debug_panel():
+    """
+    Sidebar panel with this rerun's calls and the running totals. Hidden
+    unless tracing is on and the app was opened with ?debug=1.
+    """
+    import streamlit as st
+
+    if not _tracer.enabled or st.query_params.get("debug") != "1":
+        return
+    _, rerun_started = _current_rerun()
+    with st.sidebar.expander("Debug: timings", expanded=False):
+        st.write("This rerun")
+        st.dataframe(
+            records(rerun_started)[[
+                "name", "wall_seconds", "cpu_seconds",
+                "peak_memory_bytes", "depth",
+            ]],
+            hide_index=True,
+        )
+        st.write("Since start-up")
+        st.dataframe(summary(), hide_index=True)
+        st.download_button(
+            "Download JSON", to_json(), "trace.json", "application/json"
+        )
+        st.download_button(
+            "Download Prometheus", to_prometheus(), "trace.prom",
+            "text/plain",
+        )
+
+
+if os.environ.get("ASTHMA_TRACE") == "1":
+    set_enabled(True)
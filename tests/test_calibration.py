@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.machine_learning.calibration import (
+    METHODS,
+    Calibrator,
+    fit_calibration,
+    load_calibration,
+)
+from src.machine_learning.score import MODEL_DIR, load_pipelines
+
+
+class CalibratorTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = (rng.random(2000) < 0.1).astype(int)
+        self.scores = np.clip(rng.normal(0.3 + 0.4 * self.y, 0.15), 0, 1)
+
+    def test_prior_shift_odds(self):
+        calibrator = Calibrator.fit("prior_shift", self.scores, self.y)
+        prior = self.y.mean()
+        # A balanced-prior score of 0.5 maps to the observed prevalence
+        self.assertAlmostEqual(float(calibrator(0.5)), prior, places=6)
+        # At the knots the odds are scaled by the prior odds exactly
+        knots = calibrator.knots
+        np.testing.assert_allclose(
+            calibrator(knots) / (1 - calibrator(knots)),
+            knots / (1 - knots) * prior / (1 - prior),
+            rtol=1e-9,
+        )
+
+    def test_methods_are_monotone_probabilities(self):
+        grid = np.linspace(0, 1, 201)
+        for method in METHODS:
+            with self.subTest(method=method):
+                calibrated = Calibrator.fit(method, self.scores, self.y)(grid)
+                self.assertTrue((np.diff(calibrated) >= -1e-12).all())
+                self.assertTrue(((calibrated >= 0) & (calibrated <= 1)).all())
+        with self.assertRaises(ValueError):
+            Calibrator.fit("beta", self.scores, self.y)
+
+    def test_dict_round_trip(self):
+        calibrator = Calibrator.fit("isotonic", self.scores, self.y)
+        restored = Calibrator.from_dict(
+            json.loads(json.dumps(calibrator.to_dict()))
+        )
+        self.assertEqual(restored.method, "isotonic")
+        np.testing.assert_array_equal(restored(self.scores),
+                                      calibrator(self.scores))
+
+
+class FitCalibrationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _, cls.pipeline = load_pipelines("v1")
+        split = {
+            name: pd.read_csv(os.path.join(MODEL_DIR, "v1", f"{name}.csv"))
+            for name in ("X_train", "y_train", "X_test", "y_test")
+        }
+        cls.y_test = np.ravel(split["y_test"])
+        cls.calibrator, cls.report = fit_calibration(
+            cls.pipeline, split["X_train"], split["y_train"],
+            split["X_test"], split["y_test"], n_splits=3,
+        )
+        cls.test_raw = cls.pipeline.predict_proba(split["X_test"])[:, 1]
+
+    def test_auto_keeps_the_best_method(self):
+        cv_brier = self.report["cv_brier"]
+        self.assertEqual(set(cv_brier), set(METHODS))
+        self.assertEqual(self.calibrator.method,
+                         min(cv_brier, key=cv_brier.get))
+        self.assertEqual(self.report["brier"]["train_oof"]["calibrated"],
+                         cv_brier[self.calibrator.method])
+
+    def test_calibrated_risks_track_prevalence(self):
+        brier = self.report["brier"]["test"]
+        self.assertLess(brier["calibrated"], brier["raw"])
+        calibrated = self.calibrator(self.test_raw)
+        self.assertLess(abs(calibrated.mean() - self.y_test.mean()),
+                        abs(self.test_raw.mean() - self.y_test.mean()))
+
+
+class LoadCalibrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "calibration.json")
+        calibrator = Calibrator("platt", [0, 1], [0.1, 0.2])
+        with open(self.path, "w") as f:
+            json.dump({"model_sha256": "abc",
+                       "calibrator": calibrator.to_dict(),
+                       "report": {"prevalence": {}}}, f)
+
+    def test_model_checksum_must_match(self):
+        calibrator, report = load_calibration(self.path, "abc")
+        self.assertAlmostEqual(float(calibrator(0.5)), 0.15)
+        self.assertEqual(report, {"prevalence": {}})
+        self.assertIsNotNone(load_calibration(self.path))
+        self.assertIsNone(load_calibration(self.path, "other"))
+        self.assertIsNone(
+            load_calibration(os.path.join(self.tmp_dir, "missing.json"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.cleaning import DROP_COLUMNS, run_cleaning
+
+PATIENT_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+
+
+class RunCleaningTest(unittest.TestCase):
+
+    def setUp(self):
+        self.raw_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.raw_dir)
+        self.out_path = os.path.join(self.raw_dir, "out", "cleaned.csv")
+        self.df = pd.read_csv(PATIENT_DATA)
+
+    def _write_extracts(self, *frames):
+        for i, frame in enumerate(frames):
+            frame.to_csv(os.path.join(self.raw_dir, f"{i}.csv"), index=False)
+
+    def test_extracts_are_aligned_to_the_first_header(self):
+        first, second = self.df.iloc[:1000], self.df.iloc[1000:]
+        second = second[second.columns[::-1]].assign(Extra=1)
+        self._write_extracts(first, second)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            stats = run_cleaning(self.raw_dir, self.out_path, chunksize=300)
+        self.assertEqual(len(caught), 1)
+        self.assertIn("Extra", str(caught[0].message))
+
+        expected = self.df.drop(columns=DROP_COLUMNS)
+        cleaned = pd.read_csv(self.out_path)
+        pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+        self.assertEqual(stats.loc["Age", "count"], len(self.df))
+        np.testing.assert_allclose(stats.loc["BMI", "mean"],
+                                   self.df["BMI"].mean())
+
+    def test_missing_required_column_fails(self):
+        self._write_extracts(
+            self.df.iloc[:1000], self.df.iloc[1000:].drop(columns="Wheezing")
+        )
+        with self.assertRaisesRegex(ValueError, "Wheezing"):
+            run_cleaning(self.raw_dir, self.out_path, chunksize=300)
+        self.assertFalse(os.path.exists(self.out_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import (
+    ASTHMA_SCHEMA,
+    CONTINUOUS_MEASURES,
+    columnar_path_for,
+    export_columnar,
+    export_csv,
+    is_current,
+    load_columnar,
+    read_dataset,
+)
+
+PATIENT_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+
+
+class ColumnarRoundTripTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(PATIENT_DATA)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.out_dir = os.path.join(self.tmp_dir, "data.cols")
+
+    def test_schema_dtypes_round_trip(self):
+        export_columnar(self.df, self.out_dir)
+        loaded = load_columnar(self.out_dir)
+        self.assertEqual(list(loaded.columns), list(self.df.columns))
+        self.assertEqual(loaded["Wheezing"].dtype, np.int8)
+        self.assertEqual(loaded["Ethnicity"].dtype, np.int8)
+        self.assertEqual(loaded["BMI"].dtype, np.float32)
+        for column in self.df.columns:
+            expected = self.df[column]
+            if expected.dtype == float:
+                np.testing.assert_allclose(loaded[column], expected,
+                                           rtol=1e-6)
+            else:
+                self.assertEqual(list(loaded[column].astype(expected.dtype)),
+                                 list(expected), column)
+
+    def test_float64_schema_is_exact(self):
+        schema = {
+            **ASTHMA_SCHEMA,
+            **{column: "float64" for column in CONTINUOUS_MEASURES},
+        }
+        export_columnar(self.df, self.out_dir, schema=schema)
+        loaded = load_columnar(self.out_dir)
+        for column in CONTINUOUS_MEASURES:
+            np.testing.assert_array_equal(loaded[column], self.df[column])
+
+    def test_column_subset_and_read_only(self):
+        export_columnar(self.df, self.out_dir)
+        loaded = load_columnar(self.out_dir, columns=["Age", "BMI"])
+        self.assertEqual(list(loaded.columns), ["Age", "BMI"])
+        with self.assertRaises(ValueError):
+            loaded["BMI"].to_numpy()[0] = 0
+        copied = load_columnar(self.out_dir, columns=["BMI"], mmap=False)
+        copied["BMI"].to_numpy()[0] = 0
+
+    def test_invalid_values_are_rejected(self):
+        for column, value in (("Wheezing", 2), ("Ethnicity", 7),
+                              ("Age", 1000), ("Age", np.nan)):
+            df = self.df.head(5).copy()
+            df[column] = df[column].astype(float)
+            df.loc[0, column] = value
+            with self.subTest(column=column, value=value), \
+                    self.assertRaises(ValueError):
+                export_columnar(df, self.out_dir)
+        self.assertFalse(os.path.exists(self.out_dir))
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+class ReadDatasetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.csv_path = os.path.join(self.tmp_dir, "data.csv")
+        pd.read_csv(PATIENT_DATA).head(100).to_csv(self.csv_path,
+                                                    index=False)
+
+    def test_stale_export_falls_back_to_csv(self):
+        columnar_dir = export_csv(self.csv_path)
+        self.assertEqual(columnar_dir, columnar_path_for(self.csv_path))
+        self.assertTrue(is_current(columnar_dir, self.csv_path))
+        self.assertEqual(read_dataset(self.csv_path)["BMI"].dtype,
+                         np.float32)
+
+        df = pd.read_csv(self.csv_path)
+        df.loc[0, "BMI"] += 1
+        df.to_csv(self.csv_path, index=False)
+        self.assertFalse(is_current(columnar_dir, self.csv_path))
+        pd.testing.assert_frame_equal(read_dataset(self.csv_path), df)
+
+    def test_missing_export(self):
+        self.assertFalse(
+            is_current(columnar_path_for(self.csv_path), self.csv_path)
+        )
+        pd.testing.assert_frame_equal(read_dataset(self.csv_path),
+                                      pd.read_csv(self.csv_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.machine_learning.drift import DriftMonitor, build_reference, psi
+
+
+class StubBundle:
+
+    def __init__(self, reference, model_sha256):
+        self.drift_reference = reference
+        self.model_sha256 = model_sha256
+
+
+class DriftMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "state.json")
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame({
+            "BMI": rng.normal(27, 4, 2000),
+            "Wheezing": rng.integers(0, 2, 2000),
+        })
+        self.reference = build_reference(self.X)
+
+    def test_same_distribution_is_stable(self):
+        monitor = DriftMonitor(self.reference)
+        for start in range(0, 2000, 500):
+            monitor.update(self.X.iloc[start:start + 500])
+        report = monitor.report().set_index("feature")
+        self.assertEqual(monitor.rows, 2000)
+        np.testing.assert_allclose(report["psi"], 0, atol=1e-12)
+        self.assertTrue((report["status"] == "stable").all())
+
+    def test_shifted_distribution_drifts(self):
+        shifted = self.X.assign(BMI=self.X["BMI"] + 4)
+        report = DriftMonitor(self.reference).update(shifted).report()
+        bmi = report.set_index("feature").loc["BMI"]
+        self.assertEqual(bmi["status"], "drift")
+        self.assertLess(bmi["ks_p"], 1e-6)
+
+    def test_psi_is_symmetric_in_its_terms(self):
+        a, b = np.array([10.0, 30, 60]), np.array([30.0, 30, 40])
+        self.assertAlmostEqual(psi(a, b), psi(b, a))
+
+    def test_state_is_reset_for_a_rebuilt_model(self):
+        old = StubBundle(self.reference, "old-model")
+        DriftMonitor.for_bundle(self.path, old).update(self.X).save(
+            self.path
+        )
+        self.assertEqual(DriftMonitor.for_bundle(self.path, old).rows, 2000)
+
+        new_reference = build_reference(self.X.iloc[:1000])
+        new = StubBundle(new_reference, "new-model")
+        monitor = DriftMonitor.for_bundle(self.path, new)
+        self.assertEqual(monitor.rows, 0)
+        self.assertEqual(monitor.reference, new_reference)
+        self.assertEqual(monitor.model_sha256, "new-model")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.machine_learning.feature_stability import selected_features
+
+
+class SelectedFeaturesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.X, self.y = make_classification(
+            n_samples=300, n_features=8, n_informative=3, random_state=0
+        )
+
+    def test_selection_step_is_found_by_get_support(self):
+        pipeline = Pipeline([
+            ("scaler", StandardScaler()),
+            ("select", SelectKBest(f_classif, k=3)),
+            ("model", LogisticRegression()),
+        ]).fit(self.X, self.y)
+        np.testing.assert_array_equal(
+            selected_features(pipeline, 8),
+            pipeline["select"].get_support(),
+        )
+
+    def test_median_rule_without_selection_step(self):
+        pipeline = Pipeline([
+            ("scaler", StandardScaler()),
+            ("model", LogisticRegression()),
+        ]).fit(self.X, self.y)
+        coef = np.abs(pipeline["model"].coef_[0])
+        np.testing.assert_array_equal(
+            selected_features(pipeline, 8), coef >= np.median(coef)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
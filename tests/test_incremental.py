@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.machine_learning.incremental import (
+    TARGET,
+    TEST_DATA,
+    TRAIN_DATA,
+    fit_in_memory,
+    fit_incremental,
+    parity_report,
+)
+from src.machine_learning.score import load_pipelines
+
+
+class ParityReportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _, v1 = load_pipelines("v1")
+        cls.features = list(v1.feature_names_in_)
+        cls.candidate, cls.stats = fit_incremental(
+            TRAIN_DATA, cls.features, chunksize=500, epochs=2,
+            verbose=False,
+        )
+        cls.reference = fit_in_memory(TRAIN_DATA, cls.features)
+
+    def test_class_counts_cover_every_training_row(self):
+        train = pd.read_csv(TRAIN_DATA)
+        self.assertEqual(self.stats["training_rows"], len(train))
+        self.assertEqual(
+            self.stats["class_counts"],
+            train[TARGET].value_counts().to_dict(),
+        )
+
+    def test_both_models_are_scored_on_the_same_rows(self):
+        test = pd.read_csv(TEST_DATA)
+        report = parity_report(
+            TEST_DATA, self.candidate, self.reference, chunksize=100
+        )
+        self.assertEqual(report["in_memory"]["test_rows"], len(test))
+        self.assertEqual(report["incremental"]["test_rows"], len(test))
+
+        X = test[self.features]
+        expected = np.mean(
+            self.candidate.predict(X) == self.reference.predict(X)
+        )
+        self.assertAlmostEqual(report["prediction_agreement"], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
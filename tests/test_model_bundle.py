@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import warnings
+from unittest import mock
+
+import joblib
+
+from src.columnar_store import file_sha256
+from src.data_management import ModelRegistry
+from src.machine_learning import model_bundle
+from src.machine_learning.model_bundle import (
+    BUNDLE_DIR,
+    build_bundle,
+    current_bundle,
+)
+from src.machine_learning.score import MODEL_DIR
+
+
+class CurrentBundleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir)
+        self.version_dir = os.path.join(self.base_dir, "predict_asthma", "v1")
+        shutil.copytree(
+            os.path.join(MODEL_DIR, "v1"), self.version_dir,
+            ignore=shutil.ignore_patterns(BUNDLE_DIR, "*.cols"),
+        )
+        build_bundle("predict_asthma", "v1", self.base_dir)
+        self.registry = ModelRegistry(self.base_dir)
+
+    def _retrain(self):
+        # Stand-in for a retrained model: same pipeline, different weights
+        path = os.path.join(self.version_dir, "clf_pipeline_model.pkl")
+        pipeline = joblib.load(path)
+        pipeline["model"].coef_ = pipeline["model"].coef_ * 0.5
+        joblib.dump(pipeline, path)
+        return file_sha256(path)
+
+    def test_unchanged_sources_are_hashed_once(self):
+        with mock.patch.object(model_bundle, "file_sha256",
+                               wraps=file_sha256) as sha256:
+            bundle = current_bundle(self.registry, "predict_asthma", "v1")
+            first = sha256.call_count
+            current_bundle(self.registry, "predict_asthma", "v1")
+        self.assertEqual(first, len(bundle.manifest["sources"]))
+        self.assertEqual(sha256.call_count, first)
+
+    def test_replaced_model_is_rebuilt_exactly_once(self):
+        current_bundle(self.registry, "predict_asthma", "v1")
+        new_sha256 = self._retrain()
+
+        bundles = []
+
+        def page_rerun():
+            bundles.append(
+                current_bundle(self.registry, "predict_asthma", "v1")
+            )
+
+        with warnings.catch_warnings(), mock.patch.object(
+            model_bundle, "_build_bundle", wraps=model_bundle._build_bundle
+        ) as build:
+            # The copied calibration.json no longer matches the model
+            warnings.simplefilter("ignore")
+            threads = [threading.Thread(target=page_rerun) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            page_rerun()
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(bundles), 5)
+        for bundle in bundles:
+            self.assertEqual(bundle.model_sha256, new_sha256)
+            self.assertEqual(bundle.changed_sources(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
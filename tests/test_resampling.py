@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+from imblearn.over_sampling import BorderlineSMOTE
+from sklearn.datasets import make_classification
+
+from src.machine_learning.resampling import (
+    CachedBorderlineSMOTE,
+    clear_neighbor_cache,
+    neighbor_cache_info,
+)
+
+
+class CachedBorderlineSMOTETest(unittest.TestCase):
+
+    def setUp(self):
+        clear_neighbor_cache()
+        self.addCleanup(clear_neighbor_cache)
+        self.X, self.y = make_classification(
+            n_samples=600, n_features=6, weights=[0.9], flip_y=0.05,
+            random_state=0,
+        )
+
+    def test_matches_borderline_smote(self):
+        for kind in ("borderline-1", "borderline-2"):
+            for random_state in (0, 7):
+                with self.subTest(kind=kind, random_state=random_state):
+                    expected = BorderlineSMOTE(
+                        kind=kind, random_state=random_state
+                    ).fit_resample(self.X, self.y)
+                    actual = CachedBorderlineSMOTE(
+                        kind=kind, random_state=random_state
+                    ).fit_resample(self.X, self.y)
+                    np.testing.assert_array_equal(actual[0], expected[0])
+                    np.testing.assert_array_equal(actual[1], expected[1])
+
+    def test_neighbours_are_reused_for_the_same_data(self):
+        first = CachedBorderlineSMOTE(random_state=0).fit_resample(
+            self.X, self.y
+        )
+        second = CachedBorderlineSMOTE(random_state=0).fit_resample(
+            self.X, self.y
+        )
+        np.testing.assert_array_equal(first[0], second[0])
+        self.assertEqual(neighbor_cache_info(),
+                         {"hits": 1, "misses": 1, "entries": 1})
+
+        # Different data or neighbour settings need their own entry
+        CachedBorderlineSMOTE(random_state=0).fit_resample(
+            self.X[:-1], self.y[:-1]
+        )
+        CachedBorderlineSMOTE(k_neighbors=3, random_state=0).fit_resample(
+            self.X, self.y
+        )
+        self.assertEqual(neighbor_cache_info(),
+                         {"hits": 1, "misses": 3, "entries": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import brier_score_loss, precision_score, recall_score
+
+from src.machine_learning import routing
+from src.machine_learning.routing import (
+    ModelRouter,
+    ShadowStats,
+    check_routing,
+    route,
+)
+from src.machine_learning.score import MODEL_DIR, score_frame
+
+PATIENT_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+
+
+class RouteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"PatientID": np.arange(5000, 25000)})
+
+    def test_route_is_stable_per_patient(self):
+        mask = pd.Series(route(self.df, 0.3), index=self.df["PatientID"])
+        shuffled = self.df.sample(frac=1, random_state=0)
+        chunks = np.concatenate([
+            route(shuffled.iloc[i:i + 3000], 0.3)
+            for i in range(0, len(shuffled), 3000)
+        ])
+        np.testing.assert_array_equal(
+            chunks, mask.loc[shuffled["PatientID"]].to_numpy()
+        )
+
+    def test_route_share(self):
+        self.assertFalse(route(self.df, 0.0).any())
+        self.assertTrue(route(self.df, 1.0).all())
+        self.assertAlmostEqual(route(self.df, 0.1).mean(), 0.1, delta=0.01)
+        # A larger share only adds patients to the challenger
+        self.assertFalse((route(self.df, 0.1) & ~route(self.df, 0.2)).any())
+
+
+class CheckRoutingTest(unittest.TestCase):
+
+    def test_valid_settings(self):
+        check_routing("v1")
+        check_routing("v1", "v2", share=0.5, shadow=True)
+
+    def test_invalid_settings(self):
+        for kwargs in (
+            {"share": 0.1},
+            {"shadow": True},
+            {"challenger": "v1"},
+            {"challenger": "v2", "share": 1.5},
+            {"challenger": "v2", "share": -0.1},
+        ):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                check_routing("v1", **kwargs)
+
+
+def _rounded(stats):
+    # Float sums differ in the last bits depending on how rows are split
+    return {key: round(value, 9) for key, value in stats.items()}
+
+
+class ShadowStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = rng.integers(0, 2, 200)
+        self.champion = rng.random(200)
+        self.challenger = rng.random(200)
+
+    def _stats(self, rows):
+        stats = ShadowStats("v1", "v2")
+        for version, proba in (("v1", self.champion),
+                               ("v2", self.challenger)):
+            stats.add_version(
+                version, len(rows), proba[rows],
+                (proba[rows] >= 0.5).astype(int), self.y[rows],
+            )
+        stats.add_pair(
+            self.champion[rows], self.challenger[rows],
+            self.champion[rows] >= 0.5, self.challenger[rows] >= 0.5,
+        )
+        return stats
+
+    def test_merge_equals_one_pass(self):
+        rows = np.arange(200)
+        merged = self._stats(rows[:70]).merge(self._stats(rows[70:]))
+        whole = self._stats(rows)
+        for version, stats in whole.versions.items():
+            self.assertEqual(_rounded(merged.versions[version]),
+                             _rounded(stats))
+        self.assertEqual(_rounded(merged.paired), _rounded(whole.paired))
+        self.assertEqual(merged.max_abs_diff, whole.max_abs_diff)
+
+    def test_summary_matches_sklearn(self):
+        table, paired = self._stats(np.arange(200)).summary()
+        for version, proba in (("v1", self.champion),
+                               ("v2", self.challenger)):
+            prediction = (proba >= 0.5).astype(int)
+            self.assertAlmostEqual(table.loc[version, "precision"],
+                                   precision_score(self.y, prediction))
+            self.assertAlmostEqual(table.loc[version, "recall"],
+                                   recall_score(self.y, prediction))
+            self.assertAlmostEqual(table.loc[version, "brier"],
+                                   brier_score_loss(self.y, proba))
+        self.assertAlmostEqual(
+            table.loc["delta", "recall"],
+            table.loc["v2", "recall"] - table.loc["v1", "recall"],
+        )
+        self.assertEqual(paired["compared"], 200)
+        self.assertAlmostEqual(
+            paired["disagreement_rate"],
+            np.mean((self.champion >= 0.5) != (self.challenger >= 0.5)),
+        )
+        self.assertAlmostEqual(
+            paired["mean_diff"], np.mean(self.challenger - self.champion)
+        )
+
+
+class ModelRouterTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        for version in ("v1", "v2"):
+            os.makedirs(os.path.join(cls.model_dir, version))
+            shutil.copy(
+                os.path.join(MODEL_DIR, "v1", "clf_pipeline_model.pkl"),
+                os.path.join(cls.model_dir, version),
+            )
+        cls.df = pd.read_csv(PATIENT_DATA)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir)
+
+    def test_shadow_cleans_each_chunk_once(self):
+        router = ModelRouter("v1", "v2", share=0.2, shadow=True,
+                             model_dir=self.model_dir)
+        with mock.patch.object(routing, "clean_patient_data",
+                               wraps=routing.clean_patient_data) as clean:
+            scores, stats = router.score(self.df)
+        self.assertEqual(clean.call_count, 1)
+
+        expected = score_frame(self.df, router.models["v1"])
+        np.testing.assert_allclose(
+            scores["asthma_probability"], expected["asthma_probability"]
+        )
+        self.assertEqual(stats.paired["compared"], len(self.df))
+        self.assertEqual(stats.paired["disagreements"], 0)
+        self.assertEqual(
+            stats.versions["v2"]["routed"], route(self.df, 0.2).sum()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
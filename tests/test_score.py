@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import brier_score_loss
+from sklearn.model_selection import train_test_split
+
+from src.machine_learning.calibration import (
+    CALIBRATION_FILE,
+    load_calibration,
+)
+from src.machine_learning.score import (
+    MODEL_DIR,
+    load_pipelines,
+    model_inputs,
+    score_csv,
+    score_frame,
+)
+
+PATIENT_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+
+
+def v1_test_patients():
+    """
+    Raw patient rows of the v1 test split (the notebook's 70/30 split).
+    """
+    df = pd.read_csv(PATIENT_DATA)
+    _, test = train_test_split(
+        df, test_size=0.3, random_state=0, stratify=df["Diagnosis"]
+    )
+    return test.reset_index(drop=True)
+
+
+class ScoreFrameTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _, cls.pipeline_model = load_pipelines("v1")
+        cls.patients = v1_test_patients()
+        cls.X_test = pd.read_csv(f"{MODEL_DIR}/v1/X_test.csv")
+
+    def test_model_inputs_match_bundled_split(self):
+        X = model_inputs(self.patients, self.pipeline_model)
+        pd.testing.assert_frame_equal(
+            X.reset_index(drop=True), self.X_test, check_dtype=False
+        )
+
+    def test_score_frame_matches_pipeline_on_test_split(self):
+        scores = score_frame(self.patients, self.pipeline_model)
+        expected = self.pipeline_model.predict_proba(self.X_test)[:, 1]
+        np.testing.assert_allclose(
+            scores["asthma_probability"], expected, rtol=0, atol=1e-12
+        )
+        np.testing.assert_array_equal(
+            scores["prediction"], (expected >= 0.5).astype("int8")
+        )
+
+
+class CalibratedScoreTest(unittest.TestCase):
+
+    def test_cli_brier_matches_calibration_report(self):
+        _, report = load_calibration(f"{MODEL_DIR}/v1/{CALIBRATION_FILE}")
+        patients = v1_test_patients()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, "patients.csv")
+            output_path = os.path.join(tmp_dir, "scores.csv")
+            patients.to_csv(input_path, index=False)
+            score_csv(input_path, output_path, n_jobs=1, calibrated=True)
+            scores = pd.read_csv(output_path)
+
+        y = patients["Diagnosis"]
+        expected = report["brier"]["test"]
+        self.assertAlmostEqual(
+            brier_score_loss(y, scores["asthma_probability"]),
+            expected["raw"], places=9,
+        )
+        self.assertAlmostEqual(
+            brier_score_loss(y, scores["calibrated_probability"]),
+            expected["calibrated"], places=9,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
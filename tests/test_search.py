@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+
+from src.machine_learning.pipelines import PipelineClf
+from src.machine_learning.search import (
+    FoldScoreCache,
+    HyperparameterOptimizationSearch,
+)
+
+
+def _pipeline(model):
+    return PipelineClf(model, use_smote=False, use_feature_selection=False)
+
+
+class FoldScoreCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "scores.jsonl")
+
+    def test_partial_last_line_is_cut_before_appending(self):
+        cache = FoldScoreCache(self.path)
+        cache.add("a", 0.5)
+        with open(self.path, "a") as f:
+            f.write('{"key": "b", "sco')  # interrupted write
+
+        cache = FoldScoreCache(self.path)
+        self.assertEqual(cache.scores, {"a": 0.5})
+        cache.add("c", 0.75)
+        self.assertEqual(FoldScoreCache(self.path).scores,
+                         {"a": 0.5, "c": 0.75})
+
+
+class SearchCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.X, self.y = make_classification(
+            n_samples=200, n_features=5, random_state=0
+        )
+
+    def _search(self, **kwargs):
+        return HyperparameterOptimizationSearch(
+            models={"LogisticRegression": LogisticRegression()},
+            params={"LogisticRegression": {
+                "model__C": [0.01, 0.1, 1, 10, 100],
+            }},
+            pipeline_factory=_pipeline, cache_dir=self.cache_dir, **kwargs
+        )
+
+    def test_rerun_reuses_every_fold(self):
+        first = self._search().fit(self.X, self.y, cv=3, n_jobs=2,
+                                   verbose=0, scoring="recall")
+        second = self._search().fit(self.X, self.y, cv=3, n_jobs=2,
+                                    verbose=0, scoring="recall")
+        self.assertEqual(first.stats["fitted"], 15)
+        self.assertEqual(second.stats, {"fitted": 0, "cached": 15,
+                                        "pruned": 0})
+        self.assertEqual(
+            second.searches["LogisticRegression"].best_params_,
+            first.searches["LogisticRegression"].best_params_,
+        )
+
+    def test_randomized_search_is_resumable(self):
+        kwargs = {"search_type": "random", "n_iter": 3}
+        self._search(**kwargs).fit(self.X, self.y, cv=3, n_jobs=2,
+                                   verbose=0)
+        second = self._search(**kwargs).fit(self.X, self.y, cv=3, n_jobs=2,
+                                            verbose=0)
+        self.assertEqual(second.stats["fitted"], 0)
+
+        with self.assertRaises(ValueError):
+            self._search(random_state=None, **kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+
+from src.machine_learning.compiled_model import (
+    CompiledLogisticModel,
+    verify_compiled,
+)
+from src.machine_learning.score import MODEL_DIR, load_pipelines
+from src.machine_learning.serve import (
+    BENCHMARK_DATA,
+    AsthmaScorer,
+    LatencyTracker,
+    make_handler,
+)
+
+
+class VerifyCompiledTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _, cls.pipeline_model = load_pipelines("v1")
+        cls.X_test = pd.read_csv(f"{MODEL_DIR}/v1/X_test.csv")
+
+    def test_compiled_matches_pipeline(self):
+        compiled = CompiledLogisticModel.from_pipeline(self.pipeline_model)
+        max_diff = verify_compiled(compiled, self.X_test, self.pipeline_model)
+        self.assertLessEqual(max_diff, 1e-9)
+
+    def test_mismatch_is_rejected(self):
+        compiled = CompiledLogisticModel.from_pipeline(self.pipeline_model)
+        compiled.intercept += 1e-3
+        with self.assertRaises(ValueError):
+            verify_compiled(compiled, self.X_test, self.pipeline_model)
+
+
+class AsthmaScorerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scorers = {
+            mode: AsthmaScorer("v1", mode=mode)
+            for mode in ("pipeline", "compiled")
+        }
+        cls.record = pd.read_csv(BENCHMARK_DATA).iloc[0].to_dict()
+
+    def test_modes_accept_the_same_records(self):
+        features = self.scorers["pipeline"].features
+        model_only = {feature: self.record[feature] for feature in features}
+        for record in (self.record, model_only):
+            pipeline, compiled = (
+                self.scorers[mode].predict([record])[0]
+                for mode in ("pipeline", "compiled")
+            )
+            self.assertAlmostEqual(pipeline["asthma_probability"],
+                                   compiled["asthma_probability"], places=9)
+            self.assertEqual(pipeline["prediction"], compiled["prediction"])
+
+    def test_modes_reject_the_same_records(self):
+        record = dict(self.record)
+        del record["Wheezing"]
+        for mode, scorer in self.scorers.items():
+            with self.subTest(mode=mode), \
+                    self.assertRaisesRegex(ValueError, "Wheezing"):
+                scorer.predict([self.record, record])
+
+
+class ScoringHandlerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scorer = AsthmaScorer("v1", mode="compiled")
+        cls.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), make_handler(cls.scorer, LatencyTracker())
+        )
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.record = pd.read_csv(BENCHMARK_DATA).iloc[0].to_dict()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def _request(self, path, body=None):
+        data = None if body is None else body.encode()
+        request = urllib.request.Request(self.url + path, data=data)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    def test_predict_single_and_batch(self):
+        expected = self.scorer.predict([self.record])[0]
+        status, body = self._request("/predict", json.dumps(self.record))
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected)
+
+        status, body = self._request(
+            "/predict", json.dumps([self.record, self.record])
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body, [expected, expected])
+
+    def test_bad_requests(self):
+        record = dict(self.record)
+        del record["Gender"]
+        for payload in (json.dumps(record), "{not json", "42"):
+            with self.subTest(payload=payload):
+                status, body = self._request("/predict", payload)
+                self.assertEqual(status, 400)
+                self.assertIn("error", body)
+
+    def test_health_and_not_found(self):
+        status, body = self._request("/health")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["features"], self.scorer.features)
+        self.assertEqual(self._request("/nope")[0], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
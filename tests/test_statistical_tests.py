@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2_contingency, false_discovery_control, fisher_exact
+
+from src.data_management import clean_patient_data
+from src.statistical_tests import (
+    benjamini_hochberg,
+    binary_significance,
+    binary_significance_loop,
+    chi2_2x2,
+    contingency_tables,
+    continuous_significance,
+    continuous_significance_loop,
+    fisher_exact_2x2,
+)
+
+PATIENT_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+
+
+class BenjaminiHochbergTest(unittest.TestCase):
+
+    def test_matches_scipy(self):
+        p = np.random.default_rng(0).random(50) ** 3
+        np.testing.assert_allclose(
+            benjamini_hochberg(p), false_discovery_control(p, method="bh")
+        )
+
+    def test_edge_cases(self):
+        self.assertEqual(benjamini_hochberg([]).size, 0)
+        np.testing.assert_allclose(benjamini_hochberg([0.9, 0.9]), 0.9)
+        self.assertTrue((benjamini_hochberg([0.5, 0.6, 0.99]) <= 1).all())
+
+
+class TwoByTwoTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.integers(0, 2, (300, 6))
+        self.y = rng.integers(0, 2, 300)
+        # Sparse tables that need Fisher, plus a tie-heavy balanced one
+        self.small = np.array([
+            [[3, 1], [1, 3]],
+            [[10, 0], [2, 7]],
+            [[0, 5], [4, 1]],
+            [[1, 2], [2, 1]],
+            [[20, 1], [15, 0]],
+        ])
+
+    def test_contingency_tables_match_crosstab(self):
+        tables = contingency_tables(self.X, self.y)
+        for i in range(self.X.shape[1]):
+            np.testing.assert_array_equal(
+                tables[i], pd.crosstab(self.X[:, i], self.y).to_numpy()
+            )
+
+    def test_chi2_matches_scipy(self):
+        tables = contingency_tables(self.X, self.y)
+        statistic, p_values, expected = chi2_2x2(tables)
+        for i, table in enumerate(tables):
+            chi2_stat, p, _, exp = chi2_contingency(table)
+            self.assertAlmostEqual(statistic[i], chi2_stat)
+            self.assertAlmostEqual(p_values[i], p)
+            np.testing.assert_allclose(expected[i], exp)
+
+    def test_fisher_matches_scipy(self):
+        odds_ratio, p_values = fisher_exact_2x2(self.small)
+        for i, table in enumerate(self.small):
+            expected_or, expected_p = fisher_exact(table)
+            self.assertAlmostEqual(p_values[i], expected_p)
+            self.assertEqual(odds_ratio[i], expected_or)
+
+    def test_fisher_degenerate_table(self):
+        odds_ratio, p_values = fisher_exact_2x2(np.array([[[0, 0], [3, 4]]]))
+        self.assertTrue(np.isnan(odds_ratio[0]))
+        self.assertEqual(p_values[0], 1.0)
+
+
+class SignificanceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.df = clean_patient_data(pd.read_csv(PATIENT_DATA))
+
+    def _assert_matches_loop(self, actual, expected):
+        pd.testing.assert_index_equal(actual.index, expected.index)
+        self.assertEqual(list(actual["test"]), list(expected["test"]))
+        np.testing.assert_allclose(
+            actual["p-value"].astype(float),
+            expected["p-value"].astype(float),
+            rtol=1e-6,
+        )
+        self.assertEqual(list(actual["significance"]),
+                         list(expected["significance"]))
+
+    def test_continuous_matches_loop(self):
+        self._assert_matches_loop(
+            continuous_significance(self.df),
+            continuous_significance_loop(self.df),
+        )
+
+    def test_binary_matches_loop(self):
+        self._assert_matches_loop(
+            binary_significance(self.df), binary_significance_loop(self.df)
+        )
+
+    def test_binary_uses_fisher_for_small_counts(self):
+        df = self.df.groupby("Diagnosis").head(30).copy()
+        # A rare flag and a three-level feature for the loop fallback
+        df["Rare"] = 0
+        df.iloc[:2, df.columns.get_loc("Rare")] = 1
+        df["Level"] = np.arange(len(df)) % 3
+        actual = binary_significance(df)
+        self._assert_matches_loop(actual, binary_significance_loop(df))
+        self.assertEqual(actual.loc["Rare", "test"], "Fisher's exact")
+
+    def test_bh_column(self):
+        results = binary_significance(self.df, bh=True)
+        np.testing.assert_allclose(
+            results["p-value (BH)"].astype(float),
+            benjamini_hochberg(results["p-value"].astype(float)),
+        )
+        self.assertNotIn("p-value (BH)", binary_significance(self.df))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import precision_score, recall_score
+
+from src.columnar_store import read_dataset
+from src.machine_learning.score import (
+    MODEL_DIR,
+    load_pipelines,
+    score_frame,
+)
+from src.subgroup_cube import SubgroupCube, dimension_codes, held_out
+
+PATIENT_DATA = "outputs/datasets/collection/asthma_disease_data.csv"
+
+
+class SubgroupCubeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(PATIENT_DATA)
+        _, cls.pipeline_model = load_pipelines("v1")
+        cls.X_test = pd.read_csv(f"{MODEL_DIR}/v1/X_test.csv")
+        cls.predictions = score_frame(
+            cls.df, cls.pipeline_model
+        )["prediction"]
+        cls.evaluated = held_out(cls.df, cls.pipeline_model, cls.X_test)
+        cls.cube = SubgroupCube.build(
+            cls.df, cls.predictions, cls.evaluated
+        )
+
+    def test_held_out_is_the_test_split(self):
+        self.assertEqual(self.evaluated.sum(), len(self.X_test))
+        # Same patients from the float32 columnar export
+        np.testing.assert_array_equal(
+            held_out(read_dataset(PATIENT_DATA), self.pipeline_model,
+                     self.X_test),
+            self.evaluated,
+        )
+
+    def test_rollup_matches_recall_score_on_test_split(self):
+        y = self.df["Diagnosis"][self.evaluated]
+        predictions = self.predictions[self.evaluated]
+        total = self.cube.rollup().loc["All"]
+        self.assertEqual(total["patients"], len(self.df))
+        self.assertEqual(total["evaluated"], len(self.X_test))
+        self.assertAlmostEqual(
+            total["prevalence"], self.df["Diagnosis"].mean()
+        )
+        self.assertAlmostEqual(total["recall"], recall_score(y, predictions))
+        self.assertAlmostEqual(
+            total["precision"], precision_score(y, predictions)
+        )
+
+    def test_rollup_by_dimension_matches_recall_score(self):
+        bands = dimension_codes(self.df)["AgeBand"]
+        table = self.cube.rollup("AgeBand")
+        for code, label in enumerate(table.index):
+            rows = (bands == code) & self.evaluated
+            expected = recall_score(
+                self.df["Diagnosis"][rows], self.predictions[rows],
+                zero_division=np.nan,
+            )
+            np.testing.assert_allclose(table.loc[label, "recall"], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
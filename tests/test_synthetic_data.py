@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.columnar_store import CONTINUOUS_MEASURES
+from src.synthetic_data import (
+    SOURCE_DATA,
+    TARGET,
+    SyntheticPatientModel,
+    iter_synthetic,
+    load_synthetic,
+    write_synthetic,
+)
+
+
+class SyntheticDataTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.source = pd.read_csv(SOURCE_DATA)
+        cls.model = SyntheticPatientModel.fit(cls.source)
+        cls.expected = pd.concat(
+            iter_synthetic(cls.model, 2500, chunksize=1000, seed=3),
+            ignore_index=True,
+        )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _write(self, name, **kwargs):
+        path = os.path.join(self.tmp_dir, name)
+        stats = write_synthetic(path, 2500, model=self.model,
+                                chunksize=1000, seed=3, **kwargs)
+        self.assertEqual(stats["rows"], 2500)
+        return path
+
+    def test_source_schema(self):
+        self.assertEqual(list(self.expected.columns),
+                         list(self.source.columns))
+        self.assertEqual(list(self.expected.dtypes),
+                         list(self.source.dtypes))
+        self.assertEqual(self.expected["PatientID"].min(),
+                         self.source["PatientID"].max() + 1)
+        self.assertTrue(self.expected["PatientID"].is_unique)
+        for column, labels in (("Gender", [0, 1]), (TARGET, [0, 1]),
+                               ("EducationLevel", [0, 1, 2, 3])):
+            self.assertTrue(self.expected[column].isin(labels).all())
+
+    def test_class_rates_follow_the_source(self):
+        self.assertAlmostEqual(self.expected[TARGET].mean(),
+                               self.source[TARGET].mean(), delta=0.02)
+        for column in ("Age", "LungFunctionFEV1", "Wheezing"):
+            self.assertAlmostEqual(
+                self.expected[column].mean() / self.source[column].mean(),
+                1, delta=0.05,
+            )
+
+    def test_csv_is_independent_of_worker_count(self):
+        one = self._write("one.csv", n_jobs=1)
+        two = self._write("two.csv", n_jobs=2)
+        with open(one, "rb") as f1, open(two, "rb") as f2:
+            self.assertEqual(f1.read(), f2.read())
+        pd.testing.assert_frame_equal(pd.read_csv(one), self.expected)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ["one.csv", "two.csv"])
+
+    def test_columnar_parts(self):
+        path = self._write("data.cols", n_jobs=2, output_format="columnar")
+        self.assertEqual(len(os.listdir(path)), 3)
+        loaded = load_synthetic(path)
+        self.assertEqual(len(loaded), 2500)
+        for column in self.expected.columns:
+            if column in CONTINUOUS_MEASURES:
+                np.testing.assert_allclose(loaded[column],
+                                           self.expected[column], rtol=1e-6)
+            else:
+                self.assertEqual(
+                    list(loaded[column].astype(self.expected[column].dtype)),
+                    list(self.expected[column]), column,
+                )
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self._write("data.parquet", output_format="parquet")
+
+
+if __name__ == "__main__":
+    unittest.main()
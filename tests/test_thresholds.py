@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+from sklearn.metrics import confusion_matrix, fbeta_score
+
+from src.machine_learning.thresholds import (
+    bootstrap_threshold_ci,
+    metrics_at,
+    threshold_curve,
+)
+
+
+class ThresholdCurveTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = rng.integers(0, 2, 400)
+        # Rounded so that many patients share a score
+        self.scores = np.round(rng.random(400) * 0.6 + self.y * 0.3, 2)
+
+    def test_counts_match_confusion_matrix(self):
+        curve = threshold_curve(self.y, self.scores, beta=2.0)
+        self.assertTrue((np.diff(curve["threshold"]) < 0).all())
+        self.assertEqual(len(curve), np.unique(self.scores).size)
+        for row in curve.itertuples():
+            prediction = (self.scores >= row.threshold).astype(int)
+            tn, fp, fn, tp = confusion_matrix(self.y, prediction).ravel()
+            self.assertEqual((row.tp, row.fp, row.fn, row.tn),
+                             (tp, fp, fn, tn))
+            self.assertAlmostEqual(
+                row.f_beta,
+                fbeta_score(self.y, prediction, beta=2.0, zero_division=0),
+            )
+
+    def test_metrics_at_any_threshold(self):
+        curve = threshold_curve(self.y, self.scores)
+        for threshold in (0.0, 0.305, 0.5, 0.9, 2.0):
+            row = metrics_at(curve, threshold)
+            prediction = self.scores >= threshold
+            self.assertEqual(row["threshold"], threshold)
+            self.assertEqual(row["tp"], np.sum(prediction & (self.y == 1)))
+            self.assertEqual(row["fp"], np.sum(prediction & (self.y == 0)))
+            self.assertEqual(row["tp"] + row["fn"], self.y.sum())
+
+
+class BootstrapThresholdTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.y = rng.integers(0, 2, 300)
+        self.scores = rng.random(300) * 0.7 + self.y * 0.3
+        self.thresholds = [0.6, 0.3, 0.45]
+
+    def test_point_estimates_match_curve(self):
+        table = bootstrap_threshold_ci(self.y, self.scores, self.thresholds,
+                                       n_boot=200)
+        curve = threshold_curve(self.y, self.scores)
+        self.assertEqual(list(table["threshold"]), self.thresholds)
+        for row in table.itertuples():
+            expected = metrics_at(curve, row.threshold)
+            for metric in ("precision", "recall", "f_beta"):
+                self.assertAlmostEqual(getattr(row, metric), expected[metric])
+                self.assertLessEqual(getattr(row, f"{metric}_lower"),
+                                     getattr(row, f"{metric}_upper"))
+
+    def test_seeded_and_independent_of_batch_size(self):
+        first = bootstrap_threshold_ci(self.y, self.scores, self.thresholds,
+                                       n_boot=300, batch_size=300)
+        second = bootstrap_threshold_ci(self.y, self.scores, self.thresholds,
+                                        n_boot=300, batch_size=70)
+        self.assertTrue(first.equals(second))
+        other_seed = bootstrap_threshold_ci(
+            self.y, self.scores, self.thresholds, n_boot=300, random_state=1
+        )
+        self.assertFalse(first.equals(other_seed))
+
+
+if __name__ == "__main__":
+    unittest.main()